@@ -0,0 +1,332 @@
+# Tệp: benchmarks/bench_sync.py
+"""Benchmark tái lập được cho toàn bộ pipeline đồng bộ.
+
+Sinh repo tổng hợp ở nhiều quy mô (số file, độ sâu lịch sử, số file thay
+đổi) với một repo bare local làm remote, đo thời gian từng pha của
+`start_sync_flow`, `handle_force_reset` và `_update_target_branch`, lưu kết
+quả ra JSON và so sánh với baseline để phát hiện hồi quy.
+
+Ví dụ:
+    python -m benchmarks.bench_sync --scales small medium --output bench.json
+    python -m benchmarks.bench_sync --baseline bench.json --threshold 0.25
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import Namespace
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(_PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(_PROJECT_ROOT))
+
+import core.config as config  # noqa: E402
+import core.git_utils as git_utils  # noqa: E402
+import core.main_flow as main_flow  # noqa: E402
+import core.plan as plan  # noqa: E402
+from core.constants import COMMIT_TYPES  # noqa: E402
+
+# Kết quả: {scale: {scenario: {phase: giây}}}
+Results = Dict[str, Dict[str, Dict[str, float]]]
+
+
+@dataclass(frozen=True)
+class Scale:
+    """Quy mô của một repo tổng hợp."""
+    files: int
+    history: int
+    changes: int
+
+
+SCALES: Dict[str, Scale] = {
+    'small': Scale(files=200, history=20, changes=20),
+    'medium': Scale(files=5000, history=200, changes=500),
+    'large': Scale(files=50000, history=1000, changes=5000),
+}
+
+# Các hàm của main_flow được đo như một "pha"
+PHASES: Sequence[str] = (
+    'read_repo_state',
+    'handle_branch_protection',
+    '_maybe_stash_changes',
+    '_run_pre_sync_hook_if_needed',
+    'get_commit_message',
+    'plan_sync',
+    'execute_plan',
+    '_push_and_handle_remote',
+    '_update_target_branch',
+    '_apply_stash_if_needed',
+)
+# main_flow chỉ import các hàm này khi cần: bọc chúng ngay tại module định nghĩa
+_PHASE_MODULES = {'execute_plan': plan}
+
+
+def _git(cwd: Path, *args: str, input_data: Optional[bytes] = None) -> str:
+    result = subprocess.run(['git', *args], cwd=cwd, input=input_data, capture_output=True, check=True)
+    return result.stdout.decode('utf-8', 'replace').strip()
+
+
+def _file_path(index: int) -> str:
+    # Chia file vào các thư mục con để giống cấu trúc repo thật
+    return f"src/d{index % 100:02d}/file_{index:06d}.txt"
+
+
+def _fast_import_stream(scale: Scale) -> bytes:
+    """Sinh luồng `git fast-import`: một commit chứa toàn bộ file rồi `history` commit nhỏ."""
+    out = io.BytesIO()
+    stamp = 1_700_000_000
+
+    def blob_data(text: str) -> None:
+        data = text.encode('utf-8')
+        out.write(b"data %d\n" % len(data) + data + b"\n")
+
+    def commit_header(mark: int, message: str, parent: Optional[int]) -> None:
+        out.write(b"commit refs/heads/main\n")
+        out.write(b"mark :%d\n" % mark)
+        out.write(b"committer Bench <bench@example.com> %d +0000\n" % (stamp + mark))
+        blob_data(message)
+        if parent is not None:
+            out.write(b"from :%d\n" % parent)
+
+    commit_header(1, "initial", None)
+    for i in range(scale.files):
+        out.write(f"M 100644 inline {_file_path(i)}\n".encode('utf-8'))
+        blob_data(f"line 0 of file {i}\n")
+    for depth in range(1, scale.history + 1):
+        commit_header(depth + 1, f"history {depth}", depth)
+        index = (depth * 7919) % scale.files
+        out.write(f"M 100644 inline {_file_path(index)}\n".encode('utf-8'))
+        blob_data(f"line {depth} of file {index}\n")
+    return out.getvalue()
+
+
+def make_repository(root: Path, scale: Scale) -> Path:
+    """Tạo remote bare + bản clone làm việc với các branch main và develop."""
+    remote = root / 'remote.git'
+    seed = root / 'seed'
+    work = root / 'work'
+    _git(root, 'init', '-q', '--bare', '-b', 'main', str(remote))
+    _git(root, 'init', '-q', '-b', 'main', str(seed))
+    _git(seed, 'fast-import', '--quiet', input_data=_fast_import_stream(scale))
+    _git(seed, 'push', '-q', str(remote), 'main:main', 'main:develop')
+    _git(root, 'clone', '-q', str(remote), str(work))
+    _git(work, 'config', 'user.name', 'Bench')
+    _git(work, 'config', 'user.email', 'bench@example.com')
+    _git(work, 'branch', '-q', '--track', 'develop', 'origin/develop')
+    _git(work, 'checkout', '-q', '-b', 'feature/BENCH-1')
+    _git(work, 'push', '-q', '-u', 'origin', 'feature/BENCH-1')
+    return work
+
+
+def advance_remote_branch(root: Path, branch: str, commits: int = 3) -> None:
+    """Giả lập người khác push thêm commit lên `branch` của remote."""
+    other = root / 'other'
+    if not other.exists():
+        _git(root, 'clone', '-q', str(root / 'remote.git'), str(other))
+        _git(other, 'config', 'user.name', 'Other')
+        _git(other, 'config', 'user.email', 'other@example.com')
+    _git(other, 'fetch', '-q', 'origin')
+    _git(other, 'checkout', '-q', '-B', branch, f'origin/{branch}')
+    for i in range(commits):
+        (other / f'other_{branch}_{time.monotonic_ns()}_{i}.txt').write_text('x', encoding='utf-8')
+        _git(other, 'add', '-A')
+        _git(other, 'commit', '-q', '-m', f'remote change {i}')
+    _git(other, 'push', '-q', 'origin', branch)
+
+
+def modify_files(work: Path, count: int, round_no: int) -> None:
+    for i in range(count):
+        path = work / _file_path(i)
+        path.write_text(path.read_text(encoding='utf-8') + f"change {round_no}\n", encoding='utf-8')
+
+
+class PhaseTimer:
+    """Bọc các hàm của main_flow để đo thời gian từng pha (thời gian gộp, tính cả pha con)."""
+
+    def __init__(self) -> None:
+        self.timings: Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def installed(self) -> Iterator['PhaseTimer']:
+        owners = {name: _PHASE_MODULES.get(name, main_flow) for name in PHASES}
+        originals = {name: getattr(owners[name], name) for name in PHASES}
+        try:
+            for name, func in originals.items():
+                setattr(owners[name], name, self._wrap(name, func))
+            yield self
+        finally:
+            for name, func in originals.items():
+                setattr(owners[name], name, func)
+
+    def _wrap(self, name: str, func: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+        return timed
+
+
+def _sync_args(message: str, update_after: Optional[List[str]] = None) -> Namespace:
+    args = Namespace(scope=None, stash=False, tag=None, update_after=update_after, yes=True, dry_run=False)
+    for c_type in COMMIT_TYPES:
+        setattr(args, c_type, None)
+    args.chore = message
+    return args
+
+
+def _measure(action: Callable[[], None]) -> Dict[str, float]:
+    """Chạy một kịch bản, nuốt output, trả về thời gian từng pha và tổng."""
+    timer = PhaseTimer()
+    # Mỗi lần đo bắt đầu "nguội" như một tiến trình git-sync mới
+    git_utils.BROKER.close()
+    git_utils.BROKER.invalidate()
+    git_utils.reset_spawn_count()
+    config.reset_settings()
+    start = time.perf_counter()
+    with timer.installed(), contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        try:
+            action()
+        except SystemExit as exc:
+            if exc.code not in (0, None):
+                raise RuntimeError(f"scenario exited with code {exc.code}") from exc
+    timings = dict(timer.timings)
+    timings['total'] = time.perf_counter() - start
+    timings['spawned_processes'] = float(git_utils.get_spawn_count())
+    return timings
+
+
+def run_scale(name: str, scale: Scale, repeat: int) -> Dict[str, Dict[str, float]]:
+    """Chạy mọi kịch bản trên một quy mô, lấy trung vị qua `repeat` lần."""
+    samples: Dict[str, List[Dict[str, float]]] = {}
+    previous_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix=f'git-sync-bench-{name}-') as tmp:
+        root = Path(tmp)
+        work = make_repository(root, scale)
+        os.chdir(work)
+        try:
+            for round_no in range(repeat):
+                modify_files(work, scale.changes, round_no)
+                samples.setdefault('sync', []).append(
+                    _measure(lambda: main_flow.start_sync_flow(_sync_args(f"bench round {round_no}"))))
+
+                samples.setdefault('noop_sync', []).append(
+                    _measure(lambda: main_flow.start_sync_flow(_sync_args("noop"))))
+
+                advance_remote_branch(root, 'develop')
+                samples.setdefault('update_after', []).append(
+                    _measure(lambda: main_flow._update_target_branch(['develop'], 'feature/BENCH-1')))
+
+                modify_files(work, scale.changes, round_no)
+                samples.setdefault('force_reset', []).append(
+                    _measure(lambda: _force_reset('origin/feature/BENCH-1')))
+        finally:
+            os.chdir(previous_cwd)
+    return {scenario: _median(runs) for scenario, runs in samples.items()}
+
+
+def _force_reset(target: str) -> None:
+    import builtins
+    original_input = builtins.input
+    builtins.input = lambda prompt='': target
+    try:
+        main_flow.handle_force_reset(target)
+    finally:
+        builtins.input = original_input
+
+
+def _median(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    keys = sorted({k for run in runs for k in run})
+    return {k: statistics.median(run.get(k, 0.0) for run in runs) for k in keys}
+
+
+def compare(
+    current: Results,
+    baseline: Results,
+    threshold: float,
+    min_delta: float = 0.005,
+) -> List[str]:
+    """Liệt kê các pha chậm hơn baseline quá `threshold` (tỉ lệ) và quá `min_delta` giây."""
+    regressions: List[str] = []
+    for scale, scenarios in current.items():
+        for scenario, phases in scenarios.items():
+            base_phases = baseline.get(scale, {}).get(scenario, {})
+            for phase, value in phases.items():
+                base = base_phases.get(phase)
+                if base is None or phase == 'spawned_processes':
+                    continue
+                if value - base > min_delta and value > base * (1 + threshold):
+                    regressions.append(
+                        f"{scale}/{scenario}/{phase}: {base * 1000:.1f} ms -> {value * 1000:.1f} ms "
+                        f"(+{(value / base - 1) * 100 if base else float('inf'):.0f}%)"
+                    )
+            base_spawns = base_phases.get('spawned_processes')
+            if base_spawns is not None and phases.get('spawned_processes', 0) > base_spawns:
+                regressions.append(
+                    f"{scale}/{scenario}/spawned_processes: {base_spawns:.0f} -> {phases['spawned_processes']:.0f}"
+                )
+    return regressions
+
+
+def print_table(results: Results) -> None:
+    for scale, scenarios in results.items():
+        print(f"\n== {scale} ==")
+        for scenario, phases in scenarios.items():
+            print(f"  {scenario}: total {phases['total'] * 1000:.1f} ms, "
+                  f"{phases.get('spawned_processes', 0):.0f} processes")
+            for phase, value in sorted(phases.items(), key=lambda item: -item[1]):
+                if phase not in ('total', 'spawned_processes'):
+                    print(f"      {phase:<30} {value * 1000:9.1f} ms")
+
+
+def _metadata() -> Dict[str, str]:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'git': subprocess.run(['git', '--version'], capture_output=True, text=True).stdout.strip(),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the git-sync pipeline on synthetic repositories.")
+    parser.add_argument("--scales", nargs="+", choices=sorted(SCALES), default=['small'], help="Repository scales to run.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario; the median is reported.")
+    parser.add_argument("--output", metavar="FILE", help="Write results as JSON to FILE.")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare results against a baseline JSON file.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown that counts as a regression (default: 0.2).")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="Ignore slowdowns smaller than this many seconds.")
+    args = parser.parse_args(argv)
+
+    config.initialize_lang(Namespace(lang='en'))
+    results: Results = {name: run_scale(name, SCALES[name], max(1, args.repeat)) for name in args.scales}
+    print_table(results)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({'meta': _metadata(), 'results': results}, indent=2), encoding='utf-8')
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))['results']
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+# Tệp: core/async_engine.py
+
+import asyncio
+import functools
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from .timings import RECORDER
+
+
+@dataclass(frozen=True)
+class Step:
+    """Một bước của luồng đồng bộ: chỉ bắt đầu khi mọi bước trong `deps` đã xong.
+
+    `phase` là tên ghi vào --timings (mặc định là `name`); chuỗi rỗng nghĩa là
+    không ghi, khi hàm bên trong đã tự đo bằng `timed_phase`.
+    """
+    name: str
+    action: Callable[[], Awaitable[Any]]
+    deps: Tuple[str, ...] = ()
+    phase: Optional[str] = None
+
+
+class _StepExit(Exception):
+    """SystemExit của một bước, đổi thành lỗi thường để asyncio không ném nó xuyên qua event loop."""
+
+    def __init__(self, code: Any) -> None:
+        super().__init__(code)
+        self.code = code
+
+
+def in_thread(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Callable[[], Awaitable[Any]]:
+    """Bọc một hàm đồng bộ (dùng run_command...) thành action chạy trong thread riêng."""
+    async def action() -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+    return action
+
+
+def on_loop(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Callable[[], Awaitable[Any]]:
+    """Bọc một hàm đồng bộ thành action chạy thẳng trên thread của event loop (thread chính).
+
+    Dùng cho bước chờ người dùng nhập: Ctrl-C trong input() dừng ngay cả
+    luồng, còn input() trong thread phụ sẽ giữ tiến trình lại khi asyncio.run
+    đóng executor. Các bước khác không chạy tiếp được trong lúc chờ.
+    """
+    async def action() -> Any:
+        return func(*args, **kwargs)
+    return action
+
+
+async def run_steps(steps: Sequence[Step]) -> Dict[str, Any]:
+    """Chạy các bước theo đồ thị phụ thuộc; các bước độc lập chạy chồng lên nhau.
+
+    Mỗi bước chỉ được phụ thuộc vào bước khai báo trước nó, nên đồ thị luôn
+    không có chu trình. Nếu một bước ném lỗi, các bước còn lại bị huỷ và lỗi
+    được ném tiếp cho caller (kể cả SystemExit).
+    """
+    tasks: Dict[str, 'asyncio.Future[Any]'] = {}
+
+    async def run(step: Step) -> Any:
+        if step.deps:
+            await asyncio.gather(*(tasks[dep] for dep in step.deps))
+        start = time.perf_counter()
+        try:
+            return await step.action()
+        except SystemExit as exc:
+            raise _StepExit(exc.code) from None
+        finally:
+            label = step.name if step.phase is None else step.phase
+            if RECORDER.enabled and label:
+                RECORDER.record_phase(label, start)
+
+    for step in steps:
+        unknown = [dep for dep in step.deps if dep not in tasks]
+        if unknown:
+            raise ValueError(f"Step '{step.name}' depends on undeclared step(s): {', '.join(unknown)}")
+        tasks[step.name] = asyncio.ensure_future(run(step))
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        # Chờ mọi bước dừng hẳn để lỗi của chúng được lấy ra, không bị asyncio in lại lúc đóng loop
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    return {name: task.result() for name, task in tasks.items()}
+
+
+def execute(steps: Sequence[Step]) -> Dict[str, Any]:
+    """Điểm vào đồng bộ: chạy các bước trong một event loop mới và trả về kết quả theo tên.
+
+    Không dùng asyncio.run: trình xử lý SIGINT của nó chỉ huỷ task chính, nên
+    Ctrl-C không cắt được một input() đang chờ. Ở đây Ctrl-C vẫn là
+    KeyboardInterrupt thông thường; các bước còn lại bị huỷ trước khi đóng loop.
+    Bước nào gọi sys.exit thì cả luồng kết thúc bằng đúng một SystemExit với mã đó.
+    """
+    if not steps:
+        return {}
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(run_steps(steps))
+    except _StepExit as exc:
+        raise SystemExit(exc.code) from None
+    finally:
+        try:
+            _cancel_pending(loop)
+            loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            loop.close()
+
+
+def _cancel_pending(loop: asyncio.AbstractEventLoop) -> None:
+    pending = asyncio.all_tasks(loop)
+    for task in pending:
+        task.cancel()
+    if pending:
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
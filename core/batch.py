@@ -0,0 +1,87 @@
+# Tệp: core/batch.py
+
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .config import t
+from .console import colorize
+
+
+@dataclass(frozen=True)
+class BatchEntry:
+    """Một commit trong chế độ --batch: các pathspec cần commit và phần message."""
+    paths: Tuple[str, ...]
+    commit_type: str
+    scope: str
+    message: str
+
+
+def parse_entry(text: str, commit_types: Sequence[str], aliases: Dict[str, str]) -> BatchEntry:
+    """Đọc một dòng JSON: {"paths": [...] hoặc "...", "type": ..., "scope": ..., "message": ...}.
+
+    `type` có thể là loại commit chuẩn hoặc alias trong .gitsyncrc. Lỗi được
+    báo bằng ValueError (thông báo đã dịch).
+    """
+    import json
+
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(t('batch_invalid_json', error=e.msg)) from e
+    if not isinstance(data, dict):
+        raise ValueError(t('batch_invalid_json', error='expected an object'))
+
+    paths = data.get('paths', data.get('path'))
+    if isinstance(paths, str):
+        paths = [paths]
+    if not isinstance(paths, list) or not paths or not all(isinstance(p, str) and p for p in paths):
+        raise ValueError(t('batch_missing_field', field='paths'))
+    message = data.get('message')
+    if not isinstance(message, str) or not message.strip():
+        raise ValueError(t('batch_missing_field', field='message'))
+    commit_type = aliases.get(data.get('type') or '', data.get('type'))
+    if commit_type not in commit_types:
+        raise ValueError(t('batch_unknown_type', type=data.get('type'), types=', '.join(commit_types)))
+    scope = data.get('scope') or ''
+    if not isinstance(scope, str):
+        raise ValueError(t('batch_missing_field', field='scope'))
+    return BatchEntry(tuple(paths), commit_type, scope, message.strip())
+
+
+def parse_batch(lines: Iterable[str], commit_types: Sequence[str], aliases: Dict[str, str]) -> Optional[List[BatchEntry]]:
+    """Đọc toàn bộ các dòng (bỏ qua dòng trống và dòng bắt đầu bằng '#'); in lỗi và trả về None nếu có dòng sai."""
+    entries: List[BatchEntry] = []
+    valid = True
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            entries.append(parse_entry(line, commit_types, aliases))
+        except ValueError as e:
+            print(colorize(t('batch_invalid_entry', line=number, error=str(e)), 'error'), file=sys.stderr)
+            valid = False
+    if not valid:
+        return None
+    if not entries:
+        print(colorize(t('batch_empty'), 'error'), file=sys.stderr)
+        return None
+    return entries
+
+
+def read_batch(source: str, commit_types: Sequence[str], aliases: Dict[str, str]) -> Optional[List[BatchEntry]]:
+    """Đọc các commit từ file `source` ('-' là stdin)."""
+    if source == '-':
+        return parse_batch(sys.stdin.read().splitlines(), commit_types, aliases)
+    try:
+        with open(source, encoding='utf-8') as handle:
+            return parse_batch(handle.read().splitlines(), commit_types, aliases)
+    except OSError as e:
+        print(colorize(t('batch_read_failed', path=source, error=e.strerror or str(e)), 'error'), file=sys.stderr)
+        return None
+
+
+def pathspec_input(entry: BatchEntry) -> str:
+    """Danh sách pathspec dạng NUL-separated cho `--pathspec-from-file=- --pathspec-file-nul`."""
+    return '\0'.join(entry.paths)
@@ -0,0 +1,283 @@
+# Tệp: core/cli.py
+
+import sys
+from typing import TYPE_CHECKING, Dict, Sequence, Tuple
+
+# Chỉ import những gì mỗi nhánh thực sự cần: git-sync được gọi rất nhiều lần
+# (hook khi lưu file, pre-commit) và phần lớn các lần đó không có gì để làm.
+if TYPE_CHECKING:
+    import argparse
+
+def build_parser(alias_to_target: Dict[str, str], add_help: bool = True) -> 'argparse.ArgumentParser':
+    """Dựng parser với các cờ chuẩn và các cờ alias đọc từ .gitsyncrc."""
+    import argparse
+
+    from .constants import COMMIT_TYPES
+
+    # Không cho viết tắt cờ dài: alias trong .gitsyncrc (ví dụ --st, --work) chỉ được biết ở lượt
+    # parse thứ hai, lượt đầu không được hiểu nhầm chúng thành --stash hay --workspace
+    parser = argparse.ArgumentParser(description="A smart Git sync tool.", add_help=add_help, allow_abbrev=False)
+
+    # --- Thiết lập các cờ (flags) ---
+    parser.add_argument("--lang", choices=['en', 'vi'], help="Temporarily set the display language for this run.")
+    
+    parser.add_argument("--set-lang", choices=['en', 'vi'], help="Permanently set the default language in the global config file.")
+    
+    parser.add_argument(
+        "-s", "--scope",
+        metavar="SCOPE",
+        help="Specify a scope for the commit (e.g., 'api', 'db', 'ui')."
+    )
+
+    parser.add_argument(
+        "--force-reset-to", 
+        metavar="REMOTE_BRANCH", 
+        help="DANGER: Discard all local changes and force sync to match the remote branch (e.g., origin/main)."
+    )
+    
+    parser.add_argument(
+        "--depth",
+        type=int,
+        metavar="N",
+        help="With --force-reset-to: fetch only the last N commits (shallow fetch)."
+    )
+
+    parser.add_argument(
+        "--filter",
+        metavar="SPEC",
+        help="With --force-reset-to: partial-clone filter for the fetch (e.g. blob:none)."
+    )
+
+    parser.add_argument(
+        "--stash",
+        action="store_true",
+        help="Automatically stash uncommitted changes before syncing and pop them after."
+    )
+    
+    parser.add_argument(
+        "--isolated",
+        action="store_true",
+        help="Commit and push from a private copy of the index; never rewrites files in the working tree."
+    )
+
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="Create several commits from a JSON-lines FILE ('-' for stdin; implies -y), then push them once."
+    )
+
+    parser.add_argument(
+        "--tag",
+        metavar="TAG_NAME",
+        help="Create and push a tag after a successful sync (e.g., v1.0.0)."
+    )
+
+    parser.add_argument(
+        "--update-after",
+        nargs="+",
+        metavar="BRANCH_NAME",
+        help="After a successful sync, fast-forward these branches from their upstream in one fetch, without checking them out."
+    )
+
+    parser.add_argument(
+        "-y", "--yes",
+        action="store_true",
+        help="Skip interactive confirmations and assume 'yes' for supported prompts."
+    )
+
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Show the Git commands that would be executed, without making any changes."
+    )
+
+    parser.add_argument(
+        "--repos",
+        nargs="+",
+        metavar="PATH",
+        help="Sync several repositories in parallel (each PATH is a repository)."
+    )
+
+    parser.add_argument(
+        "--workspace",
+        metavar="DIR",
+        help="Sync every Git repository found directly under DIR in parallel."
+    )
+
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        metavar="N",
+        help="Maximum number of repositories synced at the same time (default: CPU count, up to 8)."
+    )
+
+    parser.add_argument(
+        "--output",
+        choices=["text", "jsonl"],
+        default="text",
+        help="'jsonl' writes one JSON event per phase, command, push and final result to stdout (human output goes to stderr)."
+    )
+
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print a per-phase timing table (wall time, commands, spawned processes, output size) at the end."
+    )
+
+    parser.add_argument(
+        "--trace-file",
+        metavar="FILE",
+        help="Write a Chrome trace-event JSON file with every phase and command of this run."
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and auto-commit/push whenever files change (implies -y; default message 'chore: wip auto-sync')."
+    )
+
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=2.0,
+        metavar="SECONDS",
+        help="With --watch: commit only after files have been quiet for this long (default: 2)."
+    )
+
+    parser.add_argument(
+        "--push-interval",
+        type=float,
+        default=60.0,
+        metavar="SECONDS",
+        help="With --watch: push at most once per this many seconds (default: 60)."
+    )
+
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Run a resident git-sync server on a Unix socket; later git-sync calls are forwarded to it."
+    )
+
+    commit_group = parser.add_mutually_exclusive_group()
+    # Các loại commit chuẩn
+    standard_commits = COMMIT_TYPES
+    for commit_type in standard_commits:
+        commit_group.add_argument(f"--{commit_type}", metavar="MESSAGE", help=f'Commit with prefix "{commit_type}:"')
+    
+    # Tự động thêm các cờ alias vào parser
+    for alias, target in alias_to_target.items():
+        if alias not in standard_commits: # Tránh thêm lại các cờ đã có
+            commit_group.add_argument(
+                f"--{alias}",
+                metavar="MESSAGE",
+                help=f'Alias for "{target}:"'
+            )
+    return parser
+
+def parse_args(argv: Sequence[str]) -> Tuple['argparse.Namespace', Dict[str, str]]:
+    """Phân tích tham số; chỉ đọc .gitsyncrc khi có cờ lạ (alias) hoặc khi cần in --help."""
+    args, unknown = build_parser({}, add_help=False).parse_known_args(argv)
+    if not unknown:
+        return args, {}
+
+    from . import config
+
+    # Đọc alias để tự động thêm cờ
+    alias_to_target = config.get_commit_aliases()
+    return build_parser(alias_to_target).parse_args(argv), alias_to_target
+
+def run(argv: Sequence[str]) -> None:
+    """Chạy git-sync với các tham số `argv` trong tiến trình hiện tại."""
+    args, alias_to_target = parse_args(argv)
+
+    from . import config
+
+    # --- Chuyển đổi giá trị từ alias sang cờ chuẩn ---
+    for alias, target in alias_to_target.items():
+        alias_value = getattr(args, alias, None)
+        if alias_value:
+            setattr(args, target, alias_value)
+    
+    # --- Khởi tạo và chạy ứng dụng ---
+    try:
+        # Luôn phải khởi tạo để có hàm t() cho các thông báo
+        config.initialize_lang(args)
+    except Exception as e:
+        print(f"Failed to initialize settings: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    # Ưu tiên xử lý --set-lang và thoát
+    if args.set_lang:
+        config.set_language_config(args.set_lang)
+        sys.exit(0)
+
+    if args.daemon:
+        from . import daemon
+        sys.exit(daemon.serve(run))
+
+    # Thiết lập chế độ dry-run cho toàn bộ phiên làm việc (nếu có)
+    from .git_utils import set_dry_run
+    set_dry_run(getattr(args, "dry_run", False))
+
+    from . import timings
+    if getattr(args, "timings", False) or getattr(args, "trace_file", None):
+        timings.RECORDER.enable()
+
+    if getattr(args, "output", "text") == "jsonl":
+        # stdout chỉ còn các sự kiện JSON; mọi thông báo cho người đọc chuyển sang stderr
+        from .events import EVENTS
+        with EVENTS.session():
+            _dispatch(args, argv)
+    else:
+        _dispatch(args, argv)
+
+def _dispatch(args: 'argparse.Namespace', argv: Sequence[str]) -> None:
+    """Chọn luồng chính: watch, nhiều repo, force-reset hoặc đồng bộ thường."""
+    from . import config, timings
+
+    if args.watch:
+        # Mỗi vòng watch là một lần sync mới: --tag sẽ bị tạo lại và push lại (và thất bại) mỗi vòng,
+        # --update-after sẽ merge vào các branch khác sau từng commit WIP
+        if (args.force_reset_to or args.stash or args.isolated or args.batch or args.repos or args.workspace
+                or args.tag or args.update_after):
+            print(config.t('watch_incompatible_options'), file=sys.stderr)
+            sys.exit(1)
+        from . import watch
+        sys.exit(watch.run_watch(args, args.debounce, args.push_interval))
+
+    # Chế độ nhiều repo: mỗi repo chạy trong một tiến trình git-sync riêng
+    if args.repos or args.workspace:
+        if args.force_reset_to:
+            print(config.t('multi_repo_force_reset_unsupported'), file=sys.stderr)
+            sys.exit(1)
+        from pathlib import Path
+
+        from . import multi_repo
+        repos = [Path(p) for p in (args.repos or [])]
+        if args.workspace:
+            repos.extend(multi_repo.discover_repositories(Path(args.workspace)))
+        sys.exit(multi_repo.run_multi_repo_sync(repos, list(argv), args.jobs))
+
+    if args.isolated and args.stash:
+        print(config.t('isolated_incompatible_stash'), file=sys.stderr)
+        sys.exit(1)
+    if args.batch and (args.stash or args.isolated):
+        print(config.t('batch_incompatible_options'), file=sys.stderr)
+        sys.exit(1)
+    if args.batch == '-':
+        # stdin đã dùng cho danh sách commit nên không thể hỏi xác nhận
+        args.yes = True
+
+    from . import main_flow
+
+    # Các luồng logic chính
+    try:
+        if args.force_reset_to:
+            main_flow.handle_force_reset(args.force_reset_to, args.depth, args.filter)
+        else:
+            main_flow.start_sync_flow(args)
+    finally:
+        timings.report(getattr(args, "timings", False), getattr(args, "trace_file", None))
+        if config.get_settings().metrics_textfile:
+            from . import metrics
+            metrics.METRICS.export()
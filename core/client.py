@@ -0,0 +1,82 @@
+# Tệp: core/client.py
+
+# Client của daemon git-sync (xem core/daemon.py). Module này được import ở mỗi
+# lần chạy git-sync nên chỉ dùng os/sys ở cấp module, kể cả typing.
+from __future__ import annotations
+
+import os
+import sys
+
+HEADER_SIZE: int = 8
+
+
+def socket_path() -> str:
+    """Đường dẫn Unix socket của daemon: GIT_SYNC_SOCKET, hoặc trong XDG_RUNTIME_DIR / /tmp."""
+    override = os.environ.get('GIT_SYNC_SOCKET')
+    if override:
+        return override
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or f"/tmp/git-sync-{os.getuid()}"
+    return os.path.join(runtime_dir, 'git-sync.sock')
+
+
+def encode_request(argv: list[str], cwd: str, env: dict[str, str]) -> bytes:
+    """argv, cwd và env dưới dạng các trường phân tách bằng NUL (không cần json ở phía client)."""
+    fields = [str(len(argv)), *argv, cwd, *(f"{k}={v}" for k, v in env.items())]
+    return '\0'.join(fields).encode('utf-8', 'surrogateescape')
+
+
+def decode_request(body: bytes) -> tuple[list[str], str, dict[str, str]]:
+    fields = body.decode('utf-8', 'surrogateescape').split('\0')
+    count = int(fields[0])
+    argv = fields[1:1 + count]
+    cwd = fields[1 + count]
+    env = dict(item.split('=', 1) for item in fields[2 + count:] if '=' in item)
+    return argv, cwd, env
+
+
+def forward(argv: list[str]) -> int | None:
+    """Chuyển lệnh cho daemon nếu daemon đang chạy; trả về exit code, hoặc None để tự chạy.
+
+    Client gửi argv, thư mục hiện tại và biến môi trường, kèm stdin/stdout/stderr
+    của chính nó (SCM_RIGHTS): tiến trình con của daemon in thẳng ra terminal
+    và đọc câu trả lời từ terminal như khi chạy trực tiếp.
+    """
+    if os.name != 'posix' or os.environ.get('GIT_SYNC_NO_DAEMON') or '--daemon' in argv:
+        return None
+    path = socket_path()
+    try:
+        # Chỉ tin socket do chính người dùng hiện tại tạo ra
+        if os.stat(path).st_uid != os.getuid():
+            return None
+    except OSError:
+        return None
+
+    import socket
+
+    payload = encode_request(argv, os.getcwd(), dict(os.environ))
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        socket.send_fds(sock, [len(payload).to_bytes(HEADER_SIZE, 'big') + payload], [0, 1, 2])
+    except OSError:
+        sock.close()
+        return None
+
+    try:
+        reply = b''
+        while not reply.endswith(b'\n'):
+            chunk = sock.recv(64)
+            if not chunk:
+                break
+            reply += chunk
+    except KeyboardInterrupt:
+        # Đóng kết nối: daemon sẽ gửi SIGINT cho tiến trình đang đồng bộ
+        return 130
+    finally:
+        sock.close()
+    try:
+        return int(reply)
+    except ValueError:
+        return 1
@@ -1,53 +1,237 @@
-import configparser
-import json
-import locale
+import marshal
+import os
 import sys  # THÊM DÒNG NÀY ĐỂ SỬA LỖI
+from dataclasses import dataclass, field
 from pathlib import Path
 from argparse import Namespace
-from typing import Any, Dict, Optional, Set
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, List, Optional, Set, Tuple
 from .constants import DEFAULT_PROTECTED_BRANCHES, COMMIT_TYPES
 
+# configparser, json, locale và hashlib được import khi cần: phần lớn các lần chạy
+# chỉ đọc Settings từ cache đã biên dịch và không cần tới chúng.
+if TYPE_CHECKING:
+    import configparser
+
 # --- Biến toàn cục để lưu trữ ngôn ngữ và các chuỗi dịch ---
 LANG: str = 'en'
-_TRANSLATIONS: Dict[str, Any] = {}
+# Bản dịch của ngôn ngữ hiện tại: chuỗi cố định và template cần format
+_PLAIN_MESSAGES: Dict[str, str] = {}
+_TRANSLATIONS: Dict[str, str] = {}
 DEFAULT_COMMIT_TEMPLATE: str = "{type}{scope}: {message}"
+# Số file tối đa liệt kê khi xem lại thay đổi trước khi commit
+DEFAULT_REVIEW_MAX_FILES: int = 10
 
-def load_translations() -> None:
-    """Tải các chuỗi ngôn ngữ từ các file locale."""
-    global _TRANSLATIONS
-    # Đường dẫn tới thư mục gốc của dự án (đi ngược lên 1 cấp từ thư mục core)
-    project_root = Path(__file__).parent.parent
-    locales_dir = project_root / 'locales'
-    lang_file = locales_dir / f"{LANG}.json"
-    fallback_file = locales_dir / 'strings.json'
+# Tăng giá trị này mỗi khi cấu trúc của Settings thay đổi để bỏ qua cache cũ
+_SETTINGS_CACHE_VERSION: int = 5
+_TRANSLATIONS_CACHE_VERSION: int = 1
 
+_SIZE_UNITS: Dict[str, int] = {'': 1, 'b': 1, 'k': 1024, 'kb': 1024, 'm': 1024 ** 2, 'mb': 1024 ** 2, 'g': 1024 ** 3, 'gb': 1024 ** 3}
+
+def parse_size(text: str) -> Optional[int]:
+    """Chuyển '50M', '512k', '1G' hoặc '1048576' thành số byte; None nếu rỗng, 0 hoặc sai định dạng."""
+    raw = text.strip().lower()
+    number = raw.rstrip('kmgb')
+    unit = raw[len(number):]
     try:
-        if lang_file.exists():
-            with open(lang_file, 'r', encoding='utf-8') as f:
-                _TRANSLATIONS = json.load(f)
-        elif fallback_file.exists():
-            with open(fallback_file, 'r', encoding='utf-8') as f:
-                _TRANSLATIONS = json.load(f)
+        value = int(float(number) * _SIZE_UNITS[unit])
+    except (ValueError, KeyError):
+        return None
+    return value if value > 0 else None
+
+@dataclass(frozen=True)
+class Settings:
+    """Ảnh chụp bất biến của cấu hình .gitsyncrc (global + project)."""
+    language: Optional[str] = None
+    protected_branches: FrozenSet[str] = field(default_factory=frozenset)
+    commit_types: Tuple[str, ...] = tuple(COMMIT_TYPES)
+    commit_template: str = DEFAULT_COMMIT_TEMPLATE
+    auto_ticket_from_branch: bool = False
+    pre_sync_hook: Optional[str] = None
+    post_sync_hook: Optional[str] = None
+    commit_aliases: Tuple[Tuple[str, str], ...] = ()
+    max_file_size: Optional[int] = None
+    large_file_policy: str = 'skip'
+    review_max_files: int = DEFAULT_REVIEW_MAX_FILES
+    push_max_attempts: int = 5
+    push_retry_deadline: float = 120.0
+    push_backoff: float = 0.5
+    metrics_textfile: Optional[str] = None
+    metrics_listen: Optional[str] = None
+
+    @property
+    def metrics_enabled(self) -> bool:
+        """Có nơi đọc metrics không ([metrics] textfile hoặc listen)."""
+        return bool(self.metrics_textfile or self.metrics_listen)
+
+    @classmethod
+    def from_parser(cls, config: 'configparser.ConfigParser') -> 'Settings':
+        """Chuyển một ConfigParser đã đọc xong thành Settings."""
+        protected_str = config.get('settings', 'protected_branches', fallback=DEFAULT_PROTECTED_BRANCHES)
+        commit_types = tuple(COMMIT_TYPES)
+        if config.has_option('settings', 'commit_types'):
+            raw = config.get('settings', 'commit_types')
+            commit_types = tuple(c.strip() for c in raw.split(',') if c.strip()) or commit_types
+        try:
+            auto_ticket = config.getboolean('settings', 'auto_ticket_from_branch', fallback=False)
+        except ValueError:
+            auto_ticket = False
+        policy = config.get('settings', 'large_file_policy', fallback='skip').strip().lower()
+        try:
+            review_max_files = max(0, config.getint('settings', 'review_max_files', fallback=DEFAULT_REVIEW_MAX_FILES))
+        except ValueError:
+            review_max_files = DEFAULT_REVIEW_MAX_FILES
+        try:
+            push_max_attempts = max(1, config.getint('settings', 'push_max_attempts', fallback=5))
+        except ValueError:
+            push_max_attempts = 5
+        try:
+            push_retry_deadline = max(0.0, config.getfloat('settings', 'push_retry_deadline', fallback=120.0))
+        except ValueError:
+            push_retry_deadline = 120.0
+        try:
+            push_backoff = max(0.0, config.getfloat('settings', 'push_backoff', fallback=0.5))
+        except ValueError:
+            push_backoff = 0.5
+        metrics_textfile = config.get('metrics', 'textfile', fallback='').strip()
+        aliases: Tuple[Tuple[str, str], ...] = ()
+        if config.has_section('commit_aliases'):
+            aliases = tuple(config.items('commit_aliases'))
+        return cls(
+            language=config.get('settings', 'language', fallback=None),
+            protected_branches=frozenset(branch.strip() for branch in protected_str.split(',')),
+            commit_types=commit_types,
+            commit_template=config.get('settings', 'commit_template', fallback=DEFAULT_COMMIT_TEMPLATE),
+            auto_ticket_from_branch=auto_ticket,
+            pre_sync_hook=config.get('hooks', 'pre_sync', fallback='').strip() or None,
+            post_sync_hook=config.get('hooks', 'post_sync', fallback='').strip() or None,
+            commit_aliases=aliases,
+            max_file_size=parse_size(config.get('settings', 'max_file_size', fallback='')),
+            large_file_policy=policy if policy in ('skip', 'warn') else 'skip',
+            review_max_files=review_max_files,
+            push_max_attempts=push_max_attempts,
+            push_retry_deadline=push_retry_deadline,
+            push_backoff=push_backoff,
+            metrics_textfile=os.path.expanduser(metrics_textfile) if metrics_textfile else None,
+            metrics_listen=config.get('metrics', 'listen', fallback='').strip() or None,
+        )
+
+    def to_primitive(self) -> Dict[str, Any]:
+        """Dạng chỉ gồm kiểu cơ bản để ghi bằng marshal."""
+        return {
+            'language': self.language,
+            'protected_branches': sorted(self.protected_branches),
+            'commit_types': list(self.commit_types),
+            'commit_template': self.commit_template,
+            'auto_ticket_from_branch': self.auto_ticket_from_branch,
+            'pre_sync_hook': self.pre_sync_hook,
+            'post_sync_hook': self.post_sync_hook,
+            'commit_aliases': [list(pair) for pair in self.commit_aliases],
+            'max_file_size': self.max_file_size,
+            'large_file_policy': self.large_file_policy,
+            'review_max_files': self.review_max_files,
+            'push_max_attempts': self.push_max_attempts,
+            'push_retry_deadline': self.push_retry_deadline,
+            'push_backoff': self.push_backoff,
+            'metrics_textfile': self.metrics_textfile,
+            'metrics_listen': self.metrics_listen,
+        }
+
+    @classmethod
+    def from_primitive(cls, data: Dict[str, Any]) -> 'Settings':
+        return cls(
+            language=data['language'],
+            protected_branches=frozenset(data['protected_branches']),
+            commit_types=tuple(data['commit_types']),
+            commit_template=data['commit_template'],
+            auto_ticket_from_branch=data['auto_ticket_from_branch'],
+            pre_sync_hook=data['pre_sync_hook'],
+            post_sync_hook=data['post_sync_hook'],
+            commit_aliases=tuple((alias, target) for alias, target in data['commit_aliases']),
+            max_file_size=data['max_file_size'],
+            large_file_policy=data['large_file_policy'],
+            review_max_files=data['review_max_files'],
+            push_max_attempts=data['push_max_attempts'],
+            push_retry_deadline=data['push_retry_deadline'],
+            push_backoff=data['push_backoff'],
+            metrics_textfile=data['metrics_textfile'],
+            metrics_listen=data['metrics_listen'],
+        )
+
+# Settings đã dựng trong tiến trình này, theo thư mục project
+_SETTINGS: Dict[str, Settings] = {}
+
+def _translation_source() -> Optional[Path]:
+    """File locale sẽ dùng: <LANG>.json nếu có, nếu không thì strings.json (nhiều ngôn ngữ)."""
+    # Đường dẫn tới thư mục gốc của dự án (đi ngược lên 1 cấp từ thư mục core)
+    locales_dir = Path(__file__).parent.parent / 'locales'
+    for candidate in (locales_dir / f"{LANG}.json", locales_dir / 'strings.json'):
+        if candidate.exists():
+            return candidate
+    return None
+
+def compile_translations(source: Path, lang: str) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Biên dịch một file locale thành hai bảng phẳng chỉ của ngôn ngữ `lang`.
+
+    Bảng thứ nhất gồm các chuỗi không có placeholder (trả thẳng, không cần
+    format), bảng thứ hai gồm các template cần `str.format`.
+    """
+    import json
+
+    with open(source, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+    plain: Dict[str, str] = {}
+    templates: Dict[str, str] = {}
+    for key, entry in raw.items():
+        message = entry.get(lang) if isinstance(entry, dict) else entry
+        if not isinstance(message, str):
+            continue
+        if '{' in message or '}' in message:
+            templates[key] = message
         else:
-            print("Error: No locale files found in 'locales' directory.", file=sys.stderr)
-            _TRANSLATIONS = {}
-    except json.JSONDecodeError:
+            plain[key] = message
+    return plain, templates
+
+def load_translations() -> None:
+    """Tải các chuỗi của ngôn ngữ hiện tại, từ cache đã biên dịch nếu file locale chưa đổi."""
+    global _PLAIN_MESSAGES, _TRANSLATIONS
+    source = _translation_source()
+    if source is None:
+        print("Error: No locale files found in 'locales' directory.", file=sys.stderr)
+        _PLAIN_MESSAGES, _TRANSLATIONS = {}, {}
+        return
+
+    signature = _file_signature(source)
+    cache_path = get_cache_dir() / f"translations-{LANG}.marshal"
+    cached = read_cache_file(cache_path)
+    if isinstance(cached, tuple) and len(cached) == 4 and cached[:2] == (_TRANSLATIONS_CACHE_VERSION, signature):
+        _PLAIN_MESSAGES, _TRANSLATIONS = cached[2], cached[3]
+        return
+
+    try:
+        _PLAIN_MESSAGES, _TRANSLATIONS = compile_translations(source, LANG)
+    except ValueError:
+        # json.JSONDecodeError là lớp con của ValueError
         print("Error: Could not decode locale file.", file=sys.stderr)
-        _TRANSLATIONS = {}
+        _PLAIN_MESSAGES, _TRANSLATIONS = {}, {}
+        return
+    write_cache_file(cache_path, (_TRANSLATIONS_CACHE_VERSION, signature, _PLAIN_MESSAGES, _TRANSLATIONS))
 
 def t(key: str, **kwargs: Any) -> str:
     """Hàm thông dịch: lấy chuỗi văn bản theo key và ngôn ngữ đã chọn."""
-    entry = _TRANSLATIONS.get(key)
-    if isinstance(entry, dict):
-        message = entry.get(LANG, f"Missing translation for '{key}'")
-    elif isinstance(entry, str):
-        message = entry
-    else:
-        message = f"Missing translation for '{key}'"
-    return message.format(**kwargs)
+    message = _PLAIN_MESSAGES.get(key)
+    if message is not None:
+        return message
+    template = _TRANSLATIONS.get(key)
+    if template is None:
+        # Ghi nhớ chuỗi báo thiếu để lần gọi sau không phải dựng lại
+        message = _PLAIN_MESSAGES[key] = f"Missing translation for '{key}'"
+        return message
+    return template.format(**kwargs)
 
 def get_system_lang() -> str:
     """Lấy mã ngôn ngữ của hệ thống (ví dụ: 'en' hoặc 'vi')."""
+    import locale
+
     try:
         lang_code, _ = locale.getdefaultlocale()
         return lang_code[:2] if lang_code else 'en'
@@ -57,12 +241,12 @@ def get_system_lang() -> str:
 def initialize_lang(args: Namespace) -> None:
     """Xác định ngôn ngữ sẽ sử dụng theo thứ tự ưu tiên."""
     global LANG
-    config = _load_user_config()
+    settings = get_settings()
     
     if args.lang:
         LANG = args.lang
-    elif config.has_option('settings', 'language'):
-        LANG = config.get('settings', 'language')
+    elif settings.language:
+        LANG = settings.language
     else:
         LANG = get_system_lang()
     
@@ -71,63 +255,123 @@ def initialize_lang(args: Namespace) -> None:
 
 def get_protected_branches() -> Set[str]:
     """Lấy danh sách các branch được bảo vệ từ file config."""
-    config = _load_user_config()
-    fallback_branches = DEFAULT_PROTECTED_BRANCHES
-    protected_str = config.get('settings', 'protected_branches', fallback=fallback_branches)
-    return {branch.strip() for branch in protected_str.split(',')}
+    return set(get_settings().protected_branches)
 
 def get_commit_types() -> list[str]:
     """Lấy danh sách các loại commit, có thể override qua config."""
-    config = _load_user_config()
-    if config.has_option('settings', 'commit_types'):
-        raw = config.get('settings', 'commit_types')
-        types = [c.strip() for c in raw.split(',') if c.strip()]
-        return types or COMMIT_TYPES
-    return COMMIT_TYPES
+    return list(get_settings().commit_types)
 
 def get_commit_template() -> str:
     """Lấy template commit message từ config hoặc dùng mặc định."""
-    config = _load_user_config()
-    return config.get('settings', 'commit_template', fallback=DEFAULT_COMMIT_TEMPLATE)
+    return get_settings().commit_template
 
 def is_auto_ticket_enabled() -> bool:
     """Kiểm tra cờ tự động lấy ticket từ tên branch."""
-    config = _load_user_config()
-    try:
-        return config.getboolean('settings', 'auto_ticket_from_branch', fallback=False)
-    except ValueError:
-        return False
+    return get_settings().auto_ticket_from_branch
 
-def _load_user_config() -> configparser.ConfigParser:
+def _config_paths() -> List[Path]:
+    """Các file .gitsyncrc theo thứ tự đọc (file sau ghi đè file trước)."""
+    return [Path.home() / '.gitsyncrc', Path.cwd() / '.gitsyncrc']
+
+def _load_user_config() -> 'configparser.ConfigParser':
     """Hàm nội bộ để đọc file .gitsyncrc."""
+    import configparser
+
     cfg = configparser.ConfigParser()
-    project_config_path = Path.cwd() / '.gitsyncrc'
-    home_config_path = Path.home() / '.gitsyncrc'
-    cfg.read([home_config_path, project_config_path])
+    cfg.read(_config_paths())
     return cfg
 
+def get_cache_dir() -> Path:
+    """Thư mục cache của git-sync (có thể đổi qua biến môi trường GIT_SYNC_CACHE_DIR)."""
+    override = os.environ.get('GIT_SYNC_CACHE_DIR')
+    if override:
+        return Path(override)
+    xdg_cache = os.environ.get('XDG_CACHE_HOME')
+    base = Path(xdg_cache) if xdg_cache else Path.home() / '.cache'
+    return base / 'git-sync'
+
+def write_cache_file(path: Path, payload: Any) -> None:
+    """Ghi nguyên tử một giá trị marshal vào cache; lỗi ghi được bỏ qua."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            marshal.dump(payload, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+def read_cache_file(path: Path) -> Any:
+    """Đọc một giá trị marshal từ cache, trả về None nếu không có hoặc bị hỏng."""
+    try:
+        with open(path, 'rb') as f:
+            return marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+def _file_signature(path: Path) -> Tuple[str, int, int]:
+    """Khoá cache của một file: (đường dẫn, mtime_ns, kích thước); -1 nếu không tồn tại."""
+    try:
+        st = path.stat()
+    except OSError:
+        return str(path), -1, -1
+    return str(path), st.st_mtime_ns, st.st_size
+
+def _load_settings() -> Settings:
+    """Dựng Settings từ cache đã biên dịch, chỉ parse INI khi file config thay đổi."""
+    import hashlib
+
+    signature = tuple(_file_signature(p) for p in _config_paths())
+    digest = hashlib.sha1(str(Path.cwd()).encode('utf-8')).hexdigest()[:16]
+    cache_path = get_cache_dir() / f"settings-{digest}.marshal"
+
+    cached = read_cache_file(cache_path)
+    if isinstance(cached, tuple) and len(cached) == 3 and cached[:2] == (_SETTINGS_CACHE_VERSION, signature):
+        try:
+            return Settings.from_primitive(cached[2])
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    settings = Settings.from_parser(_load_user_config())
+    write_cache_file(cache_path, (_SETTINGS_CACHE_VERSION, signature, settings.to_primitive()))
+    return settings
+
+def get_settings() -> Settings:
+    """Trả về Settings dùng chung cho cả tiến trình (dựng một lần cho mỗi project)."""
+    key = str(Path.cwd())
+    settings = _SETTINGS.get(key)
+    if settings is None:
+        settings = _load_settings()
+        _SETTINGS[key] = settings
+    return settings
+
+def reset_settings() -> None:
+    """Bỏ Settings đã dựng trong tiến trình, lần gọi sau sẽ đọc lại."""
+    _SETTINGS.clear()
+
+def reset_translations() -> None:
+    """Quay về ngôn ngữ mặc định và bỏ các chuỗi đã tải; initialize_lang sẽ tải lại."""
+    global LANG, _PLAIN_MESSAGES, _TRANSLATIONS
+    LANG = 'en'
+    _PLAIN_MESSAGES, _TRANSLATIONS = {}, {}
+
 def get_pre_sync_hook() -> Optional[str]:
     """Lấy lệnh pre_sync hook (nếu có) từ file config."""
-    config = _load_user_config()
-    cmd = config.get('hooks', 'pre_sync', fallback='').strip()
-    return cmd or None
+    return get_settings().pre_sync_hook
 
 def get_post_sync_hook() -> Optional[str]:
     """Lấy lệnh post_sync hook (nếu có) từ file config."""
-    config = _load_user_config()
-    cmd = config.get('hooks', 'post_sync', fallback='').strip()
-    return cmd or None
+    return get_settings().post_sync_hook
 
 def get_commit_aliases() -> Dict[str, str]:
     """Đọc các bí danh của loại commit từ file .gitsyncrc."""
-    config = _load_user_config()
-    if config.has_section('commit_aliases'):
-        # Trả về một dictionary, ví dụ: {'ref': 'refactor', 'test': 'test'}
-        return {alias: target for alias, target in config.items('commit_aliases')}
-    return {}
+    # Trả về một dictionary, ví dụ: {'ref': 'refactor', 'test': 'test'}
+    return dict(get_settings().commit_aliases)
 
 def set_language_config(lang: str) -> None:
     """Ghi đè cài đặt ngôn ngữ vào file .gitsyncrc global."""
+    import configparser
+
     home_config_path = Path.home() / '.gitsyncrc'
     config = configparser.ConfigParser()
     
@@ -144,5 +388,6 @@ def set_language_config(lang: str) -> None:
     # Ghi lại toàn bộ file config
     with open(home_config_path, 'w', encoding='utf-8') as configfile:
         config.write(configfile)
+    reset_settings()
         
     print(t('set_lang_success', lang=lang.upper()))
\ No newline at end of file
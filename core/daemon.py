@@ -0,0 +1,301 @@
+# Tệp: core/daemon.py
+
+import os
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from .client import HEADER_SIZE, decode_request, socket_path
+
+_MAX_REQUEST_SIZE: int = 1 << 20
+# Client gửi yêu cầu ngay sau khi kết nối; quá thời gian này thì bỏ, để vòng accept không bị một client treo giữ lại
+_REQUEST_TIMEOUT: float = 1.0
+
+
+class RepoScheduler:
+    """Mỗi repo chỉ chạy một yêu cầu tại một thời điểm; các repo khác nhau chạy song song."""
+
+    def __init__(self) -> None:
+        self.running: Dict[str, Any] = {}
+        self.waiting: Dict[str, Deque[Any]] = {}
+
+    def submit(self, key: str, item: Any) -> bool:
+        """Xếp một yêu cầu; True nếu có thể chạy ngay."""
+        if key in self.running:
+            self.waiting.setdefault(key, deque()).append(item)
+            return False
+        self.running[key] = item
+        return True
+
+    def finish(self, key: str) -> Optional[Any]:
+        """Đánh dấu yêu cầu của repo đã xong; trả về yêu cầu kế tiếp (đã chuyển sang chạy) nếu có."""
+        self.running.pop(key, None)
+        queue = self.waiting.get(key)
+        if not queue:
+            self.waiting.pop(key, None)
+            return None
+        item = queue.popleft()
+        self.running[key] = item
+        return item
+
+    def discard(self, key: str, item: Any) -> None:
+        """Bỏ một yêu cầu còn đang chờ (client đã ngắt kết nối)."""
+        queue = self.waiting.get(key)
+        if queue and item in queue:
+            queue.remove(item)
+
+
+def repo_key(cwd: str) -> str:
+    """Khoá tuần tự hoá: thư mục .git của repo chứa `cwd` (hoặc chính `cwd` nếu không phải repo)."""
+    from .git_broker import find_git_dir
+
+    git_dir = find_git_dir(Path(cwd))
+    return str(git_dir) if git_dir is not None else os.path.realpath(cwd)
+
+
+class _Request:
+    """Một lệnh từ client: kết nối điều khiển, các fd của terminal và nội dung yêu cầu."""
+
+    def __init__(self, conn: Any, fds: List[int], argv: List[str], cwd: str, env: Dict[str, str]) -> None:
+        self.conn = conn
+        self.fds = fds
+        self.argv = argv
+        self.cwd = cwd
+        self.env = env
+        self.key = repo_key(cwd)
+        self.pid: Optional[int] = None
+        self.start = time.monotonic()
+
+    def close(self) -> None:
+        for fd in self.fds:
+            os.close(fd)
+        self.fds = []
+        self.conn.close()
+
+
+def _read_request(conn: Any) -> Optional[_Request]:
+    import socket
+
+    conn.settimeout(_REQUEST_TIMEOUT)
+    fds: List[int] = []
+    try:
+        data, fds, _, _ = socket.recv_fds(conn, 65536, 3)
+        if len(fds) != 3 or len(data) < HEADER_SIZE:
+            raise ValueError('incomplete request')
+        size = int.from_bytes(data[:HEADER_SIZE], 'big')
+        body = data[HEADER_SIZE:]
+        while len(body) < size <= _MAX_REQUEST_SIZE:
+            chunk = conn.recv(size - len(body))
+            if not chunk:
+                break
+            body += chunk
+        argv, cwd, env = decode_request(body)
+        request = _Request(conn, fds, argv, cwd, env)
+    except (OSError, ValueError, IndexError):
+        # OSError gồm cả socket.timeout
+        for fd in fds:
+            os.close(fd)
+        return None
+    conn.settimeout(None)
+    return request
+
+
+def _run_child(request: _Request, handler: Callable[[List[str]], None]) -> None:
+    """Trong tiến trình con (đã fork): nhận terminal của client rồi chạy lệnh. Không bao giờ return."""
+    from . import config
+
+    code = 1
+    try:
+        for target, fd in enumerate(request.fds):
+            os.dup2(fd, target)
+        os.chdir(request.cwd)
+        os.environ.clear()
+        os.environ.update(request.env)
+        # Settings và ngôn ngữ của daemon lúc khởi động không còn đúng: đọc lại (qua cache trên đĩa) cho mỗi lệnh
+        config.reset_settings()
+        config.reset_translations()
+        sys.stdin = open(0, 'r', encoding='utf-8', closefd=False)
+        sys.stdout = open(1, 'w', encoding='utf-8', buffering=1, closefd=False)
+        sys.stderr = open(2, 'w', encoding='utf-8', buffering=1, closefd=False)
+        sys.argv = [sys.argv[0], *request.argv]
+        handler(request.argv)
+        code = 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except KeyboardInterrupt:
+        code = 130
+    except BaseException as e:
+        print(e, file=sys.stderr)
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def serve(handler: Callable[[List[str]], None], path: Optional[str] = None) -> int:
+    """Chạy daemon: nhận lệnh qua Unix socket, fork một tiến trình con đã nạp sẵn mọi thứ cho mỗi lệnh."""
+    import selectors
+    import signal
+    import socket
+
+    from .config import t, load_translations
+
+    if not hasattr(os, 'fork') or not hasattr(socket, 'AF_UNIX'):
+        print(t('daemon_unsupported'), file=sys.stderr)
+        return 1
+
+    path = path or socket_path()
+    Path(path).parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.unlink(path)  # Socket cũ của một daemon đã chết
+        else:
+            print(t('daemon_already_running', path=path), file=sys.stderr)
+            return 1
+        finally:
+            probe.close()
+
+    # Nạp sẵn những gì mỗi lần đồng bộ đều cần; tiến trình con thừa hưởng qua fork
+    # (main_flow chỉ import kế hoạch, fetch nền, metrics... khi cần nên phải nạp riêng)
+    from . import async_engine, events, main_flow, metrics, multi_repo, plan, retry, review, upstream  # noqa: F401
+    load_translations()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(old_umask)
+    server.listen(64)
+    server.setblocking(False)
+
+    # SIGCHLD/SIGTERM đánh thức vòng lặp qua một pipe
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_r, False)
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    stopping: List[bool] = []
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ, 'accept')
+    selector.register(wake_r, selectors.EVENT_READ, 'wake')
+    scheduler = RepoScheduler()
+    by_pid: Dict[int, _Request] = {}
+
+    def _unregister(conn: Any) -> None:
+        try:
+            selector.unregister(conn)
+        except (KeyError, ValueError):
+            pass
+
+    def log(message: str) -> None:
+        print(f"[{time.strftime('%H:%M:%S')}] {message}", file=sys.stderr, flush=True)
+
+    def start(request: _Request) -> None:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            # Tiến trình con không giữ kết nối và terminal của các client khác
+            for registered in list(selector.get_map().values()):
+                if isinstance(registered.data, _Request) and registered.data is not request:
+                    registered.data.close()
+            selector.close()
+            server.close()
+            signal.set_wakeup_fd(-1)
+            os.close(wake_r)
+            os.close(wake_w)
+            for sig in (signal.SIGCHLD, signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            _run_child(request, handler)
+        request.pid = pid
+        by_pid[pid] = request
+        log(t('daemon_request_started', pid=pid, cwd=request.cwd, argv=' '.join(request.argv)))
+
+    def reap() -> None:
+        while by_pid:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            request = by_pid.pop(pid, None)
+            if request is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            code = 128 - code if code < 0 else code
+            log(t('daemon_request_finished', pid=pid, code=code, seconds=f"{time.monotonic() - request.start:.2f}"))
+            try:
+                request.conn.sendall(f"{code}\n".encode('ascii'))
+            except OSError:
+                pass
+            _unregister(request.conn)
+            request.close()
+            following = scheduler.finish(request.key)
+            if following is not None:
+                start(following)
+
+    log(t('daemon_listening', path=path, pid=os.getpid()))
+    try:
+        while not stopping:
+            for selected, _ in selector.select():
+                if selected.data == 'wake':
+                    try:
+                        while os.read(wake_r, 512):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    reap()
+                elif selected.data == 'accept':
+                    try:
+                        conn, _ = server.accept()
+                    except BlockingIOError:
+                        continue
+                    request = _read_request(conn)
+                    if request is None:
+                        conn.close()
+                        continue
+                    selector.register(conn, selectors.EVENT_READ, request)
+                    if scheduler.submit(request.key, request):
+                        start(request)
+                    else:
+                        log(t('daemon_request_queued', cwd=request.cwd))
+                else:
+                    # Client gửi thêm dữ liệu hoặc đóng kết nối (Ctrl-C): dừng yêu cầu của nó
+                    request = selected.data
+                    try:
+                        closed = not request.conn.recv(64)
+                    except OSError:
+                        closed = True
+                    if not closed:
+                        continue
+                    _unregister(request.conn)
+                    if request.pid is not None:
+                        log(t('daemon_request_cancelled', pid=request.pid))
+                        os.kill(request.pid, signal.SIGINT)
+                    else:
+                        scheduler.discard(request.key, request)
+                        request.close()
+    finally:
+        for pid in by_pid:
+            os.kill(pid, signal.SIGTERM)
+        selector.close()
+        server.close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        log(t('daemon_stopped'))
+    return 0
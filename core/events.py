@@ -0,0 +1,104 @@
+# Tệp: core/events.py
+
+import contextlib
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+from .git_utils import run_command
+from .timings import RECORDER
+
+# Phiên bản định dạng sự kiện; tăng khi đổi tên/ý nghĩa trường đã có
+EVENT_SCHEMA: int = 1
+
+
+class EventStream:
+    """Luồng sự kiện JSON-lines cho --output=jsonl: mỗi dòng một object, không ANSI, không dịch.
+
+    Các loại sự kiện:
+    - `start`: branch, HEAD và số thay đổi lúc bắt đầu.
+    - `phase` / `command`: mỗi pha và mỗi lệnh đã chạy (lấy từ RECORDER), kèm thời gian.
+    - `push`: kết quả push (`ok` / `failed`), số lần thử và số lần thử lại.
+    - `repo`: kết quả từng repo trong chế độ nhiều repo.
+    - `result`: luôn là dòng cuối; exit code, `outcome`, HEAD sau khi đồng bộ, các bộ đếm.
+    """
+
+    def __init__(self) -> None:
+        self.out: Optional[TextIO] = None
+        self.outcome: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.out is not None
+
+    def emit(self, event: str, **fields: Any) -> None:
+        if self.out is None:
+            return
+        import json
+
+        record = {'event': event, 'ts': round(time.time(), 3), **fields}
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str)
+        with self._lock:
+            self.out.write(line + '\n')
+            self.out.flush()
+
+    def forward(self, line: str, **extra: Any) -> None:
+        """Phát lại một sự kiện của tiến trình con (chế độ nhiều repo), thêm các trường `extra`."""
+        import json
+
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return
+        if isinstance(record, dict) and 'event' in record:
+            self.emit(**{**record, **extra})
+
+    def set_outcome(self, outcome: str) -> None:
+        """Ghi kết quả của lần chạy (luôn ghi, kể cả khi luồng tắt: metrics cũng dùng nó)."""
+        self.outcome = outcome
+
+    def final_outcome(self, exit_code: int) -> str:
+        return self.outcome or ('success' if exit_code == 0 else 'failed')
+
+    def record(self, kind: str, fields: Dict[str, Any]) -> None:
+        """Listener của RECORDER: mỗi pha/lệnh vừa kết thúc thành một sự kiện."""
+        self.emit(kind, **fields)
+
+    @contextlib.contextmanager
+    def session(self) -> Iterator[None]:
+        """Bật luồng sự kiện trên stdout; mọi output cho người đọc chuyển sang stderr.
+
+        Dòng `result` luôn được ghi khi kết thúc, kể cả khi thoát bằng sys.exit
+        hoặc lỗi ngoài dự kiến.
+        """
+        real_stdout = sys.stdout
+        self.out, self.outcome = real_stdout, None
+        RECORDER.enable()
+        RECORDER.listener = self.record
+        sys.stdout = sys.stderr
+        exit_code = 0
+        try:
+            yield
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            raise
+        except BaseException:
+            exit_code = 1
+            raise
+        finally:
+            sys.stdout = real_stdout
+            RECORDER.listener = None
+            code, head = run_command(['git', 'rev-parse', '--verify', '-q', 'HEAD'], echo=False)
+            self.emit(
+                'result', schema=EVENT_SCHEMA, exit_code=exit_code,
+                outcome=self.final_outcome(exit_code),
+                head=head if code == 0 and head else None,
+                duration_ms=round((time.perf_counter() - RECORDER.origin) * 1000, 1),
+                counters=dict(RECORDER.counters),
+            )
+            self.out = None
+
+
+EVENTS = EventStream()
@@ -0,0 +1,177 @@
+# Tệp: core/fast_status.py
+
+import os
+import struct
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from .config import t
+from .console import colorize
+from .git_broker import find_git_dir
+from .git_utils import run_command
+from .timings import RECORDER, phase
+
+# Từ bao nhiêu file được theo dõi thì mới gợi ý bật fsmonitor/untracked cache
+LARGE_TREE_ENTRIES: int = 50_000
+# Ghi vào config của repo khi người dùng từ chối, để không hỏi lại
+DECLINED_KEY: str = 'git-sync.fastStatus'
+_CONFIG_QUERY: List[str] = [
+    'git', 'config', '--get-regexp', r'^(core\.fsmonitor|core\.untrackedcache|git-sync\.faststatus)$',
+]
+_FALSE_VALUES = ('', 'false', '0', 'no', 'off')
+
+
+def index_entry_count(git_dir: Path) -> Optional[int]:
+    """Số file trong index, đọc từ 12 byte đầu của .git/index (không phụ thuộc kích thước repo)."""
+    try:
+        with open(git_dir / 'index', 'rb') as handle:
+            header = handle.read(12)
+    except OSError:
+        return None
+    if len(header) != 12 or header[:4] != b'DIRC':
+        return None
+    return struct.unpack('>I', header[8:12])[0]
+
+
+@dataclass(frozen=True)
+class FastPathConfig:
+    """Cấu hình đường nhanh của `git status` trong repo hiện tại."""
+    fsmonitor: bool = False
+    untracked_cache: bool = False
+    declined: bool = False
+
+
+def read_fast_path_config() -> FastPathConfig:
+    code, output = run_command(_CONFIG_QUERY, echo=False)
+    values = {}
+    for line in output.splitlines() if code == 0 else ():
+        key, _, value = line.partition(' ')
+        values[key.lower()] = value.strip().lower() not in _FALSE_VALUES
+    return FastPathConfig(
+        fsmonitor=values.get('core.fsmonitor', False),
+        untracked_cache=values.get('core.untrackedcache', False),
+        declined=DECLINED_KEY.lower() in values and not values[DECLINED_KEY.lower()],
+    )
+
+
+def builtin_fsmonitor_supported() -> bool:
+    """Bản git này có fsmonitor--daemon dựng sẵn hay không (không cần hook như Watchman)."""
+    code, output = run_command(['git', 'version', '--build-options'], echo=False)
+    return code == 0 and 'fsmonitor--daemon' in output
+
+
+def missing_settings(config: FastPathConfig, builtin_fsmonitor: bool) -> List[str]:
+    missing = [] if config.untracked_cache else ['core.untrackedCache']
+    if not config.fsmonitor and builtin_fsmonitor:
+        missing.append('core.fsmonitor')
+    return missing
+
+
+def offer_fast_status(assume_yes: bool = False) -> None:
+    """Với repo rất lớn, gợi ý bật fsmonitor và untracked cache (mỗi repo chỉ hỏi một lần).
+
+    Repo nhỏ chỉ tốn một lần đọc header của index. Với -y chỉ in gợi ý: không
+    tự ý sửa cấu hình repo khi người dùng chưa đồng ý.
+    """
+    git_dir = find_git_dir()
+    entries = index_entry_count(git_dir) if git_dir is not None else None
+    if entries is None or entries < LARGE_TREE_ENTRIES:
+        return
+    config = read_fast_path_config()
+    if config.declined:
+        return
+    missing = missing_settings(config, not config.fsmonitor and builtin_fsmonitor_supported())
+    if not missing:
+        return
+
+    print(colorize(t('fast_status_hint', files=entries, settings=', '.join(missing)), 'warning'))
+    if assume_yes:
+        return
+    with phase('prompt'):
+        answer = input(t('fast_status_prompt'))
+    if answer.strip().lower() not in ('y', 'yes'):
+        run_command(['git', 'config', DECLINED_KEY, 'false'], echo=False)
+        print(colorize(t('fast_status_declined', key=DECLINED_KEY), 'info'))
+        return
+    for key in missing:
+        if run_command(['git', 'config', key, 'true'], echo=False)[0] != 0:
+            print(colorize(t('fast_status_enable_failed', key=key), 'error'), file=sys.stderr)
+            return
+    print(colorize(t('fast_status_enabled', settings=', '.join(missing)), 'success'))
+
+
+@dataclass
+class StatusTrace:
+    """Những gì trace2 của git cho biết về một lần `git status`."""
+    entries: int = 0
+    lstat: int = 0
+    fsmonitor: bool = False
+    untracked_cache: bool = False
+    opendir: int = 0
+
+
+def parse_status_trace(lines: Iterable[str]) -> StatusTrace:
+    """Đọc các sự kiện GIT_TRACE2_EVENT (JSON mỗi dòng).
+
+    - fsmonitor được dùng nếu có sự kiện thuộc nhóm `fsm_*` mà không phải câu
+      trả lời "trivial" (daemon chưa chạy, git vẫn phải stat mọi file).
+    - untracked cache được dùng nếu git báo thống kê của nó (`opendir`: số thư
+      mục vẫn phải đọc lại).
+    """
+    import json
+
+    trace = StatusTrace()
+    trivial = False
+    for line in lines:
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        category = event.get('category') or ''
+        if category.startswith('fsm'):
+            trace.fsmonitor = True
+        if event.get('event') != 'data':
+            continue
+        key, value = event.get('key'), str(event.get('value', ''))
+        number = int(value) if value.isdigit() else 0
+        if category == 'index' and key == 'read/cache_nr':
+            trace.entries = number
+        elif category == 'index' and key == 'refresh/sum_lstat':
+            trace.lstat += number
+        elif category == 'read_directory' and key == 'opendir':
+            trace.untracked_cache = True
+            trace.opendir += number
+        elif key == 'query/trivial-response':
+            trivial = True
+    trace.fsmonitor = trace.fsmonitor and not trivial
+    return trace
+
+
+def record_status_trace(trace: StatusTrace) -> None:
+    RECORDER.increment('status_calls')
+    RECORDER.increment('status_entries', trace.entries)
+    RECORDER.increment('status_lstat', trace.lstat)
+    RECORDER.increment('status_fsmonitor', int(trace.fsmonitor))
+    RECORDER.increment('status_untracked_cache', int(trace.untracked_cache))
+    RECORDER.increment('status_opendir', trace.opendir)
+
+
+def run_traced_status(command: Sequence[str]) -> Tuple[int, str]:
+    """Chạy `git status` với trace2 bật (chỉ khi --timings) để biết nó có đi đường nhanh không."""
+    import tempfile
+
+    handle, path = tempfile.mkstemp(prefix='git-sync-status-', suffix='.trace')
+    os.close(handle)
+    try:
+        # Thống kê của untracked cache nằm sâu trong các region nên cần tăng giới hạn lồng nhau
+        code, output = run_command(command, env={'GIT_TRACE2_EVENT': path, 'GIT_TRACE2_EVENT_NESTING': '10'})
+        with open(path, encoding='utf-8', errors='replace') as trace_file:
+            record_status_trace(parse_status_trace(trace_file))
+    except OSError:
+        pass
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+    return code, output
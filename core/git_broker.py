@@ -0,0 +1,178 @@
+# Tệp: core/git_broker.py
+
+import atexit
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+# Các subcommand git chỉ đọc trạng thái, không bao giờ ghi vào repo
+_READ_ONLY_SUBCOMMANDS = frozenset({
+    'cat-file',
+    'diff',
+    'for-each-ref',
+    'log',
+    'ls-files',
+    'merge-base',
+    'rev-list',
+    'rev-parse',
+    'show',
+    'show-ref',
+    'status',
+    'version',
+})
+
+_REV_PARSE_FLAGS = frozenset({'--verify', '-q', '--quiet'})
+
+
+def is_read_only(command: Sequence[str]) -> bool:
+    """Kiểm tra một lệnh git có chắc chắn không thay đổi repo hay không."""
+    if len(command) < 2 or command[0] != 'git':
+        return False
+    sub, rest = command[1], list(command[2:])
+    if sub in _READ_ONLY_SUBCOMMANDS:
+        return True
+    if sub == 'branch':
+        return rest in (['--show-current'], ['--list'], [])
+    if sub == 'remote':
+        return rest in ([], ['-v'], ['show', '-n'])
+    if sub == 'config':
+        return bool(rest) and rest[0] in ('--get', '--get-all', '--get-regexp', '--list', '-l')
+    return False
+
+
+def find_git_dir(start: Optional[Path] = None) -> Optional[Path]:
+    """Tìm thư mục .git của repo chứa `start` (hỗ trợ cả worktree dùng file .git)."""
+    current = (start or Path.cwd()).resolve()
+    for folder in (current, *current.parents):
+        dot_git = folder / '.git'
+        if dot_git.is_dir():
+            return dot_git
+        if dot_git.is_file():
+            content = dot_git.read_text(encoding='utf-8').strip()
+            if content.startswith('gitdir:'):
+                git_dir = Path(content[len('gitdir:'):].strip())
+                return git_dir if git_dir.is_absolute() else (folder / git_dir).resolve()
+    return None
+
+
+class _CatFilePipe:
+    """Một tiến trình `git cat-file --batch-check` sống lâu để phân giải revision."""
+
+    def __init__(self, cwd: str) -> None:
+        self._proc = subprocess.Popen(
+            ['git', 'cat-file', '--batch-check'],
+            cwd=cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding='utf-8',
+        )
+
+    def resolve(self, rev: str) -> Optional[str]:
+        if self._proc.poll() is not None or self._proc.stdin is None or self._proc.stdout is None:
+            return None
+        self._proc.stdin.write(rev + '\n')
+        self._proc.stdin.flush()
+        line = self._proc.stdout.readline().strip()
+        # Định dạng: "<sha> <type> <size>" hoặc "<rev> missing" / "<rev> ambiguous"
+        parts = line.split()
+        if len(parts) == 3:
+            return parts[0]
+        return None
+
+    def close(self) -> None:
+        if self._proc.poll() is None:
+            if self._proc.stdin:
+                self._proc.stdin.close()
+            self._proc.wait()
+
+
+class GitBroker:
+    """Trả lời các truy vấn git chỉ đọc trong tiến trình hoặc qua pipe sống lâu.
+
+    Kết quả được cache theo thư mục làm việc và bị xoá ngay khi có một lệnh
+    có thể thay đổi repo được thực thi (xem `invalidate`).
+    """
+
+    def __init__(self) -> None:
+        self._cache: Dict[Tuple[str, Tuple[str, ...]], Tuple[int, str]] = {}
+        # run_command có thể được gọi từ nhiều thread (fetch nền, các bước song song)
+        self._lock = threading.RLock()
+        self._pipes: Dict[str, _CatFilePipe] = {}
+        self.spawn_count: int = 0
+        self.hits: int = 0
+
+    def query(self, command: Sequence[str]) -> Optional[Tuple[int, str]]:
+        """Trả về (mã lỗi, output) nếu broker tự trả lời được, ngược lại None."""
+        key = (os.getcwd(), tuple(command))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is None:
+                cached = self._answer(list(command))
+                if cached is None:
+                    return None
+                self._cache[key] = cached
+            self.hits += 1
+            return cached
+
+    def invalidate(self) -> None:
+        """Xoá toàn bộ cache; gọi sau mỗi lệnh có thể ghi vào repo."""
+        with self._lock:
+            self._cache.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            for pipe in self._pipes.values():
+                pipe.close()
+            self._pipes.clear()
+
+    def _answer(self, command: Sequence[str]) -> Optional[Tuple[int, str]]:
+        if command == ['git', 'branch', '--show-current']:
+            head = self._read_head()
+            if head is None:
+                return None
+            return 0, head[len('refs/heads/'):] if head.startswith('refs/heads/') else ''
+        if command == ['git', 'rev-parse', '--abbrev-ref', 'HEAD']:
+            head = self._read_head()
+            if head is None or not head.startswith('refs/heads/'):
+                return None
+            return 0, head[len('refs/heads/'):]
+        if len(command) >= 3 and command[1] == 'rev-parse':
+            flags, revs = command[2:-1], command[-1]
+            if revs.startswith('-') or not set(flags) <= _REV_PARSE_FLAGS:
+                return None
+            sha = self._resolve(revs)
+            return (0, sha) if sha else None
+        return None
+
+    def _read_head(self) -> Optional[str]:
+        """Đọc trực tiếp .git/HEAD: trả về tên ref, hoặc chuỗi rỗng khi HEAD bị detached."""
+        git_dir = find_git_dir()
+        if git_dir is None:
+            return None
+        try:
+            content = (git_dir / 'HEAD').read_text(encoding='utf-8').strip()
+        except OSError:
+            return None
+        if content.startswith('ref:'):
+            return content[len('ref:'):].strip()
+        return ''
+
+    def _resolve(self, rev: str) -> Optional[str]:
+        cwd = os.getcwd()
+        pipe = self._pipes.get(cwd)
+        if pipe is None:
+            try:
+                pipe = _CatFilePipe(cwd)
+            except OSError:
+                return None
+            self.spawn_count += 1
+            self._pipes[cwd] = pipe
+        return pipe.resolve(rev)
+
+
+BROKER = GitBroker()
+atexit.register(BROKER.close)
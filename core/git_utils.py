@@ -1,28 +1,130 @@
+import codecs
+import os
+import re
 import subprocess
 import sys
-from typing import Optional, Sequence, Tuple
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Sequence, Set, Tuple
 from .config import t
+from .git_broker import BROKER, is_read_only
+from .timings import RECORDER
 
 DRY_RUN: bool = False
+# Số tiến trình con đã được fork bởi run_command (không tính pipe của broker)
+_SPAWN_COUNT: int = 0
+
+# Các mẫu lỗi mà caller thường cần biết sau khi push/pull (tên -> chuỗi con cần tìm)
+PUSH_FAILURE_PATTERNS: Dict[str, str] = {
+    'rejected': 'rejected',
+    'non_fast_forward': 'non-fast-forward',
+    'fetch_first': 'fetch first',
+    'conflict': 'CONFLICT',
+    'atomic_unsupported': 'does not support --atomic',
+    # Hai lần push chồng lên nhau trên server: ref đã đổi giữa lúc quảng bá và lúc cập nhật
+    'lock_failed': 'cannot lock ref',
+    'update_ref_failed': 'failed to update ref',
+}
+
+# Dòng tiến trình của git, ví dụ: "Writing objects:  45% (9/20), 1.20 MiB | 3.40 MiB/s"
+_PROGRESS_RE = re.compile(r'^(?:remote: )?[A-Za-z ]+:\s+\d+% \(\d+/\d+\)')
+# Chuỗi điều khiển ANSI (CSI như "\x1b[K" mà remote gửi kèm, OSC, và các escape hai ký tự)
+_ANSI_RE = re.compile(r'\x1b(?:\[[0-?]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])')
+_STREAM_CHUNK_SIZE: int = 8192
+
+@dataclass
+class StreamResult:
+    """Kết quả của stream_command: chỉ giữ phần đuôi output và các mẫu đã khớp."""
+    returncode: int
+    tail: List[str] = field(default_factory=list)
+    matches: Set[str] = field(default_factory=set)
+    bytes_read: int = 0
+
+    @property
+    def output(self) -> str:
+        return "\n".join(self.tail)
 
 def set_dry_run(enabled: bool) -> None:
     """Bật/tắt chế độ dry-run cho các lệnh git."""
     global DRY_RUN
     DRY_RUN = enabled
 
-def run_command(command: Sequence[str], capture: bool = True) -> Tuple[int, str]:
-    """Thực thi một lệnh hệ thống và trả về mã lỗi cùng output."""
+def get_spawn_count() -> int:
+    """Tổng số tiến trình con đã được tạo, kể cả các pipe sống lâu của broker."""
+    return _SPAWN_COUNT + BROKER.spawn_count
+
+def reset_spawn_count() -> None:
+    """Đặt lại bộ đếm tiến trình (dùng cho đo đạc và test)."""
+    global _SPAWN_COUNT
+    _SPAWN_COUNT = 0
+    BROKER.spawn_count = 0
+
+def run_command(
+    command: Sequence[str],
+    capture: bool = True,
+    echo: bool = True,
+    input_data: Optional[str] = None,
+    detached: bool = False,
+    env: Optional[Dict[str, str]] = None,
+) -> Tuple[int, str]:
+    """Thực thi một lệnh hệ thống và trả về mã lỗi cùng output.
+
+    Với `echo=False`, output được trả về cho caller nhưng không in ra màn hình
+    (dùng cho các truy vấn nội bộ như for-each-ref, rev-parse). `input_data`
+    được ghi vào stdin của tiến trình (ví dụ danh sách pathspec cho git add).
+    Với `detached=True`, tiến trình chạy trong session riêng, không có stdin và
+    không được hỏi mật khẩu (dùng cho các lệnh chạy nền). `env` bổ sung biến
+    môi trường cho riêng lệnh này (ví dụ GIT_INDEX_FILE); lệnh có `env` không
+    bao giờ được broker trả lời thay.
+    """
+    if not RECORDER.enabled:
+        return _run_command(command, capture, echo, input_data, detached, env)
+    start = time.perf_counter()
+    spawned_before = _SPAWN_COUNT
+    code, output = _run_command(command, capture, echo, input_data, detached, env)
+    RECORDER.record_command(command, start, _SPAWN_COUNT > spawned_before, len(output), code)
+    return code, output
+
+def _run_command(
+    command: Sequence[str],
+    capture: bool,
+    echo: bool,
+    input_data: Optional[str],
+    detached: bool = False,
+    env: Optional[Dict[str, str]] = None,
+) -> Tuple[int, str]:
+    global _SPAWN_COUNT
     try:
         cmd_str = " ".join(command)
         is_utility = any(util in cmd_str for util in ['git branch', 'git status'])
+        read_only = is_read_only(command)
 
-        # Trong chế độ dry-run, với các lệnh git không phải utility, chỉ in ra mà không thực thi
-        if DRY_RUN and command and command[0] == 'git' and not is_utility:
+        # Truy vấn chỉ đọc có thể được broker trả lời mà không cần fork tiến trình mới
+        if read_only and env is None:
+            answer = BROKER.query(command)
+            if answer is not None:
+                return answer
+
+        # Trong chế độ dry-run, lệnh git có thể thay đổi repo chỉ được in ra mà không thực thi
+        if DRY_RUN and command and command[0] == 'git' and not read_only:
             print(f"[DRY-RUN] {cmd_str}")
             return 0, ""
 
-        result = subprocess.run(command, check=False, capture_output=capture, text=True, encoding='utf-8')
-        if capture and not is_utility:
+        if not read_only:
+            BROKER.invalidate()
+        _SPAWN_COUNT += 1
+        extra: Dict[str, Any] = {} if input_data is None else {'input': input_data}
+        if detached:
+            extra.update(
+                stdin=subprocess.DEVNULL,
+                start_new_session=True,
+                env={**os.environ, **(env or {}), 'GIT_TERMINAL_PROMPT': '0'},
+            )
+        elif env:
+            extra['env'] = {**os.environ, **env}
+        result = subprocess.run(command, check=False, capture_output=capture, text=True, encoding='utf-8', **extra)
+        if capture and echo and not is_utility:
             if result.stdout: print(result.stdout, end='')
             if result.stderr: print(result.stderr, file=sys.stderr, end='')
         return result.returncode, result.stdout.strip() + result.stderr.strip()
@@ -33,6 +135,159 @@ def run_command(command: Sequence[str], capture: bool = True) -> Tuple[int, str]
         print(t('unexpected_error', error=str(e)), file=sys.stderr)
         return -1, ""
 
+async def run_command_async(
+    command: Sequence[str],
+    echo: bool = True,
+    input_data: Optional[str] = None,
+    phase: Optional[str] = None,
+) -> Tuple[int, str]:
+    """Phiên bản asyncio của run_command (dùng asyncio.create_subprocess_exec).
+
+    Cùng broker, dry-run và cách in output như run_command; output được gom
+    lại và in một lần khi lệnh kết thúc để các lệnh chạy song song không in
+    xen kẽ nhau. `phase` là pha ghi vào --timings: các coroutine chạy chung
+    thread của event loop nên không dựa được vào ngăn xếp pha.
+    """
+    import asyncio
+
+    global _SPAWN_COUNT
+    start = time.perf_counter()
+    spawned = False
+    cmd_str = " ".join(command)
+    read_only = is_read_only(command)
+    try:
+        answer = BROKER.query(command) if read_only else None
+        if answer is not None:
+            code, output = answer
+        elif DRY_RUN and command and command[0] == 'git' and not read_only:
+            print(f"[DRY-RUN] {cmd_str}")
+            code, output = 0, ""
+        else:
+            if not read_only:
+                BROKER.invalidate()
+            _SPAWN_COUNT += 1
+            spawned = True
+            proc = await asyncio.create_subprocess_exec(
+                *command,
+                stdin=None if input_data is None else asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            )
+            raw_out, raw_err = await proc.communicate(None if input_data is None else input_data.encode('utf-8'))
+            stdout, stderr = _decode(raw_out), _decode(raw_err)
+            if echo and not any(util in cmd_str for util in ['git branch', 'git status']):
+                if stdout: print(stdout, end='')
+                if stderr: print(stderr, file=sys.stderr, end='')
+            code, output = proc.returncode or 0, stdout.strip() + stderr.strip()
+    except FileNotFoundError:
+        print(t('command_not_found', cmd=command[0]), file=sys.stderr)
+        code, output = -1, ""
+    except Exception as e:
+        print(t('unexpected_error', error=str(e)), file=sys.stderr)
+        code, output = -1, ""
+    if RECORDER.enabled:
+        RECORDER.record_command(command, start, spawned, len(output), code, phase=phase)
+    return code, output
+
+def _decode(raw: bytes) -> str:
+    """Giải mã output như text=True của subprocess (kể cả đổi \\r\\n và \\r thành \\n)."""
+    return raw.decode('utf-8', errors='replace').replace('\r\n', '\n').replace('\r', '\n')
+
+def stream_command(
+    command: Sequence[str],
+    patterns: Optional[Dict[str, str]] = None,
+    tail_lines: int = 50,
+) -> StreamResult:
+    """Thực thi lệnh và chuyển tiếp output từng dòng ngay khi nhận được.
+
+    Không giữ toàn bộ output: chỉ giữ `tail_lines` dòng cuối trong một ring
+    buffer và tập tên các mẫu trong `patterns` đã xuất hiện. Các dòng tiến
+    trình của git (push/fetch) được vẽ lại trên cùng một dòng kèm thời gian.
+    """
+    if not RECORDER.enabled:
+        return _stream_command(command, patterns, tail_lines)
+    start = time.perf_counter()
+    spawned_before = _SPAWN_COUNT
+    result = _stream_command(command, patterns, tail_lines)
+    RECORDER.record_command(command, start, _SPAWN_COUNT > spawned_before, result.bytes_read, result.returncode)
+    return result
+
+def _stream_command(
+    command: Sequence[str],
+    patterns: Optional[Dict[str, str]],
+    tail_lines: int,
+) -> StreamResult:
+    global _SPAWN_COUNT
+    cmd_str = " ".join(command)
+    if DRY_RUN and command and command[0] == 'git':
+        print(f"[DRY-RUN] {cmd_str}")
+        return StreamResult(0)
+
+    patterns = PUSH_FAILURE_PATTERNS if patterns is None else patterns
+    tail: Deque[str] = deque(maxlen=tail_lines)
+    matches: Set[str] = set()
+    bytes_read = 0
+    progress_open = False
+    live_progress = sys.stderr.isatty()
+    start = time.monotonic()
+
+    def handle_line(line: str, is_progress_update: bool) -> None:
+        nonlocal progress_open
+        line = _ANSI_RE.sub('', line).rstrip()
+        if not line:
+            return
+        for name, needle in patterns.items():
+            if needle in line:
+                matches.add(name)
+        if _PROGRESS_RE.match(line):
+            done = not is_progress_update or ', done.' in line
+            if live_progress or done:
+                elapsed = time.monotonic() - start
+                end = '\n' if done or not live_progress else ''
+                print(f"\r{line} [{elapsed:.1f}s]", end=end, file=sys.stderr, flush=True)
+                progress_open = not done and live_progress
+            if done:
+                tail.append(line)
+            return
+        if progress_open:
+            print(file=sys.stderr)
+            progress_open = False
+        tail.append(line)
+        print(line, flush=True)
+
+    try:
+        if not is_read_only(command):
+            BROKER.invalidate()
+        _SPAWN_COUNT += 1
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        assert proc.stdout is not None
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        pending = ""
+        fd = proc.stdout.fileno()
+        while True:
+            chunk = os.read(fd, _STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            bytes_read += len(chunk)
+            pending += decoder.decode(chunk)
+            # git dùng '\r' để cập nhật dòng tiến trình, '\n' để kết thúc dòng
+            while True:
+                cut = min((i for i in (pending.find('\r'), pending.find('\n')) if i != -1), default=-1)
+                if cut == -1:
+                    break
+                handle_line(pending[:cut].rstrip(), pending[cut] == '\r')
+                pending = pending[cut + 1:]
+        handle_line((pending + decoder.decode(b'', final=True)).rstrip(), False)
+        if progress_open:
+            print(file=sys.stderr)
+        returncode = proc.wait()
+    except FileNotFoundError:
+        print(t('command_not_found', cmd=command[0]), file=sys.stderr)
+        return StreamResult(-1)
+    except Exception as e:
+        print(t('unexpected_error', error=str(e)), file=sys.stderr)
+        return StreamResult(-1)
+    return StreamResult(returncode, list(tail), matches, bytes_read)
+
 def get_current_branch() -> Optional[str]:
     """Lấy tên của branch Git hiện tại."""
     return_code, branch_name = run_command(['git', 'branch', '--show-current'])
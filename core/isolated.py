@@ -0,0 +1,98 @@
+# Tệp: core/isolated.py
+
+import os
+import shutil
+import sys
+from typing import Dict, Optional, Sequence
+
+from .config import t
+from .console import colorize
+from .git_utils import run_command
+from .staging import add_commands
+
+# Index tạm nằm cạnh index thật (cùng filesystem nên có thể thay thế nguyên tử)
+TEMP_INDEX_SUFFIX: str = '.git-sync'
+
+
+class IsolatedCommit:
+    """Tạo commit từ một index tạm mà không đụng tới working tree hay index thật.
+
+    Index tạm là bản sao của index thật nên `git add` chỉ phải stat lại các
+    đường dẫn được chọn. Commit được dựng bằng `write-tree` + `commit-tree`
+    và branch chỉ được dời sang commit mới sau khi push thành công; lúc đó
+    index tạm (đã khớp với commit mới và với working tree) thay cho index
+    thật. Không file nào bị ghi lại, mtime và cache build giữ nguyên.
+    """
+
+    def __init__(self, index_path: str) -> None:
+        self.index_path = index_path
+        self.temp_index = index_path + TEMP_INDEX_SUFFIX
+        self.parent: Optional[str] = None
+        self.sha: Optional[str] = None
+
+    @classmethod
+    def locate(cls) -> Optional['IsolatedCommit']:
+        code, output = run_command(['git', 'rev-parse', '--git-path', 'index'], echo=False)
+        return cls(os.path.abspath(output)) if code == 0 and output else None
+
+    @property
+    def env(self) -> Dict[str, str]:
+        return {'GIT_INDEX_FILE': self.temp_index}
+
+    def create(self, message: str, paths: Sequence[str], root: str = '.') -> Optional[str]:
+        """Stage `paths` vào index tạm và tạo commit con của HEAD; trả về SHA (None nếu thất bại)."""
+        code, parent = run_command(['git', 'rev-parse', '--verify', '-q', 'HEAD'], echo=False)
+        if code != 0 or not parent:
+            print(colorize(t('isolated_no_head'), 'error'), file=sys.stderr)
+            return None
+        self.parent = parent
+        if os.path.exists(self.index_path):
+            shutil.copyfile(self.index_path, self.temp_index)
+        elif run_command(['git', 'read-tree', parent], echo=False, env=self.env)[0] != 0:
+            return None
+
+        for argv, input_data in add_commands(paths, root) if paths else ():
+            if run_command(argv, input_data=input_data, env=self.env)[0] != 0:
+                return None
+        code, tree = run_command(['git', 'write-tree'], echo=False, env=self.env)
+        if code != 0 or not tree:
+            return None
+        _, parent_tree = run_command(['git', 'rev-parse', f'{parent}^{{tree}}'], echo=False)
+        if tree == parent_tree:
+            print(colorize(t('isolated_nothing_to_commit'), 'error'), file=sys.stderr)
+            return None
+
+        code, sha = run_command(['git', 'commit-tree', tree, '-p', parent, '-F', '-'],
+                                echo=False, input_data=f"{message}\n")
+        if code != 0 or not sha:
+            return None
+        self.sha = sha
+        return sha
+
+    def publish(self, branch: str) -> bool:
+        """Dời `branch` sang commit mới (chỉ khi nó vẫn ở `parent`) rồi thay index thật bằng index tạm."""
+        code, _ = run_command([
+            'git', 'update-ref', '-m', 'git-sync: isolated commit',
+            f'refs/heads/{branch}', self.sha or '', self.parent or '',
+        ], echo=False)
+        if code != 0:
+            return False
+        lock = self.index_path + '.lock'
+        try:
+            # Cùng giao thức với git: giữ index.lock rồi đổi tên nó thành index
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except OSError:
+            print(colorize(t('isolated_index_busy'), 'warning'), file=sys.stderr)
+            return True
+        try:
+            os.replace(self.temp_index, lock)
+            os.replace(lock, self.index_path)
+        except OSError:
+            if os.path.exists(lock):
+                os.unlink(lock)
+            print(colorize(t('isolated_index_busy'), 'warning'), file=sys.stderr)
+        return True
+
+    def discard(self) -> None:
+        if os.path.exists(self.temp_index):
+            os.unlink(self.temp_index)
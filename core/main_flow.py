@@ -1,27 +1,74 @@
 # Tệp: core/main_flow.py
 
+import functools
 import sys
-import os
 import re
 import shlex
+import time
 from argparse import Namespace
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, FrozenSet, List, NoReturn, Optional, Sequence, Set, Tuple, TypeVar, Union
 from .config import (
     t,
     get_protected_branches,
     get_commit_types,
     get_commit_template,
+    get_commit_aliases,
     is_auto_ticket_enabled,
     get_pre_sync_hook,
     get_post_sync_hook,
+    get_settings,
 )
 from .console import colorize
-from .git_utils import run_command, get_current_branch
+from .git_utils import StreamResult, run_command, stream_command, get_current_branch
+from .repo_state import RepoState, read_repo_state
+from .staging import STAGE_BATCH_SIZE, add_command, add_commands, repo_root, select_paths
+from .timings import RECORDER, phase, timed_phase
 from .constants import COMMIT_TYPES
 
-def handle_branch_protection(args: Namespace) -> None:
+# Các module chỉ một số nhánh cần (kế hoạch, fetch nền, metrics, sự kiện...) được import trong
+# hàm dùng chúng: lần chạy không có thay đổi nào không phải nạp chúng.
+if TYPE_CHECKING:
+    from .batch import BatchEntry
+    from .isolated import IsolatedCommit
+    from .plan import Plan
+    from .review import ChangeReview
+    from .upstream import UpstreamPrefetch
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+def _timed_run(operation: str) -> Callable[[F], F]:
+    """metrics.timed_run khi metrics được bật trong .gitsyncrc; nếu không thì không nạp module metrics."""
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not get_settings().metrics_enabled:
+                return func(*args, **kwargs)
+            from .metrics import timed_run
+            return timed_run(operation)(func)(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+def _metrics_timer(name: str) -> Callable[[F], F]:
+    """METRICS.timer dùng làm decorator, nhưng module metrics chỉ được import khi hàm chạy."""
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            from .metrics import METRICS
+            with METRICS.timer(name):
+                return func(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+def _prompt(message: str) -> str:
+    """Hỏi người dùng; thời gian chờ được tính vào pha 'prompt'."""
+    with phase('prompt'):
+        return input(message)
+
+def handle_branch_protection(args: Namespace, state: Optional[RepoState] = None) -> None:
     """Kiểm tra và hỏi xác nhận nếu đang ở trên branch được bảo vệ."""
-    current_branch = get_current_branch()
+    from .events import EVENTS
+
+    current_branch = state.branch if state is not None else get_current_branch()
     protected_branches = get_protected_branches()
     
     if not current_branch:
@@ -34,13 +81,14 @@ def handle_branch_protection(args: Namespace) -> None:
         if getattr(args, 'yes', False):
             confirmation = 'y'
         else:
-            confirmation = input(t('confirm_prompt'))
+            confirmation = _prompt(t('confirm_prompt'))
 
         if confirmation.lower() != 'y':
             print(colorize(t('process_cancelled'), 'warning'))
+            EVENTS.set_outcome('cancelled')
             sys.exit(0)
 
-def get_commit_message(args: Namespace) -> Optional[str]:
+def get_commit_message(args: Namespace, state: Optional[RepoState] = None) -> Optional[str]:
     """Lấy commit message từ args hoặc từ input của người dùng."""
     commit_message, commit_prefix = "", ""
     # Danh sách các loại commit chuẩn
@@ -57,28 +105,19 @@ def get_commit_message(args: Namespace) -> Optional[str]:
         commit_prefix = f"{used_commit_type}{scope}: "
         commit_message = getattr(args, used_commit_type)
         if is_auto_ticket_enabled():
-            branch = get_current_branch()
+            branch = state.branch if state is not None else get_current_branch()
             ticket = _extract_ticket_from_branch(branch)
         else:
             ticket = ""
 
-        template = get_commit_template()
-        data = {
-            'type': used_commit_type,
-            'scope': scope,
-            'message': commit_message,
-            'ticket': ticket,
-        }
-        try:
-            return template.format(**data)
-        except Exception:
-            # Fallback về định dạng cũ nếu template bị lỗi
-            pass
+        formatted = format_commit_message(used_commit_type, args.scope, commit_message, ticket)
+        if formatted is not None:
+            return formatted
 
     else:
         # Chế độ interactive không thay đổi
         print(colorize(t('preparing_commit'), 'info'))
-        commit_message = input(t('commit_prompt'))
+        commit_message = _prompt(t('commit_prompt'))
 
     if not commit_message.strip():
         print(colorize(t('empty_commit_message'), 'error'), file=sys.stderr)
@@ -86,6 +125,19 @@ def get_commit_message(args: Namespace) -> Optional[str]:
     
     return f"{commit_prefix}{commit_message}"
 
+def format_commit_message(commit_type: str, scope: Optional[str], message: str, ticket: str = "") -> Optional[str]:
+    """Ghép commit message theo `commit_template`; None nếu template bị lỗi."""
+    data = {
+        'type': commit_type,
+        'scope': f"({scope})" if scope else "",
+        'message': message,
+        'ticket': ticket,
+    }
+    try:
+        return get_commit_template().format(**data)
+    except Exception:
+        return None
+
 def _extract_ticket_from_branch(branch_name: Optional[str]) -> str:
     if not branch_name:
         return ""
@@ -94,90 +146,758 @@ def _extract_ticket_from_branch(branch_name: Optional[str]) -> str:
         return match.group(0)
     return ""
 
-def execute_sync(commit_message: str, args: Namespace) -> None:
-    """Thực hiện chuỗi lệnh add, commit, push và các tác vụ sau đồng bộ."""
-    original_branch = get_current_branch()
-    
-    _stage_and_commit_changes(commit_message, args)
-    _push_and_handle_remote(args, original_branch)
+StagingInput = Optional[Tuple[Sequence[str], str]]
+# Pathspec (NUL-separated) đọc từ stdin; không dùng --literal-pathspecs để mục --batch dùng được glob
+PATHSPEC_FROM_STDIN: Tuple[str, ...] = ('--pathspec-from-file=-', '--pathspec-file-nul')
+Upstreams = Dict[str, Tuple[str, str, str]]
 
-def _stage_and_commit_changes(commit_message: str, args: Namespace) -> None:
-    print(colorize(t('adding_files'), 'info'))
-    run_command(['git', 'add', '.'])
+def execute_sync(
+    commit_message: Optional[str],
+    args: Namespace,
+    state: Optional[RepoState] = None,
+    prefetch: Optional['UpstreamPrefetch'] = None,
+    plan: Optional['Plan'] = None,
+    after: Sequence[str] = (),
+) -> None:
+    """Thực hiện chuỗi lệnh add, commit, push và các tác vụ sau đồng bộ theo một kế hoạch dựng trước.
+
+    `plan` có thể đã chứa các bước chuẩn bị (xem `_plan_preamble`); các bước
+    commit chờ các bước `after`. `commit_message` là None khi message do bước
+    'message' hỏi lúc chạy.
+    """
+    from .isolated import IsolatedCommit
+    from .plan import Plan, execute_plan
+
+    original_branch = state.branch if state is not None else get_current_branch()
+    plan = plan if plan is not None else Plan()
+    staging, upstreams = _read_sync_inputs(args, state, original_branch, refreshed='refresh' in plan)
+    if not getattr(args, 'isolated', False):
+        execute_plan(plan_sync(commit_message, args, state, staging, upstreams, prefetch, original_branch, plan, after))
+        return
+
+    isolated = IsolatedCommit.locate()
+    if isolated is None or not original_branch or original_branch not in upstreams:
+        print(colorize(t('isolated_needs_upstream'), 'error'), file=sys.stderr)
+        sys.exit(1)
+    try:
+        execute_plan(plan_isolated_sync(
+            commit_message, args, state, staging, upstreams, isolated, prefetch, original_branch, plan, after,
+        ))
+    finally:
+        isolated.discard()
+
+def _read_sync_inputs(
+    args: Namespace,
+    state: Optional[RepoState],
+    branch: Optional[str],
+    post_sync: bool = True,
+    refreshed: bool = False,
+) -> Tuple[StagingInput, Upstreams]:
+    """Đọc mọi thứ cần để dựng kế hoạch: đường dẫn cần stage và upstream của các branch liên quan.
+
+    Với `refreshed=True` đường dẫn do bước 'refresh' chọn lúc chạy (sau
+    pre_sync hook); ở đây chỉ cần thư mục gốc của repo.
+    """
+    staging: StagingInput = None
+    if refreshed:
+        staging = ([], repo_root())
+    elif state is not None:
+        # Chỉ stage các đường dẫn mà `git status` đã báo, không quét lại cả cây
+        with phase('stage'):
+            staging = select_paths(state)
+        if staging is None:
+            sys.exit(1)
+    return staging, _sync_upstreams(args, state, branch, post_sync)
+
+def _sync_upstreams(
+    args: Namespace,
+    state: Optional[RepoState],
+    branch: Optional[str],
+    post_sync: bool = True,
+) -> Upstreams:
+    """Upstream của branch hiện tại và của các branch --update-after, đọc trong một lệnh."""
+    from .upstream import read_upstreams
+
+    wanted = [branch] if branch and state is not None and state.upstream else []
+    if post_sync and getattr(args, 'update_after', None):
+        wanted += [b for b in _split_branch_names(args.update_after) if b != branch]
+    return read_upstreams(wanted) if wanted else {}
+
+def plan_sync(
+    commit_message: Optional[str],
+    args: Namespace,
+    state: Optional[RepoState],
+    staging: StagingInput,
+    upstreams: Upstreams,
+    prefetch: Optional['UpstreamPrefetch'] = None,
+    original_branch: Optional[str] = None,
+    plan: Optional['Plan'] = None,
+    after: Sequence[str] = (),
+) -> 'Plan':
+    """Dựng toàn bộ kế hoạch đồng bộ mà không chạy gì (nên có thể kiểm thử không cần repo).
+
+    Các phần có điều kiện (xử lý push bị từ chối, fast-forward branch khác)
+    là tác vụ Python trong kế hoạch; mọi lệnh cố định đều hiện nguyên văn.
+    """
+    from .plan import Plan
+
+    branch = original_branch or (state.branch if state is not None else None)
+    plan = plan if plan is not None else Plan()
+    tracking_ref = _plan_commit(plan, commit_message, args, state, staging, upstreams, prefetch, after)
+    _plan_push(plan, args, branch, upstreams, tracking_ref, 'commit', prefetch)
+    _plan_stash_pop(plan)
+    return plan
+
+def _plan_push(
+    plan: 'Plan',
+    args: Namespace,
+    branch: Optional[str],
+    upstreams: Upstreams,
+    tracking_ref: Optional[str],
+    commit_step: str,
+    prefetch: Optional['UpstreamPrefetch'] = None,
+) -> None:
+    """Thêm bước push (sau `commit_step` và fetch upstream) cùng các bước sau đồng bộ.
+
+    Khi biết upstream của branch, tag (--tag) được tạo ngay sau commit và
+    push cùng branch trong một lần `git push --atomic`: một kết nối, và remote
+    nhận cả hai hoặc không nhận gì.
+    """
+    push_deps = [name for name in (commit_step, 'fetch-upstream') if name in plan]
+    upstream = upstreams.get(branch) if branch else None
+    atomic_tag = args.tag if args.tag and upstream is not None else None
+    if atomic_tag:
+        push_deps.append(plan.command('tag-create', ['git', 'tag', atomic_tag], (commit_step,), phase='post-sync',
+                                      before=(t('creating_tag', tag=atomic_tag),)))
+
+    def push(results: Dict[str, object]) -> None:
+        # Tag đã tồn tại (tạo thất bại): vẫn push branch, không đụng tới tag cũ
+        created = atomic_tag if atomic_tag and results['tag-create'][0] == 0 else None  # type: ignore[index]
+        if atomic_tag and not created:
+            print(colorize(t('tag_push_failed', tag=atomic_tag), 'error'), file=sys.stderr)
+        _push_and_handle_remote(args, branch, _remote_ahead(results, tracking_ref), created, upstream)
+
+    # Push bị từ chối thì hỏi có pull --rebase không (trừ khi --yes)
+    plan.task('push', push, push_deps, interactive=not getattr(args, 'yes', False), description=t(
+        'plan_push_atomic' if atomic_tag else 'plan_push', branch=branch or 'HEAD', tag=atomic_tag,
+    ))
+    _plan_post_sync(plan, args, branch, upstreams, after=('push',), fetch_after=('confirm',),
+                    include_tag=not atomic_tag, prefetch=prefetch)
+
+def execute_batch_sync(
+    entries: Sequence['BatchEntry'],
+    args: Namespace,
+    state: Optional[RepoState] = None,
+    prefetch: Optional['UpstreamPrefetch'] = None,
+    plan: Optional['Plan'] = None,
+    after: Sequence[str] = (),
+) -> None:
+    """Tạo lần lượt các commit của --batch rồi push tất cả trong một lần."""
+    from .plan import execute_plan
+
+    branch = state.branch if state is not None else get_current_branch()
+    execute_plan(plan_batch_sync(
+        entries, args, state, _sync_upstreams(args, state, branch), prefetch, branch, plan, after,
+    ))
+
+def plan_batch_sync(
+    entries: Sequence['BatchEntry'],
+    args: Namespace,
+    state: Optional[RepoState],
+    upstreams: Upstreams,
+    prefetch: Optional['UpstreamPrefetch'] = None,
+    original_branch: Optional[str] = None,
+    plan: Optional['Plan'] = None,
+    after: Sequence[str] = (),
+) -> 'Plan':
+    """Kế hoạch cho --batch: một lần xác nhận, mỗi mục một cặp `git add` + `git commit`, một lần push.
+
+    Mỗi commit chỉ lấy đúng pathspec của mục đó (`git commit <pathspec>`), nên
+    thay đổi đã stage từ trước hoặc thuộc mục khác không bị lẫn vào. Fetch
+    upstream chạy song song với các commit; hook và push chỉ chạy một lần.
+    """
+    from .batch import pathspec_input
+    from .plan import Plan
+
+    branch = original_branch or (state.branch if state is not None else None)
+    ticket = _extract_ticket_from_branch(branch) if is_auto_ticket_enabled() else ""
+    messages = [
+        format_commit_message(e.commit_type, e.scope, e.message, ticket)
+        or f"{e.commit_type}{f'({e.scope})' if e.scope else ''}: {e.message}"
+        for e in entries
+    ]
+    plan = plan if plan is not None else Plan()
+    plan.task('confirm', lambda results: _confirm_commit(args, state, prefetch), after, interactive=True, before=(
+        t('batch_header', count=len(entries)),
+        *(t('batch_commit_line', number=n, message=m, paths=' '.join(e.paths))
+          for n, (e, m) in enumerate(zip(entries, messages), 1)),
+    ), description=t('plan_confirm_batch', count=len(entries)))
+
+    last = 'confirm'
+    for number, (entry, message) in enumerate(zip(entries, messages), 1):
+        pathspec = pathspec_input(entry)
+        plan.command(f'add-{number}', ['git', 'add', '--all', *PATHSPEC_FROM_STDIN], (last,), phase='stage',
+                     input_data=pathspec, check=True, description=t('plan_stdin_paths', count=len(entry.paths)))
+        last = plan.command(
+            f'commit-{number}', ['git', 'commit', '-m', message, *PATHSPEC_FROM_STDIN], (f'add-{number}',),
+            phase='commit', input_data=pathspec, check=True,
+            before=(t('batch_committing', number=number, total=len(entries), message=message),),
+            description=t('plan_stdin_paths', count=len(entry.paths)),
+        )
+    tracking_ref = _plan_fetch_upstream(plan, state, upstreams, prefetch)
+    _plan_push(plan, args, branch, upstreams, tracking_ref, last, prefetch)
+    return plan
+
+def _stage_and_commit_changes(
+    commit_message: str,
+    args: Namespace,
+    state: Optional[RepoState] = None,
+    prefetch: Optional['UpstreamPrefetch'] = None,
+) -> bool:
+    """Stage, cho xem lại, rồi commit; đồng thời fetch upstream trong lúc commit.
+
+    Trả về True nếu upstream vừa fetch có commit mà HEAD chưa có, tức là lần
+    push đầu tiên chắc chắn sẽ bị từ chối.
+    """
+    from .plan import Plan, execute_plan
+
+    branch = state.branch if state is not None else get_current_branch()
+    staging, upstreams = _read_sync_inputs(args, state, branch, post_sync=False)
+    plan = Plan()
+    tracking_ref = _plan_commit(plan, commit_message, args, state, staging, upstreams, prefetch)
+    return _remote_ahead(execute_plan(plan), tracking_ref)
+
+def _plan_commit(
+    plan: 'Plan',
+    commit_message: Optional[str],
+    args: Namespace,
+    state: Optional[RepoState],
+    staging: StagingInput,
+    upstreams: Upstreams,
+    prefetch: Optional['UpstreamPrefetch'] = None,
+    after: Sequence[str] = (),
+) -> Optional[str]:
+    """Thêm các bước stage, review, xác nhận, commit và fetch upstream; trả về ref theo dõi được fetch.
+
+    Nếu đã có `prefetch` (fetch nền bắt đầu từ trước các câu hỏi) thì chỉ chờ
+    nó thay vì fetch lại. Nếu kế hoạch có bước 'refresh' thì `git add` đọc
+    đường dẫn từ kết quả của nó; `commit_message` là None thì `git commit`
+    đọc message từ bước 'message'.
+    """
+    pending = [t('adding_files')]
+    last: Tuple[str, ...] = tuple(after)
+    if staging is None:
+        last = (plan.command('stage', ['git', 'add', '.'], last, phase='stage', before=tuple(pending)),)
+        pending = []
+    elif 'refresh' in plan:
+        last = (plan.command(
+            'stage', add_command(staging[1]), last, phase='stage', input_from='refresh', check=True,
+            description=t('plan_stdin_from', step='refresh'), before=tuple(pending),
+        ),)
+        pending = []
+    else:
+        paths, root = staging
+        batches = add_commands(paths, root)
+        for number, (argv, input_data) in enumerate(batches, 1):
+            name = 'stage' if len(batches) == 1 else f'stage-{number}'
+            done = min(number * STAGE_BATCH_SIZE, len(paths))
+            progress = (t('staging_progress', done=done, total=len(paths)),) if len(batches) > 1 else ()
+            last = (plan.command(
+                name, argv, last, phase='stage', input_data=input_data, check=True,
+                description=t('plan_stdin_paths', count=input_data.count('\0') + 1),
+                before=tuple(pending), after=progress,
+            ),)
+            pending = []
+
+    max_files = get_settings().review_max_files
+    announce = () if commit_message is None else (t('committing_with_message', message=commit_message),)
+    plan.task('review', lambda results: _review_changes(max_files), last, before=(
+        *pending, *announce, t('review_changes_header'),
+    ), description=t('plan_review', count=max_files))
+    plan.task('confirm', lambda results: _confirm_commit(args, state, prefetch, results['review']), ('review',),
+              interactive=True, description=t('plan_confirm_commit'))
+
+    # `git commit` (kèm hook commit của git) và fetch upstream không phụ thuộc nhau
+    if commit_message is None:
+        plan.command('commit', ['git', 'commit', '-F', '-'], ('confirm', 'message'), phase='commit', check=True,
+                     input_from='message', description=t('plan_stdin_from', step='message'))
+    else:
+        plan.command('commit', ['git', 'commit', '-m', commit_message], ('confirm',), phase='commit', check=True)
+    return _plan_fetch_upstream(plan, state, upstreams, prefetch)
+
+def _plan_fetch_upstream(
+    plan: 'Plan',
+    state: Optional[RepoState],
+    upstreams: Upstreams,
+    prefetch: Optional['UpstreamPrefetch'] = None,
+) -> Optional[str]:
+    """Thêm bước 'fetch-upstream' (chạy sau 'confirm'); trả về ref theo dõi được fetch."""
+    if prefetch is not None:
+        plan.task('fetch-upstream', lambda results: prefetch.wait(), _after_prefetch(plan, ('confirm',)),
+                  description=t('plan_wait_prefetch'))
+        return None
+    upstream = upstreams.get(state.branch) if state is not None and state.branch and state.upstream else None
+    if upstream is None:
+        return None
+    remote, remote_ref, tracking_ref = upstream
+    plan.command('fetch-upstream', ['git', 'fetch', '--quiet', remote, f'+{remote_ref}:{tracking_ref}'],
+                 ('confirm',), phase='fetch', echo=False)
+    return tracking_ref
+
+def plan_isolated_sync(
+    commit_message: str,
+    args: Namespace,
+    state: Optional[RepoState],
+    staging: StagingInput,
+    upstreams: Upstreams,
+    isolated: 'IsolatedCommit',
+    prefetch: Optional['UpstreamPrefetch'] = None,
+    original_branch: Optional[str] = None,
+    plan: Optional['Plan'] = None,
+    after: Sequence[str] = (),
+) -> 'Plan':
+    """Kế hoạch cho --isolated: commit từ index tạm, push đúng commit đó, rồi mới dời branch.
+
+    Working tree không bị ghi lại ở bất kỳ bước nào. Vì vậy khi remote đã có
+    commit mới (cần rebase, tức là phải sửa file) thì dừng lại mà không thay
+    đổi gì ở local thay vì pull như chế độ thường. Cần biết upstream của branch.
+    """
+    from .plan import Plan
+
+    branch = original_branch or (state.branch if state is not None else None) or ''
+    upstream = upstreams[branch]
+    paths, root = staging if staging is not None else (['.'], '.')
+    plan = plan if plan is not None else Plan()
+    plan.task('confirm', lambda results: _confirm_commit(args, state, prefetch), after, interactive=True,
+              before=() if commit_message is None else (t('committing_with_message', message=commit_message),),
+              description=t('plan_confirm_commit'))
+
+    def commit(results: Dict[str, object]) -> str:
+        message = commit_message if commit_message is not None else str(results['message'])
+        selected = [p for p in str(results['refresh']).split('\0') if p] if 'refresh' in results else paths
+        return _create_isolated_commit(isolated, message, selected, root)
+
+    plan.task('commit', commit, ('confirm',), phase='commit', before=(t('isolated_committing'),),
+              description=t('plan_isolated_commit', count=len(paths)) if 'refresh' not in plan
+              else t('plan_isolated_commit_refreshed'))
+    tracking_ref = _plan_fetch_upstream(plan, state, upstreams, prefetch)
+
+    def push(results: Dict[str, object]) -> None:
+        if _remote_ahead(results, tracking_ref):
+            print(colorize(t('isolated_remote_ahead', upstream=tracking_ref), 'error'), file=sys.stderr)
+            sys.exit(1)
+        _push_isolated(isolated, args.tag, upstream)
+
+    plan.task('push', push, [name for name in ('commit', 'fetch-upstream') if name in plan],
+              description=t('plan_push_isolated', branch=branch, tag=args.tag))
+    plan.task('publish', lambda results: _publish_isolated(isolated, branch), ('push',),
+              description=t('plan_publish_isolated', branch=branch))
+    _plan_post_sync(plan, args, branch, upstreams, after=('publish',), fetch_after=('confirm',),
+                    include_tag=False, prefetch=prefetch)
+    return plan
+
+def _create_isolated_commit(isolated: 'IsolatedCommit', message: str, paths: Sequence[str], root: str) -> str:
+    sha = isolated.create(message, paths, root)
+    if sha is None:
+        print(colorize(t('isolated_commit_failed'), 'error'), file=sys.stderr)
+        sys.exit(1)
+    return sha
+
+@timed_phase('push')
+@_metrics_timer('git_sync_push_duration_seconds')
+def _push_isolated(isolated: 'IsolatedCommit', tag: Optional[str], upstream: Tuple[str, str, str]) -> None:
+    """Push commit tạo trong index tạm thẳng lên ref của upstream (kèm tag trong cùng lần push nguyên tử)."""
+    from .metrics import METRICS
+
+    remote, remote_ref, _ = upstream
+    command = ['git', 'push', '--progress', remote, f'{isolated.sha}:{remote_ref}']
+    if tag and run_command(['git', 'tag', tag, isolated.sha or ''], echo=False)[0] == 0:
+        command[2:2] = ['--atomic']
+        command.append(f'refs/tags/{tag}')
+    elif tag:
+        print(colorize(t('tag_push_failed', tag=tag), 'error'), file=sys.stderr)
+        tag = None
+
+    print(colorize(t('pushing_to_remote'), 'info'))
+    result = _push(command)
+    if result.returncode == 0:
+        print(colorize(t('sync_success'), 'success'))
+        _finish_push(1, tag)
+        return
+    rejected = _is_rejected(result)
+    if rejected:
+        METRICS.inc('git_sync_push_rejections_total')
+    print(colorize(t('isolated_push_rejected' if rejected else 'push_failed'), 'error'), file=sys.stderr)
+    _fail_push(1, tag)
+
+def _publish_isolated(isolated: 'IsolatedCommit', branch: str) -> None:
+    if isolated.publish(branch):
+        print(colorize(t('isolated_published', branch=branch), 'success'))
+    else:
+        # Branch local đã đổi trong lúc push: commit đã lên remote, để người dùng tự pull về
+        print(colorize(t('isolated_branch_moved', branch=branch, sha=isolated.sha), 'warning'), file=sys.stderr)
+
+def _review_changes(max_files: int) -> 'ChangeReview':
+    """Tóm tắt ngắn các thay đổi đã stage; thống kê đầy đủ chỉ khi người dùng yêu cầu."""
+    from .review import ChangeReview
+
+    review = ChangeReview.start(max_files)
+    review.print_summary()
+    return review
+
+def _confirm_commit(
+    args: Namespace,
+    state: Optional[RepoState],
+    prefetch: Optional['UpstreamPrefetch'],
+    review: Optional['ChangeReview'] = None,
+) -> None:
+    # Fetch nền đã xong trước khi người dùng xác nhận: báo ngay branch đang bị tụt lại
+    from .events import EVENTS
+
+    behind = prefetch.behind() if prefetch is not None else 0
+    if behind:
+        print(colorize(t('upstream_has_new_commits', count=behind, upstream=state.upstream if state else ''), 'warning'))
 
-    print(colorize(t('committing_with_message', message=commit_message), 'info'))
-    
-    print(colorize(t('review_changes_header'), 'info'))
-    run_command(['git', 'diff', '--stat', 'HEAD'])
-    
     if getattr(args, 'yes', False):
         confirmation = ''
     else:
-        confirmation = input(t('commit_confirm_prompt'))
+        confirmation = _prompt(t('commit_confirm_prompt_details' if review is not None else 'commit_confirm_prompt'))
+        while review is not None and confirmation.strip().lower() in ('d', 'diff'):
+            review.print_full()
+            confirmation = _prompt(t('commit_confirm_prompt'))
 
     if confirmation.lower() not in ['y', 'yes', '']:
         print(colorize(t('process_cancelled'), 'warning'))
+        EVENTS.set_outcome('cancelled')
         sys.exit(0)
 
-    return_code, _ = run_command(['git', 'commit', '-m', commit_message])
-    if return_code != 0:
-        sys.exit(1)
+def _remote_ahead(results: Dict[str, object], tracking_ref: Optional[str]) -> bool:
+    """True nếu bước fetch-upstream đã thành công và upstream có commit mà HEAD chưa có."""
+    from .upstream import commits_behind
 
-def _push_and_handle_remote(args: Namespace, original_branch: Optional[str]) -> None:
-    print(colorize(t('pushing_to_remote'), 'info'))
-    push_return_code, push_output = run_command(['git', 'push'])
-    
-    if push_return_code == 0:
-        print(colorize(t('sync_success'), 'success'))
-        _run_post_sync_tasks(args, original_branch)
-        return
+    fetched = results.get('fetch-upstream')
+    if isinstance(fetched, tuple):
+        # Lệnh fetch trong kế hoạch: (mã lỗi, output)
+        fetched = tracking_ref if fetched[0] == 0 else None
+    return isinstance(fetched, str) and bool(fetched) and commits_behind(fetched) > 0
 
-    if "rejected" in push_output and "non-fast-forward" in push_output:
-        print(colorize(t('non_fast_forward_hint'), 'warning'))
-        if getattr(args, 'yes', False):
-            pull_confirmation = 'y'
-        else:
-            pull_confirmation = input(t('pull_prompt'))
-
-        if pull_confirmation.lower() == 'y':
-            print(colorize(t('pulling_code'), 'info'))
-            pull_return_code, _ = run_command(['git', 'pull', '--rebase'])
-            if pull_return_code == 0:
-                print(colorize(t('retrying_push'), 'info'))
-                retry_push_code, _ = run_command(['git', 'push'])
-                if retry_push_code == 0:
-                    print(colorize(t('sync_after_update_success'), 'success'))
-                    _run_post_sync_tasks(args, original_branch)
-                    sys.exit(0)
-                else:
-                    print(colorize(t('push_after_pull_failed'), 'error'), file=sys.stderr)
-            else:
-                print(colorize(t('pull_failed'), 'error'), file=sys.stderr)
-        else:
-            print(colorize(t('pull_cancelled'), 'warning'))
+def _push_command(branch: Optional[str], tag: Optional[str], upstream: Optional[Tuple[str, str, str]]) -> List[str]:
+    """Lệnh push: branch và tag trong một lần push nguyên tử nếu có tag, nếu không thì `git push` như cũ."""
+    if tag and branch and upstream is not None:
+        remote, remote_ref, _ = upstream
+        return ['git', 'push', '--atomic', '--progress', remote, f'refs/heads/{branch}:{remote_ref}', f'refs/tags/{tag}']
+    return ['git', 'push', '--progress']
+
+def _push(command: List[str]) -> StreamResult:
+    result = stream_command(command)
+    if result.returncode != 0 and 'atomic_unsupported' in result.matches:
+        # Server quá cũ để push nguyên tử: vẫn là một lần push nhưng không còn đảm bảo tất cả hoặc không gì
+        result = stream_command([arg for arg in command if arg != '--atomic'])
+    return result
+
+# Các lý do từ chối mà fetch + rebase rồi push lại có thể qua được
+_RETRYABLE_REJECTIONS: FrozenSet[str] = frozenset({'non_fast_forward', 'fetch_first', 'lock_failed', 'update_ref_failed'})
+
+def _is_rejected(result: StreamResult) -> bool:
+    """Push bị từ chối vì remote có commit mà local chưa có, kể cả khi một push khác
+    cập nhật ref ngay trong lúc push của mình đang chạy (cần fetch + rebase rồi thử lại)."""
+    return 'rejected' in result.matches and bool(_RETRYABLE_REJECTIONS & result.matches)
+
+def _pull_rebase() -> StreamResult:
+    return stream_command(['git', 'pull', '--rebase', '--progress'])
+
+@timed_phase('push')
+@_metrics_timer('git_sync_push_duration_seconds')
+def _push_and_handle_remote(
+    args: Namespace,
+    original_branch: Optional[str],
+    remote_ahead: bool = False,
+    tag: Optional[str] = None,
+    upstream: Optional[Tuple[str, str, str]] = None,
+) -> int:
+    """Push branch hiện tại (kèm `tag` nếu có) và trả về số lần push đã thực hiện.
+
+    Nếu bị từ chối vì remote có commit mới thì (được phép) lặp fetch + rebase
+    + push theo `RetryPolicy`: backoff luỹ thừa có jitter giữa các lần thua,
+    dừng khi hết số lần thử hoặc quá hạn. Thất bại thì sys.exit(1).
+    """
+    from .metrics import METRICS
+    from .retry import RetryPolicy
+
+    command = _push_command(original_branch, tag, upstream)
+    policy = RetryPolicy.from_settings(get_settings())
+    deadline = time.monotonic() + policy.deadline
+    attempts = 0
+    if remote_ahead:
+        # Đã biết remote có commit mới: bỏ qua lần push chắc chắn bị từ chối
+        print(colorize(t('remote_ahead_before_push'), 'warning'))
+        rejected = True
     else:
+        print(colorize(t('pushing_to_remote'), 'info'))
+        attempts = 1
+        push_result = _push(command)
+        if push_result.returncode == 0:
+            print(colorize(t('sync_success'), 'success'))
+            return _finish_push(attempts, tag)
+        rejected = _is_rejected(push_result)
+        if rejected:
+            METRICS.inc('git_sync_push_rejections_total')
+
+    if not rejected:
         print(colorize(t('push_failed'), 'error'), file=sys.stderr)
-    
+        _fail_push(attempts, tag)
+
+    print(colorize(t('non_fast_forward_hint'), 'warning'))
+    if getattr(args, 'yes', False):
+        pull_confirmation = 'y'
+    else:
+        pull_confirmation = _prompt(t('pull_prompt'))
+    if pull_confirmation.lower() != 'y':
+        print(colorize(t('pull_cancelled'), 'warning'))
+        _fail_push(attempts, tag)
+
+    # Số lượt thua sau khi đã pull (lần bị từ chối đầu tiên, hoặc remote_ahead, không tính)
+    lost_races = 0
+    while attempts < policy.max_attempts and time.monotonic() < deadline:
+        if lost_races:
+            # Vừa thua thêm một lượt: chờ một khoảng ngẫu nhiên trước khi thử lại
+            delay = min(policy.delay(lost_races), max(0.0, deadline - time.monotonic()))
+            print(colorize(t('push_retry_wait', seconds=f"{delay:.1f}"), 'info'))
+            time.sleep(delay)
+        print(colorize(t('pulling_code'), 'info'))
+        if _pull_rebase().returncode != 0:
+            print(colorize(t('pull_failed'), 'error'), file=sys.stderr)
+            _fail_push(attempts, tag)
+        if tag:
+            # Rebase tạo commit mới: tag phải trỏ vào commit sẽ được push
+            run_command(['git', 'tag', '-f', tag], echo=False)
+        attempts += 1
+        if attempts == 1:
+            # remote_ahead: đây là lần push thật đầu tiên, không phải một lần thử lại
+            print(colorize(t('pushing_to_remote'), 'info'))
+        else:
+            print(colorize(t('retrying_push_attempt', attempt=attempts, max=policy.max_attempts), 'info'))
+        retry_push_result = _push(command)
+        if retry_push_result.returncode == 0:
+            print(colorize(t('sync_after_update_success'), 'success'))
+            return _finish_push(attempts, tag)
+        if not _is_rejected(retry_push_result):
+            print(colorize(t('push_after_pull_failed'), 'error'), file=sys.stderr)
+            _fail_push(attempts, tag)
+        METRICS.inc('git_sync_push_rejections_total')
+        lost_races += 1
+        print(colorize(t('push_lost_race', attempt=attempts, max=policy.max_attempts), 'warning'))
+
+    print(colorize(t('push_retries_exhausted', attempts=attempts), 'error'), file=sys.stderr)
+    _fail_push(attempts, tag)
+
+def _finish_push(attempts: int, tag: Optional[str]) -> int:
+    from .events import EVENTS
+    from .metrics import METRICS
+
+    RECORDER.increment('push_attempts', attempts)
+    METRICS.inc('git_sync_push_attempts_total', attempts)
+    METRICS.inc('git_sync_pushes_total', result='ok')
+    EVENTS.emit('push', result='ok', attempts=attempts, retries=max(0, attempts - 1), tag=tag)
+    EVENTS.set_outcome('synced')
+    if attempts > 1:
+        print(colorize(t('push_attempts_needed', attempts=attempts), 'info'))
+    _report_pushed_tag(tag)
+    return attempts
+
+def _fail_push(attempts: int, tag: Optional[str]) -> NoReturn:
+    from .events import EVENTS
+    from .metrics import METRICS
+
+    RECORDER.increment('push_attempts', attempts)
+    RECORDER.increment('push_failures')
+    METRICS.inc('git_sync_push_attempts_total', attempts)
+    METRICS.inc('git_sync_pushes_total', result='failed')
+    EVENTS.emit('push', result='failed', attempts=attempts, retries=max(0, attempts - 1), tag=tag)
+    EVENTS.set_outcome('push_failed')
+    if tag:
+        # Không để lại tag local chưa được push: lần chạy lại có thể tạo lại nó
+        run_command(['git', 'tag', '-d', tag], echo=False)
+        print(colorize(t('tag_push_failed', tag=tag), 'error'), file=sys.stderr)
     sys.exit(1)
-    
+
+def _report_pushed_tag(tag: Optional[str]) -> None:
+    if tag:
+        print(colorize(t('tag_pushed_successfully', tag=tag), 'success'))
+
+@_timed_run('sync')
 def start_sync_flow(args: Namespace) -> None:
     """Hàm chính điều phối toàn bộ luồng đồng bộ."""
-    original_branch = get_current_branch()
-    was_stashed = _maybe_stash_changes(args)
-            
     print(colorize(t('start_sync'), 'info'))
 
-    if not os.path.isdir('.git'):
+    # Một lần gọi `git status` cho biết repo, branch và các thay đổi
+    state = read_repo_state()
+    if state is None:
         print(colorize(t('not_a_repo'), 'error'), file=sys.stderr)
         sys.exit(1)
-        
-    handle_branch_protection(args)
-    _run_pre_sync_hook_if_needed()
-    
-    _handle_status_and_sync(args, was_stashed, original_branch)
+    if state.has_conflicts:
+        print(colorize(t('unresolved_conflicts', count=len(state.conflicts)), 'error'), file=sys.stderr)
+        sys.exit(1)
+    # Sự kiện chỉ có người nhận với --output jsonl hoặc khi metrics đếm kết quả lần chạy
+    observed = getattr(args, 'output', 'text') == 'jsonl' or get_settings().metrics_enabled
+    if observed:
+        from .events import EVENTS
+        EVENTS.emit('start', branch=state.branch, head=state.oid, upstream=state.upstream, staged=len(state.staged),
+                    unstaged=len(state.unstaged), untracked=len(state.untracked))
+    if state.is_clean:
+        # Không có gì để stash hay commit: thoát trước khi chạy hook và hỏi xác nhận
+        print(colorize(t('no_changes'), 'info'))
+        if observed:
+            EVENTS.set_outcome('no_changes')
+        return
+
+    from .fast_status import offer_fast_status
+    from .plan import Plan, execute_plan
+    from .upstream import UpstreamPrefetch
+
+    # Repo rất lớn: gợi ý bật fsmonitor/untracked cache cho các lần sau (repo nhỏ chỉ tốn một lần đọc header index)
+    offer_fast_status(getattr(args, 'yes', False))
+    # Đọc --batch trước mọi câu hỏi: mục sai thì dừng ngay, chưa chạy gì
+    entries = _read_batch_entries(args.batch) if getattr(args, 'batch', None) else None
+
+    original_branch = state.branch
+    # Cả luồng là một kế hoạch: --dry-run in đúng các bước mà lần chạy thật sẽ chạy
+    prefetch = UpstreamPrefetch.prepare(state, _split_branch_names(args.update_after or []))
+    plan = Plan()
+    after = _plan_preamble(plan, args, state, prefetch)
+    if entries is not None:
+        execute_batch_sync(entries, args, state, prefetch, plan, after)
+        return
+
+    # Hook có thể sửa file (formatter, codegen...): đường dẫn cần stage chỉ biết được sau khi nó chạy
+    refreshed = 'pre-hook' in plan
+    if 'stash' in plan and not refreshed:
+        # `git stash push` chỉ cất thay đổi đã theo dõi; phần còn lại để commit là các file chưa theo dõi
+        state = _untracked_only(state)
+        if state.is_clean:
+            _plan_pull_after_stash(plan, args, original_branch, prefetch, after)
+            execute_plan(plan)
+            return
+
+    commit_message: Optional[str] = None
+    if any(getattr(args, c, None) for c in get_commit_types()):
+        commit_message = get_commit_message(args, state)
+        if not commit_message:
+            sys.exit(1)
+    else:
+        after = (plan.task('message', lambda results: _ask_commit_message(args, state), after, interactive=True,
+                           description=t('plan_ask_message')),)
+    if refreshed:
+        after = (plan.task('refresh', lambda results: _refresh_paths(args, original_branch, results), after,
+                           description=t('plan_refresh')),)
+    execute_sync(commit_message, args, state, prefetch, plan, after)
+
+def _plan_preamble(
+    plan: 'Plan',
+    args: Namespace,
+    state: RepoState,
+    prefetch: Optional['UpstreamPrefetch'],
+) -> Tuple[str, ...]:
+    """Thêm các bước chạy trước phần commit: fetch nền, xác nhận branch được bảo vệ, stash, pre_sync hook.
+
+    Trả về các bước mà phần còn lại của kế hoạch phải chờ.
+    """
+    if prefetch is not None:
+        # Không bước nào phải chờ nó: fetch chạy nền trong lúc người dùng trả lời các câu hỏi
+        plan.task('prefetch', lambda results: prefetch.run_in_background(),
+                  description=t('plan_prefetch', branches=', '.join([prefetch.branch, *prefetch.others])))
+    after: Tuple[str, ...] = ()
+    if state.branch and state.branch in get_protected_branches():
+        after = (plan.task('protect', lambda results: handle_branch_protection(args, state), interactive=True,
+                           description=t('plan_confirm_protected', branch=state.branch)),)
+    else:
+        # Không có gì để hỏi: chỉ báo branch đang làm việc
+        handle_branch_protection(args, state)
+    if getattr(args, 'stash', False):
+        after = (plan.task('stash', lambda results: _maybe_stash_changes(args), after, description=t('plan_stash')),)
+    hook = get_pre_sync_hook()
+    if hook:
+        after = (plan.task('pre-hook', lambda results: _run_hook_command(hook, 'pre_sync'), after,
+                           description=t('plan_pre_hook', command=hook)),)
+    return after
+
+def _after_prefetch(plan: 'Plan', deps: Sequence[str]) -> Tuple[str, ...]:
+    """`deps` cộng thêm bước 'prefetch' nếu có: chỉ chờ được lần fetch nền sau khi nó đã bắt đầu."""
+    return (*deps, 'prefetch') if 'prefetch' in plan else tuple(deps)
+
+def _untracked_only(state: RepoState) -> RepoState:
+    remaining = RepoState()
+    for slot in RepoState.__slots__:
+        setattr(remaining, slot, getattr(state, slot))
+    remaining.staged, remaining.unstaged = [], []
+    return remaining
 
-    _apply_stash_if_needed(was_stashed)
+def _ask_commit_message(args: Namespace, state: RepoState) -> str:
+    commit_message = get_commit_message(args, state)
+    if not commit_message:
+        sys.exit(1)
+    print(colorize(t('committing_with_message', message=commit_message), 'info'))
+    return commit_message
+
+def _refresh_paths(args: Namespace, original_branch: Optional[str], results: Dict[str, object]) -> str:
+    """Đọc lại trạng thái sau pre_sync hook và chọn đường dẫn cần stage (NUL-separated, làm stdin cho `git add`)."""
+    state = read_repo_state() or RepoState()
+    if state.is_clean:
+        _finish_without_commit(args, original_branch, bool(results.get('stash')))
+    with phase('stage'):
+        selected = select_paths(state)
+    if selected is None:
+        sys.exit(1)
+    return '\0'.join(selected[0])
+
+def _finish_without_commit(args: Namespace, original_branch: Optional[str], was_stashed: bool) -> NoReturn:
+    """Không còn gì để commit: nếu đã stash thì chỉ kéo code mới về rồi trả lại stash."""
+    from .events import EVENTS
+
+    if was_stashed:
+        print(colorize(t('no_changes_to_commit_proceed_pull'), 'info'))
+        _pull_rebase()
+        if args.update_after:
+            _update_target_branch(args.update_after, original_branch)
+        _apply_stash_if_needed(True)
+    else:
+        print(colorize(t('no_changes'), 'info'))
+        EVENTS.set_outcome('no_changes')
+    sys.exit(0)
+
+def _plan_pull_after_stash(
+    plan: 'Plan',
+    args: Namespace,
+    original_branch: Optional[str],
+    prefetch: Optional['UpstreamPrefetch'],
+    after: Sequence[str],
+) -> None:
+    """Stash đã cất hết thay đổi: kéo code mới về, cập nhật các branch khác rồi trả lại stash."""
+    from .upstream import read_upstreams
 
+    plan.task('pull', lambda results: _pull_rebase(), after, before=(t('no_changes_to_commit_proceed_pull'),),
+              description=t('plan_pull_rebase'))
+    if args.update_after:
+        targets = [b for b in _split_branch_names(args.update_after) if b != original_branch]
+        _plan_update_after(plan, targets, original_branch, read_upstreams(targets) if targets else {},
+                           ('pull',), after, prefetch)
+    _plan_stash_pop(plan)
+
+def _plan_stash_pop(plan: 'Plan') -> None:
+    """Bước cuối cùng khi có --stash: trả lại các thay đổi đã cất (nếu lúc chạy thực sự có gì được stash)."""
+    if 'stash' in plan:
+        plan.task('stash-pop', lambda results: _apply_stash_if_needed(bool(results['stash'])), plan.leaves(),
+                  description=t('plan_stash_pop'))
+
+def _read_batch_entries(source: str) -> List['BatchEntry']:
+    from .batch import read_batch
+
+    entries = read_batch(source, get_commit_types(), get_commit_aliases())
+    if entries is None:
+        sys.exit(1)
+    return entries
+
+@timed_phase('stash')
 def _maybe_stash_changes(args: Namespace) -> bool:
     was_stashed = False
 
@@ -192,26 +912,7 @@ def _maybe_stash_changes(args: Namespace) -> bool:
             print(colorize(t('stashed_successfully'), 'success'))
     return was_stashed
 
-def _handle_status_and_sync(args: Namespace, was_stashed: bool, original_branch: Optional[str]) -> None:
-    _, output = run_command(['git', 'status', '--porcelain'])
-    if not output.strip() and was_stashed:
-        print(colorize(t('no_changes_to_commit_proceed_pull'), 'info'))
-        run_command(['git', 'pull', '--rebase'])
-        if args.update_after:
-            _update_target_branch(args.update_after, original_branch)
-    elif not output.strip():
-        print(colorize(t('no_changes'), 'info'))
-        if not was_stashed:
-            # Không có thay đổi nào: kết thúc sớm nhưng không ném SystemExit,
-            # để caller (CLI) có thể thoát tự nhiên với exit code 0.
-            return
-
-    else:
-        final_commit_message = get_commit_message(args)
-        if not final_commit_message:
-            sys.exit(1)
-        execute_sync(final_commit_message, args)
-
+@timed_phase('stash')
 def _apply_stash_if_needed(was_stashed: bool) -> None:
     if not was_stashed:
         return
@@ -223,8 +924,13 @@ def _apply_stash_if_needed(was_stashed: bool) -> None:
     else:
         print(colorize(t('stash_pop_success'), 'success'))
             
-def handle_force_reset(branch_to_reset: str) -> None:
+@_timed_run('force_reset')
+@timed_phase('force-reset')
+def handle_force_reset(branch_to_reset: str, depth: Optional[int] = None, filter_spec: Optional[str] = None) -> None:
     """Thực hiện reset branch local một cách an toàn."""
+    from .events import EVENTS
+    from .plan import execute_plan
+
     print("\n" + "="*60)
     print(colorize(t('force_reset_warning_header'), 'warning'))
     print(t('force_reset_warning_line1'))
@@ -233,52 +939,262 @@ def handle_force_reset(branch_to_reset: str) -> None:
     print("="*60)
     
     prompt = t('force_reset_prompt', branch=branch_to_reset)
-    confirmation = input(prompt)
+    confirmation = _prompt(prompt)
 
     if confirmation.strip() == branch_to_reset:
         print(colorize(f"\n✅ {t('force_reset_confirmed')}", 'success'))
-        
-        print(colorize(f"\n--- 1. {t('force_reset_step1')}", 'info'))
-        run_command(['git', 'fetch', '--all'])
-        
-        print(colorize(f"\n--- 2. {t('force_reset_step2', branch=branch_to_reset)}", 'info'))
-        run_command(['git', 'reset', '--hard', branch_to_reset])
-        
-        print(colorize(f"\n--- 3. {t('force_reset_step3')}", 'info'))
-        run_command(['git', 'clean', '-df'])
-        
+        execute_plan(plan_force_reset(branch_to_reset, _list_remotes(), depth, filter_spec))
         print(colorize(f"\n✅ {t('force_reset_success', branch=branch_to_reset)}", 'success'))
+        EVENTS.set_outcome('reset')
     else:
         print(colorize(f"\n❌ {t('force_reset_cancelled')}", 'warning'))
+        EVENTS.set_outcome('cancelled')
         sys.exit(0)
 
+def _list_remotes() -> List[str]:
+    code, output = run_command(['git', 'remote'], echo=False)
+    return output.split() if code == 0 else []
+
+def _split_remote_ref(target: str, remotes: Sequence[str]) -> Optional[Tuple[str, str]]:
+    """'origin/feature/x' -> ('origin', 'feature/x') nếu tiền tố là một remote (ưu tiên tên remote dài nhất)."""
+    for remote in sorted(remotes, key=len, reverse=True):
+        if target.startswith(f'{remote}/') and len(target) > len(remote) + 1:
+            return remote, target[len(remote) + 1:]
+    return None
+
+def plan_force_reset(
+    target: str,
+    remotes: Sequence[str],
+    depth: Optional[int] = None,
+    filter_spec: Optional[str] = None,
+) -> 'Plan':
+    """Kế hoạch của --force-reset-to: fetch đúng ref cần thiết, reset --hard, clean.
+
+    Nếu `target` là `<remote>/<branch>` thì chỉ fetch đúng branch đó từ đúng
+    remote đó. Các trường hợp khác (branch local, tag, SHA) cần fetch đầy đủ:
+    mỗi remote một lệnh, chạy song song. `depth`/`filter_spec` được thêm vào
+    mọi lệnh fetch.
+    """
+    from .plan import Plan
+
+    options = ([f'--depth={depth}'] if depth else []) + ([f'--filter={filter_spec}'] if filter_spec else [])
+    plan = Plan()
+    fetches: List[str] = []
+    remote_ref = _split_remote_ref(target, remotes)
+    if remote_ref is not None:
+        remote, branch = remote_ref
+        fetches.append(plan.command(
+            'fetch', ['git', 'fetch', *options, remote, f'+refs/heads/{branch}:refs/remotes/{remote}/{branch}'],
+            phase='fetch', timed=True,
+            before=(f"\n--- 1. {t('force_reset_step1_targeted', ref=branch, remote=remote)}",),
+        ))
+    else:
+        header = (f"\n--- 1. {t('force_reset_step1', count=len(remotes))}",)
+        for number, remote in enumerate(remotes):
+            fetches.append(plan.command(
+                f'fetch-{remote}', ['git', 'fetch', *options, remote], phase='fetch', timed=True,
+                before=header if number == 0 else (),
+            ))
+    plan.command('reset', ['git', 'reset', '--hard', target], fetches, check=True, timed=True,
+                 before=(f"\n--- 2. {t('force_reset_step2', branch=target)}",))
+    plan.command('clean', ['git', 'clean', '-df'], ('reset',), timed=True,
+                 before=(f"\n--- 3. {t('force_reset_step3')}",))
+    return plan
+
 def _run_post_sync_tasks(args: Namespace, original_branch: Optional[str]) -> None:
     """Chạy các tác vụ sau khi push thành công, như tạo tag hoặc cập nhật branch."""
-    if args.tag:
-        tag_name = args.tag
-        print(colorize(t('creating_tag', tag=tag_name), 'info'))
-        run_command(['git', 'tag', tag_name])
-        
-        print(colorize(t('pushing_tag', tag=tag_name), 'info'))
-        tag_push_code, _ = run_command(['git', 'push', 'origin', tag_name])
-        
-        if tag_push_code == 0:
-            print(colorize(t('tag_pushed_successfully', tag=tag_name), 'success'))
-        else:
-            print(colorize(t('tag_push_failed', tag=tag_name), 'error'), file=sys.stderr)
+    from .plan import Plan, execute_plan
+    from .upstream import read_upstreams
+
+    targets = [b for b in _split_branch_names(args.update_after or []) if b != original_branch]
+    plan = Plan()
+    _plan_post_sync(plan, args, original_branch, read_upstreams(targets) if targets else {})
+    execute_plan(plan)
 
+def _plan_post_sync(
+    plan: 'Plan',
+    args: Namespace,
+    original_branch: Optional[str],
+    upstreams: Upstreams,
+    after: Sequence[str] = (),
+    fetch_after: Sequence[str] = (),
+    include_tag: bool = True,
+    prefetch: Optional['UpstreamPrefetch'] = None,
+) -> None:
+    """Thêm các bước sau đồng bộ, chạy sau các bước `after`.
+
+    Push tag và cập nhật branch khác là hai thao tác mạng độc lập nên chạy song
+    song; cả hai chỉ bắt đầu sau khi tag đã được tạo trên HEAD hiện tại. Việc
+    fetch các branch khác chỉ cần chờ `fetch_after`. `include_tag=False` khi
+    tag đã được push cùng branch.
+    """
+    final: List[str] = list(after)
+    tag_deps: Tuple[str, ...] = tuple(after)
+    if args.tag and include_tag:
+        plan.command('tag-create', ['git', 'tag', args.tag], after, phase='post-sync',
+                     before=(t('creating_tag', tag=args.tag),))
+        plan.command('tag-push', ['git', 'push', 'origin', args.tag], ('tag-create',), phase='post-sync',
+                     before=(t('pushing_tag', tag=args.tag),))
+        plan.task('tag-report', lambda results: _report_tag_push(args.tag, results['tag-push']), ('tag-push',),
+                  description=t('plan_report_tag', tag=args.tag))
+        tag_deps = ('tag-create',)
+        final = ['tag-report']
     if args.update_after:
-        _update_target_branch(args.update_after, original_branch)
+        update = _plan_update_after(plan, args.update_after, original_branch, upstreams, tag_deps, fetch_after, prefetch)
+        if update is not None:
+            final.append(update)
+    cmd = get_post_sync_hook()
+    if cmd:
+        plan.task('post-hook', lambda results: _run_hook_command(cmd, 'post_sync'), final,
+                  description=t('plan_post_hook', command=cmd))
+
+def _report_tag_push(tag_name: str, result: Tuple[int, str]) -> bool:
+    if result[0] == 0:
+        print(colorize(t('tag_pushed_successfully', tag=tag_name), 'success'))
+    else:
+        print(colorize(t('tag_push_failed', tag=tag_name), 'error'), file=sys.stderr)
+    return result[0] == 0
+
+def _split_branch_names(targets: Union[str, Sequence[str]]) -> List[str]:
+    """Chuẩn hoá --update-after: chấp nhận nhiều tên, kể cả dạng 'a,b'."""
+    if isinstance(targets, str):
+        targets = [targets]
+    names: List[str] = []
+    for item in targets:
+        for name in item.split(','):
+            name = name.strip()
+            if name and name not in names:
+                names.append(name)
+    return names
+
+def _fast_forward_ref(branch: str, tracking_ref: str) -> Optional[bool]:
+    """Fast-forward refs/heads/<branch> tới tracking_ref mà không đụng vào working tree.
 
-    _run_post_sync_hook_if_needed()
+    Trả về True nếu đã cập nhật (hoặc vốn đã mới nhất), False nếu không thể
+    fast-forward, None nếu không đọc được ref.
+    """
+    local_code, local_sha = run_command(['git', 'rev-parse', '--verify', '-q', f'refs/heads/{branch}'], echo=False)
+    remote_code, remote_sha = run_command(['git', 'rev-parse', '--verify', '-q', tracking_ref], echo=False)
+    if local_code != 0 or remote_code != 0 or not local_sha or not remote_sha:
+        return None
+    if local_sha == remote_sha:
+        return True
+    ancestor_code, _ = run_command(['git', 'merge-base', '--is-ancestor', local_sha, remote_sha], echo=False)
+    if ancestor_code != 0:
+        return False
+    update_code, _ = run_command([
+        'git', 'update-ref', '-m', f'git-sync: fast-forward {branch}',
+        f'refs/heads/{branch}', remote_sha, local_sha,
+    ])
+    return update_code == 0
+
+def _update_target_branch(targets: Union[str, Sequence[str]], original_branch: Optional[str]) -> None:
+    """Cập nhật các branch khác bằng một lần fetch và fast-forward ref, không checkout."""
+    from .plan import Plan, execute_plan
+    from .upstream import read_upstreams
+
+    branches = [b for b in _split_branch_names(targets) if b != original_branch]
+    if not branches:
+        return
+    plan = Plan()
+    _plan_update_after(plan, branches, original_branch, read_upstreams(branches))
+    execute_plan(plan)
+
+def _plan_update_after(
+    plan: 'Plan',
+    targets: Union[str, Sequence[str]],
+    original_branch: Optional[str],
+    upstreams: Upstreams,
+    deps: Sequence[str] = (),
+    fetch_deps: Sequence[str] = (),
+    prefetch: Optional['UpstreamPrefetch'] = None,
+) -> Optional[str]:
+    """Thêm một lệnh fetch cho mỗi remote và một bước fast-forward; trả về tên bước cuối (None nếu không có gì).
+
+    Branch đã nằm trong lần fetch nền (`prefetch`) thì không cần fetch lại,
+    trừ khi lần fetch đó thất bại hoặc quá hạn: khi đó fetch lại ở foreground.
+    """
+    from .upstream import group_refspecs
+
+    branches = [b for b in _split_branch_names(targets) if b != original_branch]
+    if not branches:
+        return None
+
+    prefetched = set(prefetch.others) if prefetch is not None else set()
+    to_fetch = [b for b in branches if b not in prefetched]
+    fetches: Dict[str, str] = {}
+    for remote, refspecs in group_refspecs(upstreams, to_fetch).items():
+        fetches[remote] = plan.command(
+            f'fetch-{remote}', ['git', 'fetch', '--quiet', remote, *refspecs], fetch_deps, phase='fetch', echo=False,
+            before=(t('fetching_branches', remote=remote, count=len(refspecs)),),
+        )
+
+    def update(results: Dict[str, object]) -> None:
+        fetched = {b for b in to_fetch if b in upstreams and results[fetches[upstreams[b][0]]][0] == 0}  # type: ignore[index]
+        if prefetch is not None and prefetched:
+            prefetch.wait()
+            # Bản sao: khi quá hạn, thread nền vẫn có thể đang ghi vào
+            done = dict(prefetch.fetched)
+            fetched.update(b for b in prefetched if b in done)
+            missed = [b for b in branches if b in prefetched and b not in fetched]
+            if missed:
+                fetched.update(_fetch_branches(upstreams, missed))
+        _fast_forward_targets(branches, upstreams, fetched, original_branch, prefetch)
+
+    return plan.task('update-after', update, _after_prefetch(plan, (*deps, *fetches.values())),
+                     description=t('plan_update_branches', branches=', '.join(branches)))
+
+def _fetch_branches(upstreams: Upstreams, branches: Sequence[str]) -> Set[str]:
+    """Fetch các branch ở foreground (một lệnh cho mỗi remote); trả về các branch đã fetch được."""
+    from .upstream import group_refspecs
 
-def _update_target_branch(target_branch: str, original_branch: Optional[str]) -> None:
+    fetched: Set[str] = set()
+    for remote, refspecs in group_refspecs(upstreams, branches).items():
+        print(colorize(t('fetching_branches', remote=remote, count=len(refspecs)), 'info'))
+        code, _ = run_command(['git', 'fetch', '--quiet', remote, *refspecs], echo=False)
+        if code == 0:
+            fetched.update(b for b in branches if b in upstreams and upstreams[b][0] == remote)
+    return fetched
+
+@timed_phase('update-after')
+def _fast_forward_targets(
+    branches: Sequence[str],
+    upstreams: Upstreams,
+    fetched: Set[str],
+    original_branch: Optional[str],
+    prefetch: Optional['UpstreamPrefetch'] = None,
+) -> None:
+    """Fast-forward ref của các branch đã fetch (`fetched`); chỉ quay về cách checkout + pull --rebase
+    cho branch không có upstream hoặc không thể fast-forward (branch local có commit riêng).
+
+    Branch có upstream nhưng fetch thất bại thì chỉ cảnh báo và bỏ qua: pull cũng sẽ thất bại như vậy,
+    sau khi đã đổi working tree. Không checkout khi lần fetch nền (`prefetch`) còn đang chạy.
+    """
+    print(colorize(t('updating_other_branch_header'), 'info'))
+    for branch in branches:
+        upstream = upstreams.get(branch)
+        if upstream is not None:
+            if branch not in fetched:
+                print(colorize(t('update_branch_fetch_failed', branch=branch), 'warning'), file=sys.stderr)
+                continue
+            updated = _fast_forward_ref(branch, upstream[2])
+            if updated:
+                print(colorize(t('update_branch_success', branch=branch), 'success'))
+                continue
+            if updated is None:
+                print(colorize(t('update_branch_failed', branch=branch), 'error'), file=sys.stderr)
+                continue
+            print(colorize(t('fast_forward_impossible', branch=branch), 'warning'))
+        if prefetch is not None and prefetch.started and not prefetch.done:
+            print(colorize(t('update_branch_checkout_busy', branch=branch), 'warning'), file=sys.stderr)
+            continue
+        _update_target_branch_with_checkout(branch, original_branch)
+
+def _update_target_branch_with_checkout(target_branch: str, original_branch: Optional[str]) -> None:
     """Hàm nội bộ để checkout, pull một branch khác rồi quay lại."""
     if target_branch == original_branch:
         return
 
-    print(colorize(t('updating_other_branch_header'), 'info'))
-    
     print(colorize(t('switching_to_branch', branch=target_branch), 'info'))
     checkout_code, _ = run_command(['git', 'checkout', target_branch])
     if checkout_code != 0:
@@ -287,33 +1203,35 @@ def _update_target_branch(target_branch: str, original_branch: Optional[str]) ->
         return
 
     print(colorize(t('pulling_latest_for_branch', branch=target_branch), 'info'))
-    run_command(['git', 'pull', '--rebase'])
+    stream_command(['git', 'pull', '--rebase', '--progress'])
 
     print(colorize(t('returning_to_previous_branch', branch=original_branch), 'info'))
     run_command(['git', 'checkout', original_branch])
     print(colorize(t('update_branch_success', branch=target_branch), 'success'))
 
-def _run_pre_sync_hook_if_needed() -> None:
+def _run_pre_sync_hook_if_needed() -> bool:
+    """Chạy pre_sync hook nếu có cấu hình; trả về True nếu hook đã được chạy."""
     cmd = get_pre_sync_hook()
     if not cmd:
-        return
+        return False
     _run_hook_command(cmd, 'pre_sync')
+    return True
 
-def _run_post_sync_hook_if_needed() -> None:
-    cmd = get_post_sync_hook()
-    if not cmd:
-        return
-    _run_hook_command(cmd, 'post_sync')
-
+@timed_phase('hooks')
 def _run_hook_command(cmd_str: str, hook_name: str) -> None:
+    from .metrics import METRICS
+
     try:
         args = shlex.split(cmd_str)
     except ValueError:
         print(colorize(t('hook_parse_error', hook=hook_name), 'error'), file=sys.stderr)
+        METRICS.inc('git_sync_hook_runs_total', hook=hook_name, result='failed')
         sys.exit(1)
 
     print(colorize(t('running_hook', hook=hook_name, command=cmd_str), 'info'))
-    code, _ = run_command(args)
+    with METRICS.timer('git_sync_hook_duration_seconds', hook=hook_name):
+        code, _ = run_command(args)
+    METRICS.inc('git_sync_hook_runs_total', hook=hook_name, result='ok' if code == 0 else 'failed')
     if code != 0:
         print(colorize(t('hook_failed', hook=hook_name), 'error'), file=sys.stderr)
         sys.exit(code)
\ No newline at end of file
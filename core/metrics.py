@@ -0,0 +1,312 @@
+# Tệp: core/metrics.py
+
+import contextlib
+import functools
+import marshal
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from . import git_utils
+from .config import get_cache_dir, get_settings, t
+from .events import EVENTS
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+# Cận trên (giây) của các bucket thời gian: từ một hook nhanh tới lần đồng bộ phải chờ retry lâu
+DURATION_BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+# Tăng khi đổi cấu trúc trạng thái cộng dồn lưu trong cache
+_STATE_VERSION: int = 1
+
+# Tên metric -> (kiểu, mô tả); thứ tự ở đây là thứ tự khi xuất
+FAMILIES: Dict[str, Tuple[str, str]] = {
+    'git_sync_runs_total': ('counter', 'Finished git-sync runs by operation and outcome.'),
+    'git_sync_run_duration_seconds': ('histogram', 'Wall time of a git-sync run.'),
+    'git_sync_last_run_timestamp_seconds': ('gauge', 'Unix time at which the last run of each operation finished.'),
+    'git_sync_pushes_total': ('counter', 'Pushes (including their fetch/rebase retries) by result.'),
+    'git_sync_push_attempts_total': ('counter', 'Individual git push invocations.'),
+    'git_sync_push_rejections_total': ('counter', 'Pushes rejected because the remote had commits missing locally.'),
+    'git_sync_push_duration_seconds': ('histogram', 'Wall time of a push, including fetch/rebase retries and backoff.'),
+    'git_sync_hook_runs_total': ('counter', 'pre_sync/post_sync hook runs by result.'),
+    'git_sync_hook_duration_seconds': ('histogram', 'Wall time of a pre_sync/post_sync hook.'),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+_Key = Tuple[str, Labels]
+
+
+class Snapshot:
+    """Giá trị của mọi metric tại một thời điểm (dạng marshal được).
+
+    Histogram lưu số mẫu của từng bucket (không cộng dồn; phần tử cuối là
+    các mẫu lớn hơn bucket lớn nhất) rồi tới tổng thời gian.
+    """
+
+    def __init__(
+        self,
+        counters: Optional[Dict[_Key, float]] = None,
+        gauges: Optional[Dict[_Key, float]] = None,
+        histograms: Optional[Dict[_Key, List[float]]] = None,
+    ) -> None:
+        self.counters: Dict[_Key, float] = counters or {}
+        self.gauges: Dict[_Key, float] = gauges or {}
+        self.histograms: Dict[_Key, List[float]] = histograms or {}
+
+    def copy(self) -> 'Snapshot':
+        return Snapshot(dict(self.counters), dict(self.gauges), {k: list(v) for k, v in self.histograms.items()})
+
+    def add(self, current: 'Snapshot', previous: 'Snapshot') -> None:
+        """Cộng vào phần tăng thêm `current - previous` (gauge thì lấy giá trị mới nếu đã đổi)."""
+        for key, value in current.counters.items():
+            delta = value - previous.counters.get(key, 0)
+            if delta:
+                self.counters[key] = self.counters.get(key, 0) + delta
+        for key, value in current.gauges.items():
+            if previous.gauges.get(key) != value:
+                self.gauges[key] = value
+        for key, values in current.histograms.items():
+            before = previous.histograms.get(key)
+            target = self.histograms.setdefault(key, [0] * len(values))
+            for i, value in enumerate(values):
+                target[i] += value - (before[i] if before else 0)
+
+    def to_primitive(self) -> Dict[str, Any]:
+        return {'counters': self.counters, 'gauges': self.gauges, 'histograms': self.histograms}
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(labels: Labels) -> str:
+    return ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() and abs(value) < 1e15 else repr(float(value))
+
+
+def render(snapshot: Snapshot, buckets: Tuple[float, ...] = DURATION_BUCKETS, openmetrics: bool = False) -> str:
+    """Xuất theo định dạng text của Prometheus (textfile collector) hoặc OpenMetrics."""
+    bounds = [*(repr(b) for b in buckets), '+Inf']
+    lines: List[str] = []
+    for name, (kind, help_text) in FAMILIES.items():
+        source = {'counter': snapshot.counters, 'gauge': snapshot.gauges, 'histogram': snapshot.histograms}[kind]
+        keys = sorted(key for key in source if key[0] == name)
+        if not keys:
+            continue
+        # OpenMetrics đặt tên family của counter không kèm hậu tố _total
+        family = name[:-len('_total')] if openmetrics and kind == 'counter' else name
+        lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {kind}')
+        for key in keys:
+            labels = _format_labels(key[1])
+            braced = f'{{{labels}}}' if labels else ''
+            if kind != 'histogram':
+                lines.append(f'{name}{braced} {_format_value(source[key])}')
+                continue
+            values = source[key]
+            prefix = f'{name}_bucket{{{labels},le="' if labels else f'{name}_bucket{{le="'
+            cumulative = 0
+            for bound, count in zip(bounds, values):
+                cumulative += count
+                lines.append(f'{prefix}{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{braced} {_format_value(values[-1])}')
+            lines.append(f'{name}_count{braced} {cumulative}')
+    if openmetrics:
+        lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+@contextlib.contextmanager
+def _locked_state(path: Path) -> Iterator[Any]:
+    """Mở file trạng thái cộng dồn và khoá nó giữa các tiến trình git-sync chạy cùng lúc (nhiều repo).
+
+    Chỉ git-sync đọc file này và luôn đọc dưới khoá nên được ghi đè tại chỗ:
+    rẻ hơn một file tạm + `os.replace`. Không có fcntl (Windows) thì không khoá.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    with os.fdopen(fd, 'r+b') as handle:
+        try:
+            import fcntl
+        except ImportError:
+            pass
+        else:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        yield handle
+
+
+class MetricsRegistry:
+    """Counters, gauges và histogram của tiến trình hiện tại.
+
+    Mỗi lần ghi chỉ là cập nhật một dict trong bộ nhớ; việc ghi ra file
+    (`export`) diễn ra một lần khi kết thúc, hoặc sau mỗi vòng của --watch.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS) -> None:
+        self.buckets = buckets
+        self.values = Snapshot()
+        # Những gì đã được cộng vào textfile; lần export sau chỉ ghi phần tăng thêm
+        self._exported = Snapshot()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, str]) -> _Key:
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name: str, by: float = 1, **labels: str) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self.values.counters[key] = self.values.counters.get(key, 0) + by
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        with self._lock:
+            self.values.gauges[self._key(name, labels)] = value
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        key = self._key(name, labels)
+        index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        with self._lock:
+            values = self.values.histograms.get(key)
+            if values is None:
+                values = self.values.histograms[key] = [0] * (len(self.buckets) + 2)
+            values[index] += 1
+            values[-1] += seconds
+
+    @contextlib.contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        """Đo thời gian vào histogram `name`, kể cả khi thân hàm thoát bằng sys.exit; dùng được cả làm decorator."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self, openmetrics: bool = False) -> str:
+        with self._lock:
+            snapshot = self.values.copy()
+        return render(snapshot, self.buckets, openmetrics)
+
+    def export(self) -> None:
+        """Cộng phần tăng thêm vào textfile đã cấu hình ([metrics] textfile); không làm gì nếu chưa bật."""
+        path = get_settings().metrics_textfile
+        if not path or git_utils.DRY_RUN:
+            return
+        with self._lock:
+            current = self.values.copy()
+        if current.to_primitive() == self._exported.to_primitive():
+            return
+        try:
+            self.write_textfile(Path(path), current)
+        except OSError as e:
+            print(t('metrics_write_failed', path=path, error=str(e)), file=sys.stderr)
+            return
+        self._exported = current
+
+    def write_textfile(self, path: Path, current: Snapshot) -> None:
+        """Gộp với trạng thái cộng dồn của các lần chạy trước rồi thay file một cách nguyên tử.
+
+        Textfile collector đọc file bất cứ lúc nào nên file mới được ghi ra
+        tên tạm trong cùng thư mục rồi `os.replace`.
+        """
+        import hashlib
+
+        digest = hashlib.sha1(str(path.resolve()).encode('utf-8')).hexdigest()[:16]
+        with _locked_state(get_cache_dir() / f"metrics-{digest}.marshal") as state:
+            try:
+                cached = marshal.load(state)
+            except (EOFError, ValueError, TypeError):
+                cached = None
+            total = Snapshot()
+            if isinstance(cached, tuple) and len(cached) == 3 and cached[:2] == (_STATE_VERSION, self.buckets):
+                total = Snapshot(**cached[2])
+            # Bucket khác (bản git-sync khác) thì bắt đầu lại từ 0: Prometheus hiểu đó là counter reset
+            total.add(current, self._exported)
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as handle:
+                    handle.write(render(total, self.buckets))
+                os.replace(tmp_path, path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            # Chỉ lưu trạng thái sau khi textfile đã được thay: ghi lỗi thì lần sau cộng lại đúng phần này
+            state.seek(0)
+            marshal.dump((_STATE_VERSION, self.buckets, total.to_primitive()), state)
+            state.truncate()
+
+    def serve_http(self, address: str) -> Any:
+        """Phục vụ /metrics trên `host:port` trong một thread nền (cho tiến trình sống lâu như --watch)."""
+        import http.server
+
+        host, _, port = address.rpartition(':')
+        registry = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                openmetrics = 'application/openmetrics-text' in self.headers.get('Accept', '')
+                body = registry.render(openmetrics).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+                                 if openmetrics else 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        server = http.server.ThreadingHTTPServer((host.strip('[]') or '127.0.0.1', int(port)), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='git-sync-metrics', daemon=True).start()
+        return server
+
+
+METRICS = MetricsRegistry()
+
+
+def timed_run(operation: str) -> Callable[[F], F]:
+    """Decorator cho điểm vào của một lần chạy: đếm theo kết quả và đo thời gian."""
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            EVENTS.outcome = None
+            exit_code = 0
+            try:
+                return func(*args, **kwargs)
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                raise
+            except BaseException:
+                exit_code = 1
+                raise
+            finally:
+                METRICS.observe('git_sync_run_duration_seconds', time.perf_counter() - start, operation=operation)
+                METRICS.inc('git_sync_runs_total', operation=operation, outcome=EVENTS.final_outcome(exit_code))
+                METRICS.set('git_sync_last_run_timestamp_seconds', round(time.time(), 3), operation=operation)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+
+def start_http_server() -> Any:
+    """Mở endpoint HTTP nếu đã cấu hình ([metrics] listen); lỗi chỉ được báo, không dừng git-sync."""
+    address = get_settings().metrics_listen
+    if not address:
+        return None
+    try:
+        server = METRICS.serve_http(address)
+    except (OSError, ValueError) as e:
+        print(t('metrics_listen_failed', address=address, error=str(e)), file=sys.stderr)
+        return None
+    host, port = server.server_address[:2]
+    print(t('metrics_listening', url=f"http://{host}:{port}/metrics"), file=sys.stderr)
+    return server
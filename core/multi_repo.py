@@ -0,0 +1,190 @@
+# Tệp: core/multi_repo.py
+
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from .config import t
+from .console import colorize
+from .events import EVENTS
+
+# Các cờ chỉ dành cho tiến trình điều phối, không chuyển xuống từng repo
+_MULTI_REPO_FLAGS = {'--repos': '+', '--workspace': 1, '-j': 1, '--jobs': 1}
+# Các cờ ngắn khác -j có nhận giá trị (phần sau chúng trong một cụm như `-sapi` là giá trị, không phải cờ)
+_SHORT_VALUE_FLAGS = {'s'}
+_GIT_SYNC_SCRIPT = Path(__file__).resolve().parent.parent / 'git_sync.py'
+# "Xoá tới cuối dòng" mà git/remote gửi kèm sau \r khi vẽ lại dòng tiến trình
+_ERASE_LINE_RE = re.compile(r'\x1b\[[0-2]?K')
+
+
+@dataclass
+class RepoResult:
+    """Kết quả đồng bộ một repo trong chế độ nhiều repo."""
+    repo: Path
+    returncode: int
+    duration: float
+    output: str
+    # Với --output=jsonl: các dòng sự kiện (stdout) của tiến trình con; `output` khi đó là stderr
+    events: List[str] = field(default_factory=list)
+
+
+def default_jobs() -> int:
+    """Số worker mặc định: theo số CPU nhưng không quá 8."""
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+def discover_repositories(workspace: Path) -> List[Path]:
+    """Tìm các repo Git nằm ngay dưới thư mục workspace."""
+    if not workspace.is_dir():
+        return []
+    return sorted(p for p in workspace.iterdir() if p.is_dir() and (p / '.git').exists())
+
+
+def strip_multi_repo_args(argv: Sequence[str]) -> List[str]:
+    """Bỏ các cờ --repos/--workspace/--jobs khỏi argv để chuyển xuống từng repo.
+
+    Nhận đủ các dạng argparse chấp nhận: `--jobs 4`, `--jobs=4`, `-j 4`, `-j4`
+    và `-j` nằm cuối một cụm cờ ngắn (`-yj4`). Cờ dài viết tắt không cần xử lý
+    vì parser không cho phép viết tắt.
+    """
+    forwarded: List[str] = []
+    skipping_many = False
+    skip_count = 0
+    for arg in argv:
+        if skip_count:
+            skip_count -= 1
+            continue
+        if skipping_many and not arg.startswith('-'):
+            continue
+        skipping_many = False
+
+        name = arg.split('=', 1)[0] if arg.startswith('--') else arg[:2]
+        if name in _MULTI_REPO_FLAGS:
+            if arg == name:
+                arity = _MULTI_REPO_FLAGS[name]
+                if arity == '+':
+                    skipping_many = True
+                else:
+                    skip_count = int(arity)
+            continue
+        cluster = _strip_short_jobs(arg)
+        if cluster is not None:
+            kept, needs_value = cluster
+            skip_count = int(needs_value)
+            forwarded.append(kept)
+            continue
+        forwarded.append(arg)
+
+    # Các repo chạy song song nên không thể hỏi xác nhận tương tác
+    if '-y' not in forwarded and '--yes' not in forwarded:
+        forwarded.append('--yes')
+    return forwarded
+
+
+def _strip_short_jobs(arg: str) -> Optional[Tuple[str, bool]]:
+    """Cụm cờ ngắn chứa -j (ví dụ `-yj4`): trả về (phần còn giữ lại, -j có lấy giá trị ở token sau không).
+
+    None nếu `arg` không phải cụm như vậy. Duyệt từ trái sang: gặp cờ ngắn
+    nhận giá trị thì phần còn lại của cụm là giá trị của nó.
+    """
+    if not arg.startswith('-') or arg.startswith('--') or len(arg) < 3:
+        return None
+    for index, flag in enumerate(arg[1:], 1):
+        if flag == 'j':
+            return arg[:index], index == len(arg) - 1
+        if flag in _SHORT_VALUE_FLAGS:
+            return None
+    return None
+
+
+def collapse_progress(raw: str) -> str:
+    """Chỉ giữ trạng thái cuối của các dòng tiến trình được vẽ lại bằng \r.
+
+    Output gom lại được in một lần sau khi repo chạy xong, nên mỗi lần vẽ lại
+    (hay một dòng chỉ còn \r và mã xoá dòng) không được thành một dòng riêng.
+    """
+    lines: List[str] = []
+    for line in raw.replace('\r\n', '\n').split('\n'):
+        if '\r' not in line:
+            lines.append(line)
+            continue
+        segments = [seg for seg in line.split('\r') if _ERASE_LINE_RE.sub('', seg).strip()]
+        if segments:
+            lines.append(_ERASE_LINE_RE.sub('', segments[-1]))
+    return '\n'.join(lines)
+
+
+def _sync_one_repo(repo: Path, forwarded_args: Sequence[str]) -> RepoResult:
+    """Chạy git-sync trong một tiến trình riêng, cwd là repo, gom toàn bộ output."""
+    start = time.perf_counter()
+    events: List[str] = []
+    try:
+        result = subprocess.run(
+            [sys.executable, str(_GIT_SYNC_SCRIPT), *forwarded_args],
+            cwd=repo,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE if EVENTS.enabled else subprocess.STDOUT,
+            check=False,
+        )
+        # Không dùng text=True: chế độ universal newlines biến mỗi \r thành một dòng mới
+        stdout = result.stdout.decode('utf-8', errors='replace')
+        returncode, output = result.returncode, collapse_progress(stdout)
+        if EVENTS.enabled:
+            events = stdout.splitlines()
+            output = collapse_progress(result.stderr.decode('utf-8', errors='replace'))
+    except OSError as e:
+        returncode, output = -1, t('unexpected_error', error=str(e))
+    return RepoResult(repo, returncode, time.perf_counter() - start, output, events)
+
+
+def print_summary(results: Sequence[RepoResult]) -> None:
+    """In bảng tổng hợp: repo, kết quả và thời gian chạy."""
+    width = max([len(str(r.repo)) for r in results] + [len(t('multi_repo_column_repo'))])
+    print(colorize(t('multi_repo_summary_header'), 'info'))
+    print(f"{t('multi_repo_column_repo'):<{width}}  {t('multi_repo_column_result'):<10}  {t('multi_repo_column_duration'):>10}")
+    print("-" * (width + 24))
+    for r in results:
+        status = t('multi_repo_result_ok') if r.returncode == 0 else t('multi_repo_result_failed', code=r.returncode)
+        line = f"{str(r.repo):<{width}}  {status:<10}  {r.duration:>9.2f}s"
+        print(colorize(line, 'success' if r.returncode == 0 else 'error'))
+
+
+def run_multi_repo_sync(repos: Sequence[Path], argv: Sequence[str], jobs: Optional[int] = None) -> int:
+    """Đồng bộ nhiều repo song song với số worker giới hạn; trả về exit code tổng hợp."""
+    if not repos:
+        print(colorize(t('multi_repo_no_repos'), 'error'), file=sys.stderr)
+        return 1
+
+    forwarded_args = strip_multi_repo_args(argv)
+    workers = max(1, jobs or default_jobs())
+    print(colorize(t('multi_repo_header', count=len(repos), jobs=workers), 'info'))
+
+    print_lock = threading.Lock()
+
+    def run_and_report(repo: Path) -> RepoResult:
+        result = _sync_one_repo(repo, forwarded_args)
+        # In output của từng repo thành một khối liền, không xen kẽ với repo khác
+        with print_lock:
+            print(colorize(f"\n=== {result.repo} ===", 'info'))
+            if result.output:
+                print(result.output, end='' if result.output.endswith('\n') else '\n')
+        for line in result.events:
+            EVENTS.forward(line, repo=str(result.repo))
+        EVENTS.emit('repo', repo=str(result.repo), exit_code=result.returncode,
+                    duration_ms=round(result.duration * 1000, 1))
+        return result
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run_and_report, repos))
+
+    print()
+    print_summary(results)
+    return 0 if all(r.returncode == 0 for r in results) else 1
@@ -0,0 +1,291 @@
+# Tệp: core/plan.py
+
+import contextlib
+import shlex
+import sys
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from . import git_utils
+from .config import t
+from .console import colorize
+from .git_broker import is_read_only
+from .git_utils import run_command, run_command_async
+from .timings import RECORDER
+
+# Lệnh mạng có thể gộp: cùng tuỳ chọn, cùng remote thì nối danh sách refspec
+_MERGEABLE_SUBCOMMANDS: Tuple[str, ...] = ('fetch', 'push')
+
+Results = Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class PlanStep:
+    """Một bước của kế hoạch: hoặc một lệnh (`argv`), hoặc một tác vụ Python (`task`).
+
+    - Lệnh trả về `(mã lỗi, output)` như run_command; `check=True` thì mã khác 0
+      dừng cả kế hoạch bằng sys.exit(1).
+    - Tác vụ nhận kết quả của các bước đã xong (theo tên) và trả về giá trị bất kỳ.
+    - `before`/`after` là các thông báo (đã dịch) in ra trước/sau khi bước chạy.
+    - `timed=True` in thêm thời gian chạy của bước khi nó kết thúc.
+    - `interactive=True` cho bước có thể hỏi người dùng: nó chạy trên thread
+      chính để Ctrl-C lúc đang chờ nhập dừng được ngay.
+    - `input_from` (tên một bước trong `deps`) lấy stdin của lệnh từ kết quả
+      của bước đó lúc chạy, thay cho `input_data` cố định.
+    """
+    name: str
+    argv: Tuple[str, ...] = ()
+    task: Optional[Callable[[Results], Any]] = None
+    deps: Tuple[str, ...] = ()
+    phase: Optional[str] = None
+    description: str = ''
+    input_data: Optional[str] = None
+    echo: bool = True
+    check: bool = False
+    before: Tuple[str, ...] = ()
+    after: Tuple[str, ...] = ()
+    timed: bool = False
+    interactive: bool = False
+    input_from: Optional[str] = None
+
+    @property
+    def is_command(self) -> bool:
+        return self.task is None
+
+
+class Plan:
+    """Đồ thị các bước (theo thứ tự khai báo; mỗi bước chỉ phụ thuộc vào bước trước nó)."""
+
+    def __init__(self) -> None:
+        self.steps: List[PlanStep] = []
+        # Bước đã bị gộp/khử trùng lặp -> bước thực sự chạy thay nó
+        self.aliases: Dict[str, str] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.aliases or any(step.name == name for step in self.steps)
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    @property
+    def names(self) -> List[str]:
+        return [step.name for step in self.steps]
+
+    def add(self, step: PlanStep) -> str:
+        if step.name in self:
+            raise ValueError(f"Duplicate plan step: {step.name}")
+        unknown = [dep for dep in step.deps if dep not in self]
+        if unknown:
+            raise ValueError(f"Step '{step.name}' depends on undeclared step(s): {', '.join(unknown)}")
+        if step.input_from is not None and step.input_from not in step.deps:
+            raise ValueError(f"Step '{step.name}' reads stdin from '{step.input_from}' without depending on it")
+        self.steps.append(step)
+        return step.name
+
+    def leaves(self) -> Tuple[str, ...]:
+        """Các bước không bước nào khác phụ thuộc vào: bước thêm sau chúng sẽ chạy sau cùng."""
+        used = {dep for step in self.steps for dep in step.deps}
+        return tuple(step.name for step in self.steps if step.name not in used)
+
+    def command(self, name: str, argv: Sequence[str], deps: Sequence[str] = (), **options: Any) -> str:
+        return self.add(PlanStep(name, tuple(argv), deps=tuple(deps), **options))
+
+    def task(self, name: str, func: Callable[[Results], Any], deps: Sequence[str] = (), **options: Any) -> str:
+        return self.add(PlanStep(name, task=func, deps=tuple(deps), **options))
+
+
+def _split_network_command(argv: Sequence[str]) -> Optional[Tuple[str, Tuple[str, ...], str, Tuple[str, ...]]]:
+    """`git fetch|push [tuỳ chọn...] <remote> <refspec...>` -> (lệnh, tuỳ chọn, remote, refspecs)."""
+    if len(argv) < 2 or argv[0] != 'git' or argv[1] not in _MERGEABLE_SUBCOMMANDS:
+        return None
+    rest = list(argv[2:])
+    options: List[str] = []
+    while rest and rest[0].startswith('-'):
+        options.append(rest.pop(0))
+    # Không có remote/refspec tường minh thì ngữ nghĩa phụ thuộc cấu hình: không gộp
+    if len(rest) < 2:
+        return None
+    return argv[1], tuple(options), rest[0], tuple(rest[1:])
+
+
+def _merge_key(step: PlanStep) -> Optional[Tuple[Any, ...]]:
+    if not step.is_command or step.input_data is not None or step.input_from is not None:
+        return None
+    parts = _split_network_command(step.argv)
+    if parts is None:
+        return None
+    sub, options, remote, _ = parts
+    return sub, options, remote, step.deps, step.phase, step.echo, step.check
+
+
+def optimize(plan: Plan) -> Plan:
+    """Trả về kế hoạch tương đương nhưng ít lệnh hơn.
+
+    - Truy vấn chỉ đọc giống hệt nhau (cùng argv, stdin và phụ thuộc) chỉ chạy một lần.
+    - Các `git fetch`/`git push` cùng tuỳ chọn, cùng remote và cùng phụ thuộc
+      được gộp thành một lệnh với toàn bộ refspec, tức là một lần kết nối.
+    Bước bị loại trở thành alias: kết quả của bước gộp được trả cho cả hai tên.
+    """
+    result = Plan()
+    result.aliases = dict(plan.aliases)
+    queries: Dict[Tuple[Any, ...], str] = {}
+    network: Dict[Tuple[Any, ...], str] = {}
+    index: Dict[str, int] = {}
+
+    def resolve(name: str) -> str:
+        while name in result.aliases:
+            name = result.aliases[name]
+        return name
+
+    for step in plan.steps:
+        deps = tuple(dict.fromkeys(resolve(dep) for dep in step.deps))
+        step = replace(step, deps=deps)
+
+        if step.is_command and is_read_only(step.argv):
+            key = (step.argv, step.input_data, step.input_from, step.deps, step.echo)
+            if key in queries:
+                result.aliases[step.name] = queries[key]
+                continue
+            queries[key] = step.name
+
+        merge_key = _merge_key(step)
+        if merge_key is not None and merge_key in network:
+            target = network[merge_key]
+            position = index[target]
+            merged = result.steps[position]
+            refspecs = _split_network_command(step.argv)[3]  # type: ignore[index]
+            argv = merged.argv + tuple(r for r in refspecs if r not in merged.argv)
+            result.steps[position] = replace(
+                merged, argv=argv,
+                before=merged.before + step.before, after=merged.after + step.after,
+            )
+            result.aliases[step.name] = target
+            continue
+        if merge_key is not None:
+            network[merge_key] = step.name
+
+        index[step.name] = len(result.steps)
+        result.steps.append(step)
+    return result
+
+
+def describe(plan: Plan) -> List[str]:
+    """Mỗi bước một dòng: tên, pha, lệnh chính xác (hoặc mô tả tác vụ) và các phụ thuộc."""
+    lines: List[str] = []
+    merged: Dict[str, List[str]] = {}
+    for alias, target in plan.aliases.items():
+        merged.setdefault(target, []).append(alias)
+    for number, step in enumerate(plan.steps, 1):
+        text = shlex.join(step.argv) if step.is_command else step.description or step.name
+        if step.is_command and step.description:
+            text += f"  ({step.description})"
+        name = '+'.join([step.name, *merged.get(step.name, [])])
+        line = f"{number:>3}. {name} [{step.phase or step.name}] {text}"
+        if step.deps:
+            line += f"  ← {', '.join(step.deps)}"
+        lines.append(line)
+    return lines
+
+
+def _phase_label(step: PlanStep) -> str:
+    """Pha dùng cho --timings; tác vụ không khai báo pha tự đo bằng `timed_phase` bên trong."""
+    return step.phase or (step.name if step.is_command else '')
+
+
+def _announce(step: PlanStep) -> None:
+    for message in step.before:
+        print(colorize(message, 'info'))
+
+
+def _conclude(step: PlanStep, start: float) -> None:
+    for message in step.after:
+        print(colorize(message, 'info'))
+    if step.timed:
+        print(colorize(t('plan_step_time', step=step.name, seconds=f"{time.perf_counter() - start:.2f}"), 'info'))
+
+
+def _input_for(step: PlanStep, results: Results) -> Optional[str]:
+    return results[step.input_from] if step.input_from is not None else step.input_data
+
+
+def _run_step(step: PlanStep, results: Results) -> Any:
+    """Chạy một bước trên thread hiện tại (tác vụ, hoặc lệnh của bước tương tác)."""
+    _announce(step)
+    label = _phase_label(step)
+    start = time.perf_counter()
+    with RECORDER.phase(label, record=False) if label else contextlib.nullcontext():
+        if step.task is not None:
+            value = step.task(results)
+        else:
+            value = run_command(list(step.argv), echo=step.echo, input_data=_input_for(step, results))
+            if step.check and value[0] != 0:
+                sys.exit(1)
+    _conclude(step, start)
+    return value
+
+
+async def _run_command_step(step: PlanStep, results: Results) -> Tuple[int, str]:
+    """Chạy bước lệnh không tương tác như một tiến trình asyncio, ngay trên event loop."""
+    _announce(step)
+    start = time.perf_counter()
+    value = await run_command_async(
+        list(step.argv), echo=step.echo, input_data=_input_for(step, results), phase=_phase_label(step) or None,
+    )
+    if step.check and value[0] != 0:
+        sys.exit(1)
+    _conclude(step, start)
+    return value
+
+
+def execute_plan(plan: Plan) -> Results:
+    """Tối ưu rồi chạy kế hoạch; các bước độc lập chạy song song.
+
+    Bước lệnh chạy bằng asyncio.create_subprocess_exec trên event loop, nên
+    các lệnh git độc lập (fetch, push tag...) chồng lên nhau mà không cần thread.
+
+    Ở chế độ dry-run chỉ in kế hoạch đã tối ưu (đúng các lệnh sẽ chạy) mà
+    không chạy bước nào. Kết quả trả về theo tên bước, kể cả tên đã bị gộp.
+    """
+    optimized = optimize(plan)
+    if git_utils.DRY_RUN:
+        print(colorize(t('plan_header', count=len(optimized)), 'info'))
+        for line in describe(optimized):
+            print(line)
+        return {}
+    if not optimized.steps:
+        return {}
+
+    # asyncio chỉ được import khi thực sự có việc để chạy
+    from .async_engine import Step, execute, in_thread, on_loop
+
+    results: Results = {}
+    aliases_of: Dict[str, List[str]] = {}
+    for alias in optimized.aliases:
+        target = alias
+        while target in optimized.aliases:
+            target = optimized.aliases[target]
+        aliases_of.setdefault(target, []).append(alias)
+
+    def store(step: PlanStep, value: Any) -> Any:
+        for name in (step.name, *aliases_of.get(step.name, ())):
+            results[name] = value
+        return value
+
+    def run(step: PlanStep) -> Any:
+        return store(step, _run_step(step, results))
+
+    def spawn(step: PlanStep) -> Callable[[], Awaitable[Any]]:
+        async def action() -> Any:
+            return store(step, await _run_command_step(step, results))
+        return action
+
+    def action_for(step: PlanStep) -> Callable[[], Awaitable[Any]]:
+        # Lệnh chạy bằng asyncio.create_subprocess_exec; tác vụ Python (có thể
+        # chặn) chạy trong thread; bước tương tác chạy trên thread chính
+        if step.interactive:
+            return on_loop(run, step)
+        return in_thread(run, step) if step.task is not None else spawn(step)
+
+    execute([Step(step.name, action_for(step), step.deps, _phase_label(step)) for step in optimized.steps])
+    return results
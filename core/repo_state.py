@@ -0,0 +1,123 @@
+# Tệp: core/repo_state.py
+
+from typing import List, Optional
+
+from .git_utils import run_command
+from .timings import RECORDER, timed_phase
+
+
+class RepoState:
+    """Trạng thái repo lấy từ một lần gọi `git status --porcelain=v2 --branch -z`."""
+
+    __slots__ = (
+        'branch',
+        'oid',
+        'upstream',
+        'ahead',
+        'behind',
+        'staged',
+        'unstaged',
+        'untracked',
+        'conflicts',
+    )
+
+    def __init__(self) -> None:
+        self.branch: Optional[str] = None
+        self.oid: Optional[str] = None
+        self.upstream: Optional[str] = None
+        self.ahead: int = 0
+        self.behind: int = 0
+        self.staged: List[str] = []
+        self.unstaged: List[str] = []
+        self.untracked: List[str] = []
+        self.conflicts: List[str] = []
+
+    @property
+    def is_clean(self) -> bool:
+        return not (self.staged or self.unstaged or self.untracked or self.conflicts)
+
+    @property
+    def has_conflicts(self) -> bool:
+        return bool(self.conflicts)
+
+    @property
+    def is_initial(self) -> bool:
+        """Repo chưa có commit nào (HEAD chưa trỏ tới commit)."""
+        return self.oid is None
+
+    @property
+    def is_detached(self) -> bool:
+        return self.branch is None and self.oid is not None
+
+    def __repr__(self) -> str:
+        return (
+            f"RepoState(branch={self.branch!r}, upstream={self.upstream!r}, "
+            f"ahead={self.ahead}, behind={self.behind}, staged={len(self.staged)}, "
+            f"unstaged={len(self.unstaged)}, untracked={len(self.untracked)}, "
+            f"conflicts={len(self.conflicts)})"
+        )
+
+
+def parse_porcelain_v2(output: str) -> RepoState:
+    """Phân tích output dạng porcelain v2 (-z, có --branch) thành RepoState."""
+    state = RepoState()
+    fields = output.split('\0')
+    i = 0
+    while i < len(fields):
+        entry = fields[i]
+        i += 1
+        if entry.startswith('# '):
+            _parse_header(state, entry[2:])
+        elif entry.startswith('1 '):
+            parts = entry.split(' ', 8)
+            if len(parts) == 9:
+                _add_change(state, parts[1], parts[8])
+        elif entry.startswith('2 '):
+            parts = entry.split(' ', 9)
+            if len(parts) == 10:
+                _add_change(state, parts[1], parts[9])
+            # Với -z, đường dẫn gốc của rename/copy nằm ở field tiếp theo
+            i += 1
+        elif entry.startswith('u '):
+            parts = entry.split(' ', 10)
+            if len(parts) == 11:
+                state.conflicts.append(parts[10])
+        elif entry.startswith('? '):
+            state.untracked.append(entry[2:])
+    return state
+
+
+def _parse_header(state: RepoState, header: str) -> None:
+    key, _, value = header.partition(' ')
+    if key == 'branch.oid':
+        state.oid = None if value == '(initial)' else value
+    elif key == 'branch.head':
+        state.branch = None if value == '(detached)' else value
+    elif key == 'branch.upstream':
+        state.upstream = value
+    elif key == 'branch.ab':
+        ahead, _, behind = value.partition(' ')
+        state.ahead = int(ahead.lstrip('+') or 0)
+        state.behind = int(behind.lstrip('-') or 0)
+
+
+def _add_change(state: RepoState, xy: str, path: str) -> None:
+    if xy[0] != '.':
+        state.staged.append(path)
+    if xy[1] != '.':
+        state.unstaged.append(path)
+
+
+@timed_phase('status')
+def read_repo_state(untracked: str = 'normal') -> Optional[RepoState]:
+    """Đọc trạng thái repo bằng một tiến trình git; None nếu không phải repo Git."""
+    command = ['git', 'status', '--porcelain=v2', '--branch', '-z', f'--untracked-files={untracked}']
+    if RECORDER.enabled:
+        # Với --timings, ghi lại lần gọi này có dùng fsmonitor / untracked cache hay không
+        from .fast_status import run_traced_status
+        code, output = run_traced_status(command)
+    else:
+        code, output = run_command(command)
+    if code != 0:
+        return None
+    return parse_porcelain_v2(output)
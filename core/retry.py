@@ -0,0 +1,38 @@
+# Tệp: core/retry.py
+
+import random
+from dataclasses import dataclass
+from typing import Callable
+
+from .config import Settings
+
+# Giới hạn trên cho một lần chờ giữa hai lần thử (giây)
+MAX_BACKOFF_SECONDS: float = 30.0
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Chính sách thử lại push khi bị từ chối vì remote có commit mới.
+
+    - `max_attempts`: tổng số lần push tối đa (kể cả lần đầu).
+    - `deadline`: tổng thời gian tối đa (giây) kể từ lần push đầu tiên.
+    - `base_delay`: độ trễ cơ sở của backoff luỹ thừa (giây).
+    """
+    max_attempts: int = 5
+    deadline: float = 120.0
+    base_delay: float = 0.5
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> 'RetryPolicy':
+        return cls(settings.push_max_attempts, settings.push_retry_deadline, settings.push_backoff)
+
+    def delay(self, failures: int, rng: Callable[[], float] = random.random) -> float:
+        """Thời gian chờ sau `failures` lần thua liên tiếp: "full jitter" trong [0, base * 2^(failures-1)].
+
+        Jitter ngẫu nhiên giúp nhiều tiến trình cùng thua một lượt không đồng
+        loạt thử lại vào cùng một thời điểm.
+        """
+        if failures <= 0 or self.base_delay <= 0:
+            return 0.0
+        ceiling = min(MAX_BACKOFF_SECONDS, self.base_delay * (2 ** (failures - 1)))
+        return rng() * ceiling
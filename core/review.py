@@ -0,0 +1,98 @@
+# Tệp: core/review.py
+
+import sys
+import threading
+from typing import List, Optional, Tuple
+
+from .config import t
+from .console import colorize
+from .git_utils import run_command, stream_command
+from .timings import phase
+
+# Thời gian tối đa chờ thống kê từng file trước khi hỏi xác nhận (giây)
+REVIEW_WAIT_SECONDS: float = 0.5
+
+# (đường dẫn, số dòng thêm, số dòng xoá); file nhị phân có -1 ở cả hai
+FileChurn = Tuple[str, int, int]
+
+# So sánh index với HEAD (hoặc cây rỗng nếu chưa có commit nào): đúng những gì sẽ được commit
+NAME_ONLY_COMMAND: List[str] = ['git', 'diff', '--cached', '--no-renames', '--name-only', '-z']
+NUMSTAT_COMMAND: List[str] = ['git', 'diff', '--cached', '--no-renames', '--numstat', '-z']
+FULL_STAT_COMMAND: List[str] = ['git', 'diff', '--cached', '--stat']
+
+
+def parse_numstat(output: str) -> List[FileChurn]:
+    """Đọc output của `git diff --numstat -z --no-renames`."""
+    entries: List[FileChurn] = []
+    for record in output.split('\0'):
+        parts = record.split('\t', 2)
+        if len(parts) != 3 or not parts[2]:
+            continue
+        added, deleted, path = parts
+        if added == '-' or deleted == '-':
+            entries.append((path, -1, -1))
+        elif added.isdigit() and deleted.isdigit():
+            entries.append((path, int(added), int(deleted)))
+    return entries
+
+
+def top_by_churn(entries: List[FileChurn], limit: int) -> List[FileChurn]:
+    """`limit` file thay đổi nhiều dòng nhất (file nhị phân xếp cuối)."""
+    return sorted(entries, key=lambda e: (-(e[1] + e[2]), e[0]))[:limit]
+
+
+class ChangeReview:
+    """Tóm tắt các thay đổi đã stage mà không làm chậm câu hỏi xác nhận.
+
+    Số file được đọc ngay (so sánh cây, không cần diff nội dung). Số dòng
+    thay đổi của từng file (`--numstat`) được tính trong thread nền: nếu xong
+    kịp thì in `max_files` file thay đổi nhiều nhất, nếu không thì chỉ in số
+    file. `--stat` đầy đủ chỉ chạy khi người dùng yêu cầu.
+    """
+
+    def __init__(self, max_files: int) -> None:
+        self.max_files = max_files
+        self.entries: Optional[List[FileChurn]] = None
+        self._thread = threading.Thread(target=self._run, name='git-sync-review', daemon=True)
+
+    @classmethod
+    def start(cls, max_files: int) -> 'ChangeReview':
+        review = cls(max_files)
+        review._thread.start()
+        return review
+
+    def _run(self) -> None:
+        with phase('review'):
+            code, output = run_command(NUMSTAT_COMMAND, echo=False)
+        if code == 0:
+            self.entries = parse_numstat(output)
+
+    def wait(self, timeout: Optional[float]) -> Optional[List[FileChurn]]:
+        self._thread.join(timeout)
+        return self.entries
+
+    def print_summary(self, timeout: float = REVIEW_WAIT_SECONDS) -> None:
+        entries = self.wait(timeout)
+        if entries is None:
+            code, output = run_command(NAME_ONLY_COMMAND, echo=False)
+            files = len([p for p in output.split('\0') if p]) if code == 0 else 0
+            print(colorize(t('review_pending', files=files), 'info'))
+            return
+        added = sum(max(e[1], 0) for e in entries)
+        deleted = sum(max(e[2], 0) for e in entries)
+        print(t('review_summary', files=len(entries), added=added, deleted=deleted))
+        shown = top_by_churn(entries, self.max_files)
+        width = max((len(str(e[1] + e[2])) for e in shown), default=1)
+        for path, file_added, file_deleted in shown:
+            churn = 'bin' if file_added < 0 else str(file_added + file_deleted)
+            print(f"   {churn:>{width}}  {colorize(f'+{max(file_added, 0)}', 'success')} "
+                  f"{colorize(f'-{max(file_deleted, 0)}', 'error')}  {path}")
+        if len(entries) > len(shown):
+            print(colorize(t('review_more_files', count=len(entries) - len(shown)), 'info'))
+
+    def print_full(self) -> None:
+        """In `--stat` đầy đủ từng dòng ngay khi git tạo ra (không gom cả output vào bộ nhớ)."""
+        with phase('review'):
+            result = stream_command(FULL_STAT_COMMAND)
+        if result.returncode != 0:
+            print(colorize(t('review_failed'), 'error'), file=sys.stderr)
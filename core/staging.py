@@ -0,0 +1,111 @@
+# Tệp: core/staging.py
+
+import os
+import sys
+from typing import List, Optional, Sequence, Tuple
+
+from .config import t, get_settings
+from .console import colorize
+from .git_utils import run_command
+from .repo_state import RepoState, read_repo_state
+
+# Số đường dẫn tối đa trong một lần gọi `git add`
+STAGE_BATCH_SIZE: int = 5000
+
+
+def paths_to_stage(state: RepoState) -> List[str]:
+    """Các đường dẫn cần đưa vào index: thay đổi chưa stage và file chưa theo dõi."""
+    seen = set()
+    paths: List[str] = []
+    for path in (*state.unstaged, *state.untracked):
+        if path not in seen:
+            seen.add(path)
+            paths.append(path)
+    return paths
+
+
+def repo_root() -> str:
+    """Thư mục gốc của repo (đường dẫn trong output porcelain là tương đối với nó)."""
+    if os.path.exists('.git'):
+        return '.'
+    code, output = run_command(['git', 'rev-parse', '--show-toplevel'], echo=False)
+    return output if code == 0 and output else '.'
+
+
+def split_large_files(
+    paths: Sequence[str],
+    limit: Optional[int],
+    root: str = '.',
+) -> Tuple[List[str], List[Tuple[str, int]]]:
+    """Tách các file lớn hơn `limit` byte; file đã bị xoá vẫn được giữ để stage việc xoá."""
+    if not limit:
+        return list(paths), []
+    kept: List[str] = []
+    large: List[Tuple[str, int]] = []
+    for path in paths:
+        try:
+            size = os.lstat(os.path.join(root, path)).st_size
+        except OSError:
+            kept.append(path)
+            continue
+        if size > limit:
+            large.append((path, size))
+        else:
+            kept.append(path)
+    return kept, large
+
+
+def add_command(root: str = '.') -> List[str]:
+    """Lệnh `git add` đọc pathspec (tương đối với `root`, NUL-separated) từ stdin."""
+    return ['git'] + (['-C', root] if root != '.' else []) + [
+        '--literal-pathspecs', 'add', '--all', '--pathspec-from-file=-', '--pathspec-file-nul',
+    ]
+
+
+def add_commands(
+    paths: Sequence[str],
+    root: str = '.',
+    batch_size: Optional[int] = None,
+) -> List[Tuple[List[str], str]]:
+    """Các lệnh `git add` (argv, stdin) để stage `paths` theo từng lô, pathspec truyền qua stdin dạng NUL-separated."""
+    batch_size = batch_size or STAGE_BATCH_SIZE
+    command = add_command(root)
+    return [
+        (command, '\0'.join(paths[start:start + batch_size]))
+        for start in range(0, len(paths), batch_size)
+    ]
+
+
+def select_paths(state: RepoState) -> Optional[Tuple[List[str], str]]:
+    """Chọn đúng những đường dẫn mà `git status` báo có thay đổi; trả về (đường dẫn, thư mục gốc).
+
+    Không quét lại cả cây thư mục như `git add .`. File vượt quá
+    `max_file_size` bị bỏ qua (hoặc chỉ cảnh báo khi `large_file_policy = warn`).
+    Trả về None nếu không có gì để commit.
+    """
+    settings = get_settings()
+    if settings.max_file_size and any(path.endswith('/') for path in state.untracked):
+        # Thư mục chưa theo dõi: cần danh sách từng file để kiểm tra kích thước
+        state = read_repo_state(untracked='all') or state
+
+    root = repo_root()
+    paths, large = split_large_files(paths_to_stage(state), settings.max_file_size, root)
+    for path, size in large:
+        key = 'large_file_warning' if settings.large_file_policy == 'warn' else 'large_file_skipped'
+        print(colorize(t(key, path=path, size=_format_size(size)), 'warning'), file=sys.stderr)
+    if settings.large_file_policy == 'warn':
+        paths.extend(path for path, _ in large)
+
+    if not paths and not state.staged:
+        print(colorize(t('nothing_to_stage'), 'error'), file=sys.stderr)
+        return None
+    return paths, root
+
+
+def _format_size(size: int) -> str:
+    value = float(size)
+    for unit in ('B', 'KiB', 'MiB'):
+        if value < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
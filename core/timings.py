@@ -0,0 +1,246 @@
+# Tệp: core/timings.py
+
+import contextlib
+import functools
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, TypeVar
+
+from .config import t
+
+F = TypeVar('F', bound=Callable[..., Any])
+
+# Tên pha dùng khi lệnh chạy ngoài mọi pha đã khai báo
+ROOT_PHASE: str = 'other'
+
+
+@dataclass
+class CommandRecord:
+    """Một lệnh đã chạy qua run_command/stream_command."""
+    argv: Sequence[str]
+    phase: str
+    start: float
+    duration: float
+    spawned: bool
+    output_bytes: int
+    returncode: int
+    thread_id: int
+
+
+@dataclass
+class PhaseRecord:
+    """Một lần đi qua một pha của luồng đồng bộ."""
+    name: str
+    start: float
+    duration: float
+    thread_id: int
+
+
+class Recorder:
+    """Ghi lại thời gian từng lệnh và từng pha; gần như không tốn gì khi bị tắt."""
+
+    def __init__(self) -> None:
+        self.enabled: bool = False
+        self.origin: float = time.perf_counter()
+        self.commands: List[CommandRecord] = []
+        self.phases: List[PhaseRecord] = []
+        # Bộ đếm sự kiện (ví dụ push_attempts); luôn được ghi vì gần như không tốn gì
+        self.counters: Dict[str, int] = {}
+        # Nhận mỗi pha/lệnh vừa kết thúc: listener(loại, trường) (dùng cho --output=jsonl)
+        self.listener: Optional[Callable[[str, Dict[str, Any]], None]] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+        self.origin = time.perf_counter()
+        self.commands.clear()
+        self.phases.clear()
+        self.counters.clear()
+
+    @property
+    def current_phase(self) -> str:
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else ROOT_PHASE
+
+    @contextlib.contextmanager
+    def phase(self, name: str, record: bool = True) -> Iterator[None]:
+        """Đặt pha hiện tại cho các lệnh chạy bên trong; `record=False` khi thời gian đã được đo ở chỗ khác."""
+        if not self.enabled:
+            yield
+            return
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stack.pop()
+            if record:
+                self.record_phase(name, start)
+
+    def record_command(
+        self,
+        argv: Sequence[str],
+        start: float,
+        spawned: bool,
+        output_bytes: int,
+        returncode: int,
+        phase: Optional[str] = None,
+    ) -> None:
+        """Ghi một lệnh đã kết thúc; `phase` ghi đè pha hiện tại (cho lệnh chạy bằng asyncio)."""
+        record = CommandRecord(
+            list(argv), phase or self.current_phase, start, time.perf_counter() - start,
+            spawned, output_bytes, returncode, threading.get_ident(),
+        )
+        with self._lock:
+            self.commands.append(record)
+        if self.listener is not None:
+            self.listener('command', {
+                'phase': record.phase, 'argv': record.argv, 'start_ms': self._millis(start - self.origin),
+                'duration_ms': self._millis(record.duration), 'returncode': returncode,
+                'spawned': spawned, 'output_bytes': output_bytes,
+            })
+
+    def increment(self, name: str, by: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + by
+
+    def record_phase(self, name: str, start: float) -> None:
+        """Ghi một pha đã kết thúc mà không qua ngăn xếp (dùng cho các bước asyncio)."""
+        record = PhaseRecord(name, start, time.perf_counter() - start, threading.get_ident())
+        with self._lock:
+            self.phases.append(record)
+        if self.listener is not None:
+            self.listener('phase', {
+                'phase': name, 'start_ms': self._millis(start - self.origin), 'duration_ms': self._millis(record.duration),
+            })
+
+    @staticmethod
+    def _millis(seconds: float) -> float:
+        return round(seconds * 1000, 3)
+
+
+RECORDER = Recorder()
+
+
+def phase(name: str) -> Any:
+    """Context manager đánh dấu một pha: `with phase('push'): ...`."""
+    return RECORDER.phase(name)
+
+
+def timed_phase(name: str) -> Callable[[F], F]:
+    """Decorator: toàn bộ thân hàm được tính vào pha `name`."""
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with RECORDER.phase(name):
+                return func(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+
+def summarize(recorder: Recorder = RECORDER) -> List[Dict[str, Any]]:
+    """Gom theo pha: thời gian, số lệnh, số tiến trình đã fork, tổng output."""
+    rows: Dict[str, Dict[str, Any]] = {}
+
+    def row(name: str) -> Dict[str, Any]:
+        return rows.setdefault(name, {'phase': name, 'seconds': 0.0, 'commands': 0, 'spawned': 0, 'output_bytes': 0})
+
+    for p in recorder.phases:
+        row(p.name)['seconds'] += p.duration
+    for c in recorder.commands:
+        r = row(c.phase)
+        r['commands'] += 1
+        r['spawned'] += int(c.spawned)
+        r['output_bytes'] += c.output_bytes
+        if c.phase == ROOT_PHASE:
+            r['seconds'] += c.duration
+    return sorted(rows.values(), key=lambda r: -r['seconds'])
+
+
+def print_summary(recorder: Recorder = RECORDER, top: int = 10, file: Any = None) -> None:
+    """In bảng thời gian theo pha và các lệnh chậm nhất."""
+    out = file or sys.stderr
+    total = time.perf_counter() - recorder.origin
+    print(f"\n{t('timings_header', seconds=f'{total:.3f}', spawned=sum(c.spawned for c in recorder.commands))}", file=out)
+    print(f"  {t('timings_column_phase'):<14} {t('timings_column_time'):>10} {t('timings_column_commands'):>9} "
+          f"{t('timings_column_spawned'):>9} {t('timings_column_output'):>12}", file=out)
+    for r in summarize(recorder):
+        print(f"  {r['phase']:<14} {r['seconds'] * 1000:>8.1f}ms {r['commands']:>9} {r['spawned']:>9} "
+              f"{r['output_bytes']:>10}B", file=out)
+
+    # Bộ đếm status_* (từ trace2 của `git status`) có dòng riêng dễ đọc hơn
+    plain = {k: v for k, v in recorder.counters.items() if not k.startswith('status_')}
+    if plain:
+        counters = ', '.join(f"{name}={value}" for name, value in sorted(plain.items()))
+        print(f"  {t('timings_counters', counters=counters)}", file=out)
+    status = recorder.counters
+    if status.get('status_calls'):
+        line = t(
+            'timings_status_fast_path', calls=status['status_calls'],
+            fsmonitor=status.get('status_fsmonitor', 0), untracked_cache=status.get('status_untracked_cache', 0),
+            lstat=status.get('status_lstat', 0), entries=status.get('status_entries', 0),
+            opendir=status.get('status_opendir', 0),
+        )
+        print(f"  {line}", file=out)
+
+    slowest = sorted(recorder.commands, key=lambda c: -c.duration)[:top]
+    if slowest:
+        print(f"  {t('timings_slowest_commands')}", file=out)
+        for c in slowest:
+            marker = '' if c.spawned else ' *'
+            print(f"    {c.duration * 1000:>8.1f}ms  [{c.phase}] {' '.join(c.argv)}{marker}", file=out)
+
+
+def chrome_trace(recorder: Recorder = RECORDER) -> Dict[str, Any]:
+    """Chuyển dữ liệu đã ghi sang định dạng Chrome trace-event (mở bằng chrome://tracing, Perfetto)."""
+    pid = os.getpid()
+
+    def micros(value: float) -> float:
+        return round((value - recorder.origin) * 1_000_000, 1)
+
+    events: List[Dict[str, Any]] = [
+        {'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': f'git-sync {Path.cwd().name}'}},
+    ]
+    for p in recorder.phases:
+        events.append({
+            'name': p.name, 'cat': 'phase', 'ph': 'X', 'pid': pid, 'tid': p.thread_id,
+            'ts': micros(p.start), 'dur': round(p.duration * 1_000_000, 1),
+        })
+    for c in recorder.commands:
+        events.append({
+            'name': ' '.join(c.argv[:3]), 'cat': 'command', 'ph': 'X', 'pid': pid, 'tid': c.thread_id,
+            'ts': micros(c.start), 'dur': round(c.duration * 1_000_000, 1),
+            'args': {
+                'argv': list(c.argv), 'phase': c.phase, 'spawned': c.spawned,
+                'output_bytes': c.output_bytes, 'returncode': c.returncode,
+            },
+        })
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def write_chrome_trace(path: str, recorder: Recorder = RECORDER) -> None:
+    """Ghi file trace JSON; lỗi ghi file chỉ được báo, không làm hỏng lần đồng bộ."""
+    import json
+
+    try:
+        Path(path).write_text(json.dumps(chrome_trace(recorder)), encoding='utf-8')
+    except OSError as e:
+        print(t('trace_write_failed', path=path, error=str(e)), file=sys.stderr)
+
+
+def report(timings: bool, trace_file: Optional[str]) -> None:
+    """Xuất kết quả theo các cờ --timings / --trace-file."""
+    if not RECORDER.enabled:
+        return
+    if timings:
+        print_summary()
+    if trace_file:
+        write_chrome_trace(trace_file)
@@ -0,0 +1,116 @@
+# Tệp: core/upstream.py
+
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .git_utils import run_command
+from .repo_state import RepoState
+from .timings import phase
+
+# Thời gian tối đa chờ lần fetch nền trước khi push; quá hạn thì cứ push như thường
+PREFETCH_WAIT_SECONDS: float = 30.0
+
+
+def upstream_query(branches: Sequence[str]) -> List[str]:
+    return [
+        'git', 'for-each-ref',
+        '--format=%(refname:short)%00%(upstream:remotename)%00%(upstream:remoteref)%00%(upstream)',
+        *[f'refs/heads/{b}' for b in branches],
+    ]
+
+
+def parse_upstreams(output: str) -> Dict[str, Tuple[str, str, str]]:
+    upstreams: Dict[str, Tuple[str, str, str]] = {}
+    for line in output.splitlines():
+        parts = line.split('\0')
+        # Chỉ xử lý upstream là branch trên remote (bỏ qua upstream là branch local)
+        if len(parts) == 4 and all(parts) and parts[3].startswith('refs/remotes/'):
+            upstreams[parts[0]] = (parts[1], parts[2], parts[3])
+    return upstreams
+
+
+def read_upstreams(branches: Sequence[str]) -> Dict[str, Tuple[str, str, str]]:
+    """Đọc upstream của các branch: {branch: (remote, ref trên remote, ref theo dõi local)}."""
+    code, output = run_command(upstream_query(branches), echo=False)
+    return parse_upstreams(output) if code == 0 else {}
+
+
+def group_refspecs(upstreams: Dict[str, Tuple[str, str, str]], branches: Sequence[str]) -> Dict[str, List[str]]:
+    """Gom refspec fetch của các branch theo remote: mỗi remote chỉ cần một lần fetch."""
+    refspecs_by_remote: Dict[str, List[str]] = {}
+    for branch in branches:
+        if branch in upstreams:
+            remote, remote_ref, tracking_ref = upstreams[branch]
+            refspecs_by_remote.setdefault(remote, []).append(f'+{remote_ref}:{tracking_ref}')
+    return refspecs_by_remote
+
+
+def commits_behind(tracking_ref: str) -> int:
+    """Số commit trên `tracking_ref` mà HEAD chưa có (khác 0 thì push sẽ bị non-fast-forward)."""
+    code, output = run_command(['git', 'rev-list', '--count', f'HEAD..{tracking_ref}'], echo=False)
+    return int(output) if code == 0 and output.isdigit() else 0
+
+
+class UpstreamPrefetch:
+    """Fetch upstream của branch hiện tại trong thread nền, trong lúc người dùng còn đang nhập.
+
+    Chỉ cập nhật đúng ref theo dõi của branch đó (và của các branch `others`,
+    trong cùng một lệnh fetch cho mỗi remote), không đụng tới working tree
+    hay branch local. git chạy không có terminal (không thể hỏi mật khẩu giữa
+    lúc người dùng gõ); nếu cần xác thực tương tác thì fetch đơn giản là thất
+    bại và luồng push như cũ vẫn xử lý.
+    """
+
+    def __init__(self, branch: str, others: Sequence[str] = ()) -> None:
+        self.branch = branch
+        # Các branch khác (--update-after) được fetch cùng lần, cùng kết nối
+        self.others = [b for b in others if b != branch]
+        self.tracking_ref: Optional[str] = None
+        self.fetched: Dict[str, Tuple[str, str, str]] = {}
+        self._thread = threading.Thread(target=self._run, name='git-sync-prefetch', daemon=True)
+
+    @classmethod
+    def prepare(cls, state: RepoState, others: Sequence[str] = ()) -> Optional['UpstreamPrefetch']:
+        """Tạo (chưa chạy) lần fetch nền nếu có upstream cần fetch; None khi không cần.
+
+        Dùng cho bước 'prefetch' của kế hoạch: kế hoạch dry-run và kế hoạch
+        thật vì vậy giống hệt nhau, chỉ khác là bước đó có được chạy hay không.
+        """
+        if not state.branch or not (state.upstream or others):
+            return None
+        return cls(state.branch, others)
+
+    def run_in_background(self) -> None:
+        self._thread.start()
+
+    @property
+    def started(self) -> bool:
+        return self._thread.ident is not None
+
+    @property
+    def done(self) -> bool:
+        return self.started and not self._thread.is_alive()
+
+    def wait(self, timeout: Optional[float] = PREFETCH_WAIT_SECONDS) -> Optional[str]:
+        """Chờ fetch xong; trả về ref theo dõi đã cập nhật, hoặc None nếu thất bại/quá hạn/chưa chạy."""
+        if self.started:
+            self._thread.join(timeout)
+        return self.tracking_ref if self.done else None
+
+    def behind(self) -> int:
+        """Số commit mới trên upstream, nếu fetch đã xong (không chờ)."""
+        if not self.done or self.tracking_ref is None:
+            return 0
+        return commits_behind(self.tracking_ref)
+
+    def _run(self) -> None:
+        with phase('prefetch'):
+            branches = [self.branch, *self.others]
+            upstreams = read_upstreams(branches)
+            for remote, refspecs in group_refspecs(upstreams, branches).items():
+                code, _ = run_command(['git', 'fetch', '--quiet', remote, *refspecs], echo=False, detached=True)
+                if code == 0:
+                    self.fetched.update((b, u) for b, u in upstreams.items() if u[0] == remote)
+            upstream = self.fetched.get(self.branch)
+            if upstream is not None:
+                self.tracking_ref = upstream[2]
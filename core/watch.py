@@ -0,0 +1,263 @@
+# Tệp: core/watch.py
+
+import os
+import sys
+import time
+from argparse import Namespace
+from typing import Callable, Dict, Optional, Set, Tuple, Union
+
+from .config import t, get_commit_types, get_protected_branches
+from .console import colorize
+from .git_broker import BROKER
+from .git_utils import run_command
+from .metrics import METRICS, start_http_server
+from .repo_state import parse_porcelain_v2, read_repo_state
+from .timings import phase
+
+# Khoảng thời gian giữa hai lần kiểm tra chỉ mục (giây)
+WATCH_POLL_SECONDS: float = 1.0
+DEFAULT_DEBOUNCE_SECONDS: float = 2.0
+DEFAULT_PUSH_INTERVAL_SECONDS: float = 60.0
+DEFAULT_WATCH_MESSAGE: str = "wip auto-sync"
+
+_Signature = Tuple[int, int]
+
+
+def _signature(path: str) -> Optional[_Signature]:
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class ChangeIndex:
+    """Chỉ mục mtime/kích thước của các file mà git quan tâm (đã theo dõi + chưa theo dõi, không bị ignore).
+
+    Mỗi lần `poll` chỉ stat lại các file và thư mục đã biết, không fork tiến
+    trình nào. Danh sách file chỉ được đọc lại bằng `git ls-files` khi mtime
+    của một thư mục thay đổi (có file được tạo, xoá hoặc đổi tên).
+    """
+
+    def __init__(self, root: str = '.') -> None:
+        self.root = root
+        self.files: Dict[str, Optional[_Signature]] = {}
+        self.dirs: Dict[str, _Signature] = {}
+        self.rebuilds = 0
+        self.rebuild()
+
+    def _path(self, relative: str) -> str:
+        return os.path.join(self.root, relative) if relative else self.root
+
+    def _list(self, *extra: str) -> Set[str]:
+        code, output = run_command(
+            ['git', 'ls-files', '-z', '--others', '--exclude-standard', *extra], echo=False,
+        )
+        return {p for p in output.split('\0') if p} if code == 0 else set()
+
+    def rebuild(self) -> bool:
+        """Đọc lại danh sách file; trả về True nếu danh sách hoặc nội dung khác lần trước."""
+        self.rebuilds += 1
+        paths = self._list('--cached')
+        # Thư mục chưa theo dõi (kể cả rỗng): file mới tạo bên trong chúng làm đổi mtime của chúng
+        untracked_dirs = {p.rstrip('/') for p in self._list('--directory') if p.endswith('/')}
+
+        files = {p: _signature(self._path(p)) for p in paths}
+        dirs: Dict[str, _Signature] = {}
+        visited: Set[str] = set()
+        for directory in {*untracked_dirs, *(os.path.dirname(p) for p in paths), ''}:
+            while directory not in visited:
+                visited.add(directory)
+                signature = _signature(self._path(directory))
+                # Thư mục đã bị xoá (file bên trong vẫn còn trong index): thư mục cha
+                # vẫn được theo dõi nên việc tạo lại nó vẫn bị phát hiện
+                if signature is not None:
+                    dirs[directory] = signature
+                directory = os.path.dirname(directory)
+        changed = files != self.files
+        self.files, self.dirs = files, dirs
+        return changed
+
+    def poll(self) -> bool:
+        """True nếu có file được tạo, xoá hoặc sửa kể từ lần kiểm tra trước."""
+        for directory, signature in self.dirs.items():
+            current = _signature(self._path(directory))
+            if current is None or current[0] != signature[0]:
+                return self.rebuild()
+        changed = False
+        for path, signature in self.files.items():
+            current = _signature(self._path(path))
+            if current != signature:
+                self.files[path] = current
+                changed = True
+        return changed
+
+
+class FsmonitorIndex:
+    """Dùng fsmonitor của git (core.fsmonitor): mỗi lần kiểm tra là một `git status` không quét cây thư mục."""
+
+    def __init__(self, root: str = '.') -> None:
+        self.root = root
+        self._last: Optional[Tuple[str, Tuple[Optional[_Signature], ...]]] = None
+        self.poll()
+
+    def poll(self) -> bool:
+        code, output = run_command(
+            ['git', 'status', '--porcelain=v2', '-z', '--untracked-files=all'], echo=False,
+        )
+        if code != 0:
+            return False
+        # Trạng thái giống hệt nhưng file vẫn đang bị sửa tiếp: so sánh thêm mtime/kích thước
+        state = parse_porcelain_v2(output)
+        paths = sorted({*state.staged, *state.unstaged, *state.untracked})
+        snapshot = (output, tuple(_signature(os.path.join(self.root, p)) for p in paths))
+        changed = self._last is not None and snapshot != self._last
+        self._last = snapshot
+        return changed
+
+
+Index = Union[ChangeIndex, FsmonitorIndex]
+
+
+def fsmonitor_enabled() -> bool:
+    code, output = run_command(['git', 'config', '--get', 'core.fsmonitor'], echo=False)
+    return code == 0 and output.strip().lower() not in ('', 'false', '0', 'no', 'off')
+
+
+def open_index(root: str = '.') -> Index:
+    return FsmonitorIndex(root) if fsmonitor_enabled() else ChangeIndex(root)
+
+
+class WatchLoop:
+    """Gom các thay đổi liên tiếp thành một commit và giới hạn tần suất push.
+
+    - Một commit chỉ được tạo khi chỉ mục đứng yên ít nhất `debounce` giây.
+    - Hai lần push cách nhau ít nhất `push_interval` giây; các commit ở giữa
+      được push cùng nhau.
+    """
+
+    def __init__(
+        self,
+        args: Namespace,
+        index: Index,
+        debounce: float = DEFAULT_DEBOUNCE_SECONDS,
+        push_interval: float = DEFAULT_PUSH_INTERVAL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.args = args
+        self.index = index
+        self.debounce = debounce
+        self.push_interval = push_interval
+        self.clock = clock
+        # Lần đầu luôn kiểm tra trạng thái thật: có thể đã có thay đổi từ trước
+        self.last_change: Optional[float] = clock() - debounce
+        self.last_push: Optional[float] = None
+        self.unpushed = False
+        self.remote_ahead = False
+        self.commits = 0
+        self.pushes = 0
+
+    def tick(self) -> bool:
+        """Một vòng kiểm tra; không tốn tiến trình nào khi repo đứng yên.
+
+        Trả về True nếu vòng này đã thử commit hoặc push.
+        """
+        now = self.clock()
+        worked = False
+        if self.index.poll():
+            self.last_change = now
+        if self.last_change is not None and now - self.last_change >= self.debounce:
+            self.last_change = None
+            self._commit()
+            worked = True
+        if self.unpushed and (self.last_push is None or now - self.last_push >= self.push_interval):
+            self._push()
+            worked = True
+        return worked
+
+    def _commit(self) -> None:
+        from . import main_flow
+
+        BROKER.invalidate()  # Repo có thể đã bị thay đổi từ bên ngoài kể từ vòng trước
+        state = read_repo_state()
+        if state is None or state.has_conflicts or state.is_clean:
+            return
+        try:
+            if main_flow._run_pre_sync_hook_if_needed():
+                state = read_repo_state() or state
+                if state.is_clean:
+                    return
+            message = main_flow.get_commit_message(self.args, state)
+            if not message:
+                return
+            self.remote_ahead = main_flow._stage_and_commit_changes(message, self.args, state) or self.remote_ahead
+        except SystemExit:
+            print(colorize(t('watch_cycle_failed'), 'warning'), file=sys.stderr)
+            return
+        finally:
+            # Stage/commit không sửa file nhưng hook thì có thể: bắt đầu lại từ trạng thái hiện tại
+            self.index.poll()
+        self.commits += 1
+        self.unpushed = True
+
+    def _push(self) -> None:
+        from . import main_flow
+
+        self.last_push = self.clock()
+        try:
+            branch = main_flow.get_current_branch()
+            main_flow._push_and_handle_remote(self.args, branch, self.remote_ahead)
+            main_flow._run_post_sync_tasks(self.args, branch)
+        except SystemExit as e:
+            if e.code not in (0, None):
+                print(colorize(t('watch_cycle_failed'), 'warning'), file=sys.stderr)
+                return
+        self.unpushed = False
+        self.remote_ahead = False
+        self.pushes += 1
+
+
+def run_watch(
+    args: Namespace,
+    debounce: float = DEFAULT_DEBOUNCE_SECONDS,
+    push_interval: float = DEFAULT_PUSH_INTERVAL_SECONDS,
+    poll_seconds: float = WATCH_POLL_SECONDS,
+) -> int:
+    """Điểm vào của `--watch`: chạy cho tới khi bị ngắt (Ctrl-C)."""
+    state = read_repo_state()
+    if state is None:
+        print(colorize(t('not_a_repo'), 'error'), file=sys.stderr)
+        return 1
+    if not state.branch or state.branch in get_protected_branches():
+        print(colorize(t('watch_protected_branch', branch=state.branch or 'HEAD'), 'error'), file=sys.stderr)
+        return 1
+
+    # Không có ai để trả lời câu hỏi; mặc định commit kiểu chore nếu không chỉ định
+    args.yes = True
+    commit_types = get_commit_types()
+    if not any(getattr(args, c, None) for c in commit_types):
+        if 'chore' not in commit_types:
+            # get_commit_message sẽ quay sang hỏi message, mà không có ai để trả lời
+            print(colorize(t('watch_needs_commit_type', types=', '.join(commit_types), example=commit_types[0]),
+                           'error'), file=sys.stderr)
+            return 1
+        args.chore = DEFAULT_WATCH_MESSAGE
+
+    with phase('watch-index'):
+        index = open_index()
+    print(colorize(t('watch_started', branch=state.branch, mode=type(index).__name__,
+                     debounce=debounce, interval=push_interval), 'info'))
+    loop = WatchLoop(args, index, debounce, push_interval)
+    # Tiến trình sống lâu: Prometheus có thể scrape trực tiếp, textfile chỉ được ghi sau vòng có commit hoặc push
+    server = start_http_server()
+    try:
+        while True:
+            if loop.tick():
+                METRICS.export()
+            time.sleep(poll_seconds)
+    except KeyboardInterrupt:
+        print(colorize(t('watch_stopped', commits=loop.commits, pushes=loop.pushes), 'info'))
+        return 0
+    finally:
+        if server is not None:
+            server.shutdown()
@@ -0,0 +1,17 @@
+import pytest
+
+import core.config as config
+import core.git_utils as git_utils
+
+
+@pytest.fixture(autouse=True)
+def isolated_settings(tmp_path, monkeypatch):
+    """Mỗi test dùng thư mục cache riêng và không dùng lại trạng thái của test trước."""
+    monkeypatch.setenv("GIT_SYNC_CACHE_DIR", str(tmp_path / "git-sync-cache"))
+    # Không chuyển lệnh cho daemon git-sync có thể đang chạy trên máy
+    monkeypatch.setenv("GIT_SYNC_NO_DAEMON", "1")
+    monkeypatch.setattr(git_utils, "DRY_RUN", False)
+    config.reset_settings()
+    git_utils.BROKER.invalidate()
+    yield
+    config.reset_settings()
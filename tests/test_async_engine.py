@@ -0,0 +1,99 @@
+import asyncio
+import sys
+import time
+
+import pytest
+
+import core.git_utils as git_utils
+from core.async_engine import Step, execute, in_thread
+from core.timings import RECORDER
+
+
+def test_independent_steps_overlap_and_dependencies_are_respected():
+    order = []
+
+    def sleeper(name, seconds):
+        async def action():
+            order.append(f"{name}:start")
+            await asyncio.sleep(seconds)
+            order.append(f"{name}:end")
+            return name
+        return action
+
+    start = time.perf_counter()
+    results = execute([
+        Step("a", sleeper("a", 0.2)),
+        Step("b", sleeper("b", 0.2)),
+        Step("c", sleeper("c", 0.0), ("a", "b")),
+    ])
+    elapsed = time.perf_counter() - start
+
+    assert results == {"a": "a", "b": "b", "c": "c"}
+    assert elapsed < 0.35
+    assert order.index("c:start") > max(order.index("a:end"), order.index("b:end"))
+
+
+def test_thread_steps_run_concurrently_with_coroutines():
+    def blocking():
+        time.sleep(0.2)
+        return "thread"
+
+    async def coroutine():
+        await asyncio.sleep(0.2)
+        return "loop"
+
+    start = time.perf_counter()
+    results = execute([Step("t", in_thread(blocking)), Step("c", coroutine)])
+    assert results == {"t": "thread", "c": "loop"}
+    assert time.perf_counter() - start < 0.35
+
+
+def test_undeclared_dependency_is_rejected():
+    async def noop():
+        return None
+
+    with pytest.raises(ValueError):
+        execute([Step("a", noop, ("missing",))])
+
+
+def test_failing_step_propagates_system_exit():
+    def fail():
+        sys.exit(1)
+
+    async def slow():
+        await asyncio.sleep(5)
+
+    start = time.perf_counter()
+    with pytest.raises(SystemExit):
+        execute([Step("fail", in_thread(fail)), Step("slow", slow)])
+    assert time.perf_counter() - start < 1
+
+
+
+def test_run_command_async_captures_output_and_counts_spawn():
+    git_utils.reset_spawn_count()
+    code, output = asyncio.run(git_utils.run_command_async([sys.executable, "-c", "print('hi')"], echo=False))
+    assert (code, output) == (0, "hi")
+    assert git_utils.get_spawn_count() == 1
+
+
+def test_run_command_async_feeds_stdin_and_records_its_phase(monkeypatch):
+    monkeypatch.setattr(RECORDER, "enabled", False)
+    RECORDER.enable()
+    try:
+        argv = [sys.executable, "-c", "import sys; print(sys.stdin.read().upper())"]
+        code, output = asyncio.run(git_utils.run_command_async(argv, echo=False, input_data="abc", phase="commit"))
+        phases = [c.phase for c in RECORDER.commands]
+    finally:
+        RECORDER.commands.clear()
+    assert (code, output) == (0, "ABC")
+    assert phases == ["commit"]
+
+
+def test_run_command_async_dry_run_skips_mutating_git(monkeypatch, capsys):
+    monkeypatch.setattr(git_utils, "DRY_RUN", True)
+    git_utils.reset_spawn_count()
+    code, _ = asyncio.run(git_utils.run_command_async(["git", "push", "origin", "v1"]))
+    assert code == 0
+    assert git_utils.get_spawn_count() == 0
+    assert "[DRY-RUN] git push origin v1" in capsys.readouterr().out
@@ -0,0 +1,102 @@
+import json
+import subprocess
+from argparse import Namespace
+
+import pytest
+
+import core.main_flow as main_flow
+from core.batch import BatchEntry, parse_batch
+
+pytestmark = pytest.mark.skipif(
+    subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0,
+    reason="git is required",
+)
+
+TYPES = ["feat", "fix", "chore", "build"]
+
+
+def _git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+@pytest.fixture(autouse=True)
+def plain_messages(monkeypatch):
+    monkeypatch.setattr("core.batch.t", lambda key, **kw: f"{key} {sorted(kw.items())}")
+
+
+def test_parse_batch_accepts_aliases_and_skips_comments():
+    lines = [
+        "# generated first",
+        json.dumps({"paths": ["gen/"], "type": "b", "message": "regenerate client"}),
+        "",
+        json.dumps({"path": "src/app.py", "type": "feat", "scope": "api", "message": " add search "}),
+    ]
+
+    assert parse_batch(lines, TYPES, {"b": "build"}) == [
+        BatchEntry(("gen/",), "build", "", "regenerate client"),
+        BatchEntry(("src/app.py",), "feat", "api", "add search"),
+    ]
+
+
+def test_parse_batch_reports_every_bad_line(capsys):
+    lines = [
+        "{not json",
+        json.dumps({"paths": [], "type": "feat", "message": "x"}),
+        json.dumps({"paths": ["a"], "type": "docs", "message": "x"}),
+        json.dumps({"paths": ["a"], "type": "feat", "message": "ok"}),
+    ]
+
+    assert parse_batch(lines, TYPES, {}) is None
+
+    err = capsys.readouterr().err
+    assert "('line', 1)" in err and "('line', 2)" in err and "('line', 3)" in err
+    assert "('line', 4)" not in err
+
+
+def test_batch_creates_each_commit_from_its_paths_and_pushes_once(tmp_path, monkeypatch):
+    _git(tmp_path, "init", "-q", "--bare", "-b", "main", "remote.git")
+    work = tmp_path / "work"
+    _git(tmp_path, "clone", "-q", str(tmp_path / "remote.git"), str(work))
+    _git(work, "config", "user.name", "Test User")
+    _git(work, "config", "user.email", "test@example.com")
+    (work / "src").mkdir()
+    (work / "src" / "app.py").write_text("v1\n", encoding="utf-8")
+    (work / "package-lock.json").write_text("{}\n", encoding="utf-8")
+    _git(work, "add", ".")
+    _git(work, "commit", "-q", "-m", "init")
+    _git(work, "push", "-q", "-u", "origin", "main")
+
+    (work / "src" / "app.py").write_text("v2\n", encoding="utf-8")
+    (work / "gen").mkdir()
+    (work / "gen" / "client.py").write_text("generated\n", encoding="utf-8")
+    (work / "package-lock.json").write_text('{"lock": 2}\n', encoding="utf-8")
+    _git(work, "add", "src/app.py")  # đã stage từ trước nhưng phải vào đúng commit của nó
+    batch = tmp_path / "commits.jsonl"
+    batch.write_text("\n".join(json.dumps(entry) for entry in [
+        {"paths": ["package-lock.json"], "type": "chore", "scope": "deps", "message": "update lockfile"},
+        {"paths": ["gen/*.py"], "type": "chore", "scope": "gen", "message": "regenerate client"},
+        {"paths": ["src"], "type": "feat", "scope": "api", "message": "add search"},
+    ]), encoding="utf-8")
+    monkeypatch.chdir(work)
+
+    pushes, hooks = [], []
+    original_push = main_flow._push
+    monkeypatch.setattr(main_flow, "_push", lambda command: pushes.append(command) or original_push(command))
+    monkeypatch.setattr(main_flow, "get_pre_sync_hook", lambda: "true")
+    monkeypatch.setattr(main_flow, "_run_hook_command", lambda cmd, name: hooks.append(name))
+
+    main_flow.start_sync_flow(Namespace(yes=True, tag=None, update_after=None, stash=False, batch=str(batch)))
+
+    remote = tmp_path / "remote.git"
+    log = [
+        (_git(remote, "log", "-1", "--format=%s", f"main~{n}"), _git(remote, "show", "--name-only", "--format=", f"main~{n}"))
+        for n in range(3)
+    ]
+    assert log == [
+        ("feat(api): add search", "src/app.py"),
+        ("chore(gen): regenerate client", "gen/client.py"),
+        ("chore(deps): update lockfile", "package-lock.json"),
+    ]
+    assert len(pushes) == 1
+    assert hooks == ["pre_sync"]
+    assert _git(work, "status", "--porcelain") == ""
@@ -0,0 +1,27 @@
+import subprocess
+
+import pytest
+
+from benchmarks import bench_sync
+
+
+def test_compare_flags_only_significant_regressions():
+    baseline = {"small": {"sync": {"total": 0.100, "read_repo_state": 0.001, "spawned_processes": 5.0}}}
+    current = {"small": {"sync": {"total": 0.150, "read_repo_state": 0.003, "spawned_processes": 6.0}}}
+
+    regressions = bench_sync.compare(current, baseline, threshold=0.2, min_delta=0.005)
+
+    assert len(regressions) == 2
+    assert regressions[0].startswith("small/sync/total")
+    assert regressions[1].startswith("small/sync/spawned_processes")
+    assert bench_sync.compare(current, current, threshold=0.2) == []
+
+
+@pytest.mark.skipif(subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0, reason="git is required")
+def test_run_scale_times_every_scenario():
+    results = bench_sync.run_scale("tiny", bench_sync.Scale(files=20, history=3, changes=3), repeat=1)
+
+    assert set(results) == {"sync", "noop_sync", "update_after", "force_reset"}
+    assert results["noop_sync"]["spawned_processes"] == 1
+    assert results["sync"]["_push_and_handle_remote"] > 0
+    assert results["update_after"]["_update_target_branch"] > 0
@@ -113,3 +113,96 @@ def test_get_pre_and_post_hooks(monkeypatch):
 
     assert config.get_pre_sync_hook() == "pytest -q"
     assert config.get_post_sync_hook() == "flake8"
+
+
+def test_settings_snapshot_is_built_once_per_process(monkeypatch):
+    calls = []
+
+    def fake_load_user_config():
+        calls.append(1)
+        return ConfigParser()
+
+    monkeypatch.setattr(config, "_load_user_config", fake_load_user_config)
+
+    config.get_protected_branches()
+    config.get_commit_types()
+    config.get_commit_template()
+    config.get_commit_aliases()
+
+    assert len(calls) == 1
+    assert config.get_settings() is config.get_settings()
+
+
+def test_settings_cache_skips_ini_parsing_until_config_changes(tmp_path, monkeypatch):
+    home = tmp_path / "home"
+    project = tmp_path / "project"
+    home.mkdir()
+    project.mkdir()
+    monkeypatch.setattr(config.Path, "home", classmethod(lambda cls: home))
+    monkeypatch.chdir(project)
+    rc = project / ".gitsyncrc"
+    rc.write_text("[settings]\nprotected_branches = main, release\n", encoding="utf-8")
+
+    assert config.get_protected_branches() == {"main", "release"}
+
+    # Lần chạy sau (tiến trình mới) đọc từ cache, không parse INI
+    original_loader = config._load_user_config
+    parsed = []
+
+    def counting_loader():
+        parsed.append(1)
+        return original_loader()
+
+    monkeypatch.setattr(config, "_load_user_config", counting_loader)
+    config.reset_settings()
+    assert config.get_protected_branches() == {"main", "release"}
+    assert parsed == []
+
+    # File config thay đổi (kích thước khác) thì cache bị vô hiệu
+    rc.write_text("[settings]\nprotected_branches = trunk\n", encoding="utf-8")
+    config.reset_settings()
+    assert config.get_protected_branches() == {"trunk"}
+    assert parsed == [1]
+
+
+def test_translation_cache_is_per_language_and_invalidated_by_mtime(tmp_path, monkeypatch):
+    source = tmp_path / "strings.json"
+    source.write_text('{"hello": {"en": "Hello", "vi": "Xin chào"}, "greet": {"en": "Hi {name}"}}', encoding="utf-8")
+    monkeypatch.setattr(config, "_translation_source", lambda: source)
+    monkeypatch.setattr(config, "_PLAIN_MESSAGES", {})
+    monkeypatch.setattr(config, "_TRANSLATIONS", {})
+    monkeypatch.setattr(config, "LANG", "vi")
+
+    config.load_translations()
+    assert config.t("hello") == "Xin chào"
+    # Chỉ ngôn ngữ đang dùng được nạp
+    assert "greet" not in config._TRANSLATIONS
+
+    compiled = []
+    original_compile = config.compile_translations
+
+    def counting_compile(path, lang):
+        compiled.append(lang)
+        return original_compile(path, lang)
+
+    monkeypatch.setattr(config, "compile_translations", counting_compile)
+    config.load_translations()
+    assert compiled == []
+
+    monkeypatch.setattr(config, "LANG", "en")
+    config.load_translations()
+    assert compiled == ["en"]
+    assert config.t("greet", name="An") == "Hi An"
+
+    source.write_text('{"hello": {"en": "Hello again"}}', encoding="utf-8")
+    config.load_translations()
+    assert compiled == ["en", "en"]
+    assert config.t("hello") == "Hello again"
+
+
+def test_missing_translation_message_is_built_once(monkeypatch):
+    monkeypatch.setattr(config, "_PLAIN_MESSAGES", {})
+    monkeypatch.setattr(config, "_TRANSLATIONS", {})
+    first = config.t("no_such_key")
+    assert first == "Missing translation for 'no_such_key'"
+    assert config.t("no_such_key") is first
@@ -0,0 +1,132 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from core.daemon import RepoScheduler
+
+GIT_SYNC = Path(__file__).resolve().parent.parent / "git_sync.py"
+
+
+def test_scheduler_serializes_per_repo_and_runs_repos_in_parallel():
+    scheduler = RepoScheduler()
+    assert scheduler.submit("a", 1) is True
+    assert scheduler.submit("b", 2) is True
+    assert scheduler.submit("a", 3) is False
+    assert scheduler.submit("a", 4) is False
+
+    scheduler.discard("a", 4)
+    assert scheduler.finish("a") == 3
+    assert scheduler.finish("a") is None
+    assert scheduler.finish("b") is None
+    assert scheduler.running == {} and scheduler.waiting == {}
+
+
+def _git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def _repo(path):
+    path.mkdir()
+    _git(path, "init", "-q")
+    _git(path, "-c", "user.name=T", "-c", "user.email=t@example.com", "commit", "-q", "--allow-empty", "-m", "init")
+    return path
+
+
+@pytest.mark.skipif(
+    os.name != "posix" or subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0,
+    reason="requires POSIX and git",
+)
+def test_daemon_forwards_commands_serialized_per_repository(tmp_path):
+    env = dict(os.environ, HOME=str(tmp_path), GIT_SYNC_SOCKET=str(tmp_path / "run" / "git-sync.sock"),
+               GIT_SYNC_CACHE_DIR=str(tmp_path / "cache"))
+    env.pop("GIT_SYNC_NO_DAEMON", None)
+    repo_a = _repo(tmp_path / "a")
+    repo_b = _repo(tmp_path / "b")
+
+    daemon = subprocess.Popen([sys.executable, str(GIT_SYNC), "--daemon"], env=env, stderr=subprocess.PIPE, text=True)
+    try:
+        deadline = time.monotonic() + 10
+        while not Path(env["GIT_SYNC_SOCKET"]).exists():
+            assert daemon.poll() is None and time.monotonic() < deadline, "daemon did not start"
+            time.sleep(0.05)
+
+        def client(cwd, *args, stdin=subprocess.DEVNULL):
+            return subprocess.Popen([sys.executable, str(GIT_SYNC), *args], cwd=cwd, env=env, stdin=stdin,
+                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+        # Một lệnh đang chờ câu trả lời trên repo a giữ repo đó bận
+        blocker = client(repo_a, "--force-reset-to", "HEAD", stdin=subprocess.PIPE)
+        time.sleep(0.3)
+        queued = client(repo_a, "-y")
+        other = client(repo_b, "-y")
+
+        out, _ = other.communicate(timeout=10)
+        assert other.returncode == 0
+        assert "No changes" in out
+        time.sleep(0.3)
+        assert queued.poll() is None
+
+        # Câu trả lời được đọc từ stdin của chính client
+        out, _ = blocker.communicate("nope\n", timeout=10)
+        assert blocker.returncode == 0
+        assert "cancelled" in out.lower()
+        queued.communicate(timeout=10)
+        assert queued.returncode == 0
+
+        # Exit code của tiến trình con được trả lại cho client
+        not_repo = tmp_path / "plain"
+        not_repo.mkdir()
+        plain = client(not_repo, "-y")
+        plain.communicate(timeout=10)
+        assert plain.returncode == 1
+    finally:
+        daemon.terminate()
+        _, log = daemon.communicate(timeout=10)
+
+    assert log.count("git-sync -y") == 3
+    assert "waiting for the running sync" in log
+    assert not Path(env["GIT_SYNC_SOCKET"]).exists()
+
+
+@pytest.mark.skipif(
+    os.name != "posix" or subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0,
+    reason="requires POSIX and git",
+)
+def test_daemon_rereads_config_per_request_and_ignores_stalled_clients(tmp_path):
+    import socket
+
+    env = dict(os.environ, HOME=str(tmp_path), GIT_SYNC_SOCKET=str(tmp_path / "run" / "git-sync.sock"),
+               GIT_SYNC_CACHE_DIR=str(tmp_path / "cache"))
+    env.pop("GIT_SYNC_NO_DAEMON", None)
+    repo = _repo(tmp_path / "a")
+
+    # Daemon khởi động ngay trong repo: Settings của thư mục này đã được dựng trước khi fork
+    daemon = subprocess.Popen([sys.executable, str(GIT_SYNC), "--daemon"], cwd=repo, env=env,
+                              stderr=subprocess.PIPE, text=True)
+    stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        deadline = time.monotonic() + 10
+        while not Path(env["GIT_SYNC_SOCKET"]).exists():
+            assert daemon.poll() is None and time.monotonic() < deadline, "daemon did not start"
+            time.sleep(0.05)
+
+        def sync():
+            return subprocess.run([sys.executable, str(GIT_SYNC), "-y"], cwd=repo, env=env, stdin=subprocess.DEVNULL,
+                                  capture_output=True, text=True, timeout=10)
+
+        assert "No changes" in sync().stdout
+
+        # Một client kết nối nhưng không gửi gì không được chặn các client khác
+        stalled.connect(env["GIT_SYNC_SOCKET"])
+        (tmp_path / ".gitsyncrc").write_text("[settings]\nlanguage = vi\n", encoding="utf-8")
+        completed = sync()
+        assert completed.returncode == 0
+        assert "Không có thay đổi" in completed.stdout
+    finally:
+        stalled.close()
+        daemon.terminate()
+        daemon.communicate(timeout=10)
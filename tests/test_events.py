@@ -0,0 +1,86 @@
+import json
+import subprocess
+
+import pytest
+
+from core import cli
+from core.timings import RECORDER
+
+pytestmark = pytest.mark.skipif(
+    subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0,
+    reason="git is required",
+)
+
+
+def _git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+@pytest.fixture
+def clone(tmp_path, monkeypatch):
+    _git(tmp_path, "init", "-q", "--bare", "-b", "feature", "remote.git")
+    work = tmp_path / "work"
+    _git(tmp_path, "clone", "-q", str(tmp_path / "remote.git"), str(work))
+    _git(work, "config", "user.name", "Test User")
+    _git(work, "config", "user.email", "test@example.com")
+    (work / "app.py").write_text("v1\n", encoding="utf-8")
+    _git(work, "add", ".")
+    _git(work, "commit", "-q", "-m", "init")
+    _git(work, "push", "-q", "-u", "origin", "feature")
+    monkeypatch.chdir(work)
+    # cli.run bật RECORDER; trả lại trạng thái cũ cho các test sau
+    monkeypatch.setattr(RECORDER, "enabled", RECORDER.enabled)
+    monkeypatch.setattr(RECORDER, "listener", None)
+    monkeypatch.setattr(RECORDER, "counters", {})
+    return tmp_path, work
+
+
+def _events(out):
+    return [json.loads(line) for line in out.splitlines()]
+
+
+def test_jsonl_stream_reports_commands_push_and_final_sha(clone, capsys):
+    _, work = clone
+    (work / "app.py").write_text("v2\n", encoding="utf-8")
+
+    cli.run(["--chore", "bump", "-y", "--output=jsonl"])
+
+    captured = capsys.readouterr()
+    events = _events(captured.out)
+    assert "\x1b[" not in captured.out
+    start = next(e for e in events if e["event"] == "start")
+    assert (start["branch"], start["unstaged"]) == ("feature", 1)
+    commits = [e for e in events if e["event"] == "command" and e["argv"][:2] == ["git", "commit"]]
+    assert commits and commits[0]["returncode"] == 0 and commits[0]["duration_ms"] >= 0
+    assert any(e["event"] == "phase" and e["phase"] == "push" for e in events)
+    assert [e for e in events if e["event"] == "push"] == [
+        {"event": "push", "ts": pytest.approx(events[-1]["ts"], abs=60), "result": "ok", "attempts": 1, "retries": 0, "tag": None},
+    ]
+    result = events[-1]
+    assert result["event"] == "result"
+    assert (result["exit_code"], result["outcome"]) == (0, "synced")
+    assert result["head"] == _git(work, "rev-parse", "HEAD")
+    assert result["counters"]["push_attempts"] == 1
+    # Thông báo cho người đọc vẫn có, nhưng ở stderr
+    assert captured.err
+
+
+def test_jsonl_result_is_written_even_when_the_push_fails(clone, capsys):
+    tmp_path, work = clone
+    _git(work, "remote", "set-url", "origin", str(tmp_path / "missing.git"))
+    (work / "app.py").write_text("v2\n", encoding="utf-8")
+
+    with pytest.raises(SystemExit) as exc:
+        cli.run(["--chore", "bump", "-y", "--output=jsonl"])
+
+    assert exc.value.code == 1
+    result = _events(capsys.readouterr().out)[-1]
+    assert (result["event"], result["exit_code"], result["outcome"]) == ("result", 1, "push_failed")
+
+
+def test_jsonl_clean_tree_is_a_single_noop_result(clone, capsys):
+    cli.run(["--chore", "bump", "-y", "--output=jsonl"])
+
+    events = _events(capsys.readouterr().out)
+    assert [e["event"] for e in events if e["event"] in ("start", "push", "result")] == ["start", "result"]
+    assert events[-1]["outcome"] == "no_changes"
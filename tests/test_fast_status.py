@@ -0,0 +1,93 @@
+import json
+import subprocess
+from pathlib import Path
+
+import pytest
+
+import core.fast_status as fast_status
+from core.repo_state import read_repo_state
+from core.timings import RECORDER
+
+pytestmark = pytest.mark.skipif(
+    subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0,
+    reason="git is required",
+)
+
+
+def _git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    _git(tmp_path, "init", "-q")
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (tmp_path / name).write_text(name, encoding="utf-8")
+    _git(tmp_path, "add", ".")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(fast_status, "t", lambda name, **kw: name)
+    return tmp_path
+
+
+def test_index_entry_count_reads_only_the_header(repo):
+    assert fast_status.index_entry_count(repo / ".git") == 3
+    assert fast_status.index_entry_count(repo / "missing") is None
+
+
+def test_trivial_fsmonitor_response_is_not_a_fast_path():
+    def event(category, key, value, kind="data"):
+        return json.dumps({"event": kind, "category": category, "key": key, "value": value})
+
+    lines = [
+        event("index", "read/cache_nr", "400000"),
+        event("fsm_client", "query/response-length", "12"),
+        event("index", "refresh/sum_lstat", "7"),
+        event("read_directory", "opendir", "2"),
+        "not json",
+    ]
+    trace = fast_status.parse_status_trace(lines)
+    assert (trace.entries, trace.lstat, trace.fsmonitor, trace.untracked_cache, trace.opendir) == (400000, 7, True, True, 2)
+
+    trivial = fast_status.parse_status_trace([*lines, event("fsm_client", "query/trivial-response", "1")])
+    assert not trivial.fsmonitor
+
+
+def test_timings_report_untracked_cache_hits(repo, monkeypatch):
+    _git(repo, "config", "core.untrackedCache", "true")
+    (repo / "untracked").mkdir()
+    (repo / "untracked" / "new.txt").write_text("x", encoding="utf-8")
+    monkeypatch.setattr(RECORDER, "enabled", True)
+    monkeypatch.setattr(RECORDER, "counters", {})
+
+    read_repo_state()
+    state = read_repo_state()
+
+    assert state is not None and state.untracked == ["untracked/"]
+    assert RECORDER.counters["status_calls"] == 2
+    assert RECORDER.counters["status_untracked_cache"] >= 1
+    assert RECORDER.counters["status_entries"] == 6
+    assert not list(Path(repo).glob("*.trace"))
+
+
+def test_offer_is_asked_once_per_repository(repo, monkeypatch):
+    monkeypatch.setattr(fast_status, "LARGE_TREE_ENTRIES", 3)
+    monkeypatch.setattr(fast_status, "builtin_fsmonitor_supported", lambda: False)
+    answers = iter(["n"])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+
+    fast_status.offer_fast_status()
+    fast_status.offer_fast_status()  # đã từ chối: không hỏi lại (input sẽ báo StopIteration)
+
+    assert _git(repo, "config", "--get", fast_status.DECLINED_KEY) == "false"
+
+
+def test_offer_enables_untracked_cache_and_skips_small_repos(repo, monkeypatch):
+    monkeypatch.setattr(fast_status, "builtin_fsmonitor_supported", lambda: False)
+    monkeypatch.setattr("builtins.input", lambda prompt="": "y")
+
+    fast_status.offer_fast_status()
+    assert subprocess.call(["git", "config", "--get", "core.untrackedCache"], cwd=repo) == 1
+
+    monkeypatch.setattr(fast_status, "LARGE_TREE_ENTRIES", 3)
+    fast_status.offer_fast_status()
+    assert _git(repo, "config", "--get", "core.untrackedCache") == "true"
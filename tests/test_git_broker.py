@@ -0,0 +1,69 @@
+import subprocess
+
+import pytest
+
+import core.git_utils as git_utils
+from core.git_broker import GitBroker, is_read_only
+
+
+def _git_available() -> bool:
+    return subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    def run(*cmd):
+        return subprocess.run(["git", *cmd], cwd=tmp_path, check=True, capture_output=True, text=True).stdout.strip()
+
+    run("init", "-b", "feature/ABC-1")
+    run("config", "user.name", "Test User")
+    run("config", "user.email", "test@example.com")
+    (tmp_path / "file.txt").write_text("content", encoding="utf-8")
+    run("add", "file.txt")
+    run("commit", "-m", "init")
+    monkeypatch.chdir(tmp_path)
+    return run
+
+
+def test_is_read_only_classification():
+    assert is_read_only(["git", "status", "--porcelain"])
+    assert is_read_only(["git", "branch", "--show-current"])
+    assert is_read_only(["git", "config", "--get", "user.name"])
+    assert not is_read_only(["git", "branch", "new-branch"])
+    assert not is_read_only(["git", "config", "user.name", "x"])
+    assert not is_read_only(["git", "push"])
+    assert not is_read_only(["pytest", "-q"])
+
+
+@pytest.mark.skipif(not _git_available(), reason="git is required")
+def test_broker_answers_branch_in_process(repo):
+    broker = GitBroker()
+    assert broker.query(["git", "branch", "--show-current"]) == (0, "feature/ABC-1")
+    assert broker.spawn_count == 0
+
+
+@pytest.mark.skipif(not _git_available(), reason="git is required")
+def test_broker_resolves_revisions_through_single_pipe(repo):
+    broker = GitBroker()
+    head = repo("rev-parse", "HEAD")
+    try:
+        assert broker.query(["git", "rev-parse", "HEAD"]) == (0, head)
+        assert broker.query(["git", "rev-parse", "--verify", "feature/ABC-1"]) == (0, head)
+        assert broker.query(["git", "rev-parse", "--verify", "does-not-exist"]) is None
+        assert broker.spawn_count == 1
+    finally:
+        broker.close()
+
+
+@pytest.mark.skipif(not _git_available(), reason="git is required")
+def test_run_command_reuses_broker_and_invalidates_after_mutation(repo):
+    git_utils.BROKER.invalidate()
+    git_utils.reset_spawn_count()
+
+    for _ in range(4):
+        assert git_utils.get_current_branch() == "feature/ABC-1"
+    assert git_utils.get_spawn_count() == 0
+
+    git_utils.run_command(["git", "checkout", "-q", "-b", "other"])
+    assert git_utils.get_spawn_count() == 1
+    assert git_utils.get_current_branch() == "other"
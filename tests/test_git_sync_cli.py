@@ -1,5 +1,7 @@
 import sys
 
+import pytest
+
 import git_sync
 
 
@@ -15,7 +17,7 @@ def test_main_maps_alias_to_standard_commit_type(monkeypatch):
         called["args"] = args
 
     monkeypatch.setattr("core.main_flow.start_sync_flow", fake_start_sync_flow)
-    monkeypatch.setattr("core.main_flow.handle_force_reset", lambda a: None)
+    monkeypatch.setattr("core.main_flow.handle_force_reset", lambda *a: None)
     monkeypatch.setattr("core.config.initialize_lang", lambda a: None)
     monkeypatch.setattr("core.config.set_language_config", lambda lang: None)
 
@@ -27,6 +29,19 @@ def test_main_maps_alias_to_standard_commit_type(monkeypatch):
     assert getattr(parsed_args, "style") == "Update button"
 
 
+@pytest.mark.parametrize("alias, target, flag", [("st", "style", "--st"), ("work", "wip", "--work")])
+def test_alias_is_not_swallowed_by_abbreviation_of_a_builtin_option(monkeypatch, alias, target, flag):
+    from core import cli
+
+    monkeypatch.setattr("core.config.get_commit_aliases", lambda: {alias: target})
+
+    args, aliases = cli.parse_args([flag, "Message"])
+
+    assert aliases == {alias: target}
+    assert getattr(args, alias) == "Message"
+    assert not args.stash and args.workspace is None
+
+
 def test_main_set_lang_exits_after_updating_config(monkeypatch):
     seen = {}
 
@@ -37,7 +52,7 @@ def test_main_set_lang_exits_after_updating_config(monkeypatch):
     monkeypatch.setattr("core.config.initialize_lang", lambda a: None)
     monkeypatch.setattr("core.config.set_language_config", fake_set_lang)
     monkeypatch.setattr("core.main_flow.start_sync_flow", lambda a: None)
-    monkeypatch.setattr("core.main_flow.handle_force_reset", lambda a: None)
+    monkeypatch.setattr("core.main_flow.handle_force_reset", lambda *a: None)
 
     monkeypatch.setattr(sys, "argv", ["git-sync", "--set-lang", "vi"])
 
@@ -48,3 +63,17 @@ def test_main_set_lang_exits_after_updating_config(monkeypatch):
         assert seen["lang"] == "vi"
     else:  # pragma: no cover - should not reach here
         assert False, "SystemExit was not raised"
+
+
+def test_main_rejects_tag_and_update_after_in_watch_mode(monkeypatch, capsys):
+    monkeypatch.setattr("core.config.get_commit_aliases", lambda: {})
+    monkeypatch.setattr("core.config.initialize_lang", lambda a: None)
+    monkeypatch.setattr("core.config.t", lambda name, **kw: name)
+    monkeypatch.setattr("core.watch.run_watch", lambda *a: pytest.fail("watch must not start"))
+
+    for extra in (["--tag", "v1"], ["--update-after", "develop"]):
+        monkeypatch.setattr(sys, "argv", ["git-sync", "--watch", *extra])
+        with pytest.raises(SystemExit) as exc:
+            git_sync.main()
+        assert exc.value.code == 1
+        assert "watch_incompatible_options" in capsys.readouterr().err
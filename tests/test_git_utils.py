@@ -1,3 +1,4 @@
+import sys
 from types import SimpleNamespace
 
 import core.git_utils as git_utils
@@ -38,3 +39,51 @@ def test_run_command_unexpected_error(monkeypatch):
     code, output = git_utils.run_command(["git"])
     assert code == -1
     assert output == ""
+
+
+def test_stream_command_keeps_bounded_tail_and_pattern_matches(capsys):
+    script = (
+        "import sys\n"
+        "for i in range(100): print('line', i)\n"
+        "sys.stdout.write('Writing objects:  50% (1/2)\\rWriting objects: 100% (2/2), done.\\n')\n"
+        "print(' ! [rejected]        main -> main (non-fast-forward)')\n"
+        "sys.exit(1)\n"
+    )
+
+    result = git_utils.stream_command([sys.executable, "-c", script], tail_lines=5)
+
+    assert result.returncode == 1
+    assert len(result.tail) == 5
+    assert result.tail[-1].endswith("(non-fast-forward)")
+    assert "Writing objects: 100% (2/2), done." in result.tail
+    assert {"rejected", "non_fast_forward"} <= result.matches
+    captured = capsys.readouterr()
+    assert "line 0" in captured.out
+    # Dòng tiến trình trung gian không bị in khi stderr không phải TTY
+    assert "50%" not in captured.err
+    assert "100% (2/2), done." in captured.err
+
+
+def test_stream_command_strips_ansi_sequences(capsys):
+    script = (
+        "import sys\n"
+        "sys.stdout.write('remote: Counting objects: 100% (3/3), done.\\x1b[K\\n')\n"
+        "sys.stdout.write('\\x1b[31mCONFLICT\\x1b[0m (content): app.txt\\x1b]0;title\\x07\\n')\n"
+    )
+
+    result = git_utils.stream_command([sys.executable, "-c", script])
+
+    assert result.tail == ["remote: Counting objects: 100% (3/3), done.", "CONFLICT (content): app.txt"]
+    assert "conflict" in result.matches
+    captured = capsys.readouterr()
+    assert "\x1b" not in captured.out + captured.err
+    assert "remote: Counting objects: 100% (3/3), done. [" in captured.err
+
+
+def test_stream_command_dry_run_does_not_execute(monkeypatch, capsys):
+    monkeypatch.setattr(git_utils, "DRY_RUN", True)
+
+    result = git_utils.stream_command(["git", "push", "--progress"])
+
+    assert result.returncode == 0
+    assert "[DRY-RUN] git push --progress" in capsys.readouterr().out
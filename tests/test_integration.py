@@ -28,3 +28,265 @@ def test_integration_basic_sync_dry_run(tmp_path, monkeypatch):
 
     # Nếu có lỗi sẽ raise exception / SystemExit != 0 làm test fail
     git_sync.main()
+
+
+def _git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def _make_clone_with_remote(tmp_path, name):
+    remote = tmp_path / "remote.git"
+    if not remote.exists():
+        _git(tmp_path, "init", "--bare", "-b", "main", str(remote))
+    clone = tmp_path / name
+    _git(tmp_path, "clone", str(remote), str(clone))
+    _git(clone, "config", "user.name", "Test User")
+    _git(clone, "config", "user.email", "test@example.com")
+    return clone
+
+
+@pytest.mark.skipif(subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0, reason="git is required for integration tests")
+def test_integration_update_after_fast_forwards_without_checkout(tmp_path, monkeypatch):
+    import core.main_flow as main_flow
+
+    work = _make_clone_with_remote(tmp_path, "work")
+    (work / "file.txt").write_text("v1", encoding="utf-8")
+    _git(work, "add", "file.txt")
+    _git(work, "commit", "-m", "init")
+    for branch in ("main", "develop", "release"):
+        _git(work, "push", "-u", "origin", f"HEAD:refs/heads/{branch}")
+        if branch != "main":
+            _git(work, "branch", "--track", branch, f"origin/{branch}")
+    _git(work, "checkout", "-b", "feature")
+
+    # Một người khác push commit mới lên develop và release
+    other = _make_clone_with_remote(tmp_path, "other")
+    for branch in ("develop", "release"):
+        _git(other, "checkout", branch)
+        (other / f"{branch}.txt").write_text(branch, encoding="utf-8")
+        _git(other, "add", ".")
+        _git(other, "commit", "-m", f"update {branch}")
+        _git(other, "push", "origin", branch)
+
+    mtime_before = (work / "file.txt").stat().st_mtime_ns
+    monkeypatch.chdir(work)
+    main_flow._update_target_branch(["develop,release"], "feature")
+
+    assert _git(work, "rev-parse", "develop") == _git(other, "rev-parse", "develop")
+    assert _git(work, "rev-parse", "release") == _git(other, "rev-parse", "release")
+    assert _git(work, "branch", "--show-current") == "feature"
+    assert not (work / "develop.txt").exists()
+    assert (work / "file.txt").stat().st_mtime_ns == mtime_before
+
+
+@pytest.mark.skipif(subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0, reason="git is required for integration tests")
+def test_integration_remote_ahead_is_detected_while_committing(tmp_path, monkeypatch):
+    import core.main_flow as main_flow
+    from core.repo_state import read_repo_state
+
+    work = _make_clone_with_remote(tmp_path, "work")
+    (work / "file.txt").write_text("v1", encoding="utf-8")
+    _git(work, "add", "file.txt")
+    _git(work, "commit", "-m", "init")
+    _git(work, "push", "-u", "origin", "main")
+
+    other = _make_clone_with_remote(tmp_path, "other")
+    (other / "other.txt").write_text("other", encoding="utf-8")
+    _git(other, "add", ".")
+    _git(other, "commit", "-m", "from other")
+    _git(other, "push", "origin", "main")
+
+    (work / "file.txt").write_text("v2", encoding="utf-8")
+    monkeypatch.chdir(work)
+    args = main_flow.Namespace(yes=True, tag=None, update_after=None)
+    remote_ahead = main_flow._stage_and_commit_changes("feat: v2", args, read_repo_state())
+
+    assert remote_ahead is True
+    assert _git(work, "log", "-1", "--format=%s") == "feat: v2"
+    assert _git(work, "rev-parse", "origin/main") == _git(other, "rev-parse", "HEAD")
+
+
+@pytest.mark.skipif(subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0, reason="git is required for integration tests")
+def test_integration_release_sync_uses_one_fetch_and_one_atomic_push(tmp_path, monkeypatch):
+    import core.main_flow as main_flow
+    from core.repo_state import read_repo_state
+    from core.timings import RECORDER
+    from core.upstream import UpstreamPrefetch
+
+    work = _make_clone_with_remote(tmp_path, "work")
+    (work / "file.txt").write_text("v1", encoding="utf-8")
+    _git(work, "add", "file.txt")
+    _git(work, "commit", "-m", "init")
+    _git(work, "push", "-u", "origin", "HEAD:refs/heads/main")
+    _git(work, "push", "origin", "HEAD:refs/heads/develop")
+    _git(work, "branch", "--track", "develop", "origin/develop")
+
+    other = _make_clone_with_remote(tmp_path, "other")
+    _git(other, "checkout", "develop")
+    (other / "develop.txt").write_text("develop", encoding="utf-8")
+    _git(other, "add", ".")
+    _git(other, "commit", "-m", "update develop")
+    _git(other, "push", "origin", "develop")
+
+    (work / "file.txt").write_text("v2", encoding="utf-8")
+    monkeypatch.chdir(work)
+    monkeypatch.setattr(RECORDER, "enabled", False)
+    RECORDER.enable()
+    try:
+        args = main_flow.Namespace(yes=True, tag="v2.0.0", update_after=["develop"])
+        state = read_repo_state()
+        prefetch = UpstreamPrefetch.prepare(state, ["develop"])
+        prefetch.run_in_background()
+        main_flow.execute_sync("feat: v2", args, state, prefetch)
+        network = [c.argv[:2] for c in RECORDER.commands if c.argv[:2] in (["git", "fetch"], ["git", "push"])]
+    finally:
+        RECORDER.commands.clear()
+
+    assert network == [["git", "fetch"], ["git", "push"]]
+    head = _git(work, "rev-parse", "HEAD")
+    assert _git(tmp_path / "remote.git", "rev-parse", "main") == head
+    assert _git(tmp_path / "remote.git", "rev-parse", "v2.0.0^{commit}") == head
+    assert _git(work, "rev-parse", "develop") == _git(other, "rev-parse", "HEAD")
+
+
+@pytest.mark.skipif(subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0, reason="git is required for integration tests")
+def test_integration_atomic_push_never_leaves_the_tag_half_pushed(tmp_path, monkeypatch):
+    import core.main_flow as main_flow
+
+    work = _make_clone_with_remote(tmp_path, "work")
+    (work / "file.txt").write_text("v1", encoding="utf-8")
+    _git(work, "add", "file.txt")
+    _git(work, "commit", "-m", "init")
+    _git(work, "push", "-u", "origin", "HEAD:refs/heads/main")
+    other = _make_clone_with_remote(tmp_path, "other")
+    (other / "other.txt").write_text("other", encoding="utf-8")
+    _git(other, "add", ".")
+    _git(other, "commit", "-m", "from other")
+    _git(other, "push", "origin", "main")
+
+    (work / "file.txt").write_text("v2", encoding="utf-8")
+    _git(work, "commit", "-am", "local")
+    _git(work, "tag", "v2")
+    monkeypatch.chdir(work)
+    monkeypatch.setattr("builtins.input", lambda prompt="": "n")
+    upstream = ("origin", "refs/heads/main", "refs/remotes/origin/main")
+
+    with pytest.raises(SystemExit):
+        main_flow._push_and_handle_remote(main_flow.Namespace(yes=False), "main", False, "v2", upstream)
+
+    assert _git(tmp_path / "remote.git", "tag", "--list") == ""
+    assert _git(work, "tag", "--list") == ""
+
+
+@pytest.mark.skipif(subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0, reason="git is required for integration tests")
+def test_integration_update_after_skips_branches_whose_fetch_failed(tmp_path, monkeypatch, capsys):
+    import core.main_flow as main_flow
+
+    work = _make_clone_with_remote(tmp_path, "work")
+    (work / "file.txt").write_text("v1", encoding="utf-8")
+    _git(work, "add", "file.txt")
+    _git(work, "commit", "-m", "init")
+    _git(work, "push", "-u", "origin", "HEAD:refs/heads/develop")
+    _git(work, "branch", "--track", "develop", "origin/develop")
+    _git(work, "checkout", "-b", "feature")
+    develop_before = _git(work, "rev-parse", "develop")
+    # Remote không còn truy cập được: fetch thất bại
+    _git(work, "remote", "set-url", "origin", str(tmp_path / "missing.git"))
+    checkouts = []
+    monkeypatch.setattr(main_flow, "_update_target_branch_with_checkout", lambda *a: checkouts.append(a))
+
+    monkeypatch.chdir(work)
+    main_flow._update_target_branch(["develop"], "feature")
+
+    assert checkouts == []
+    assert _git(work, "rev-parse", "develop") == develop_before
+    assert _git(work, "branch", "--show-current") == "feature"
+    assert "develop" in capsys.readouterr().err
+
+
+def _work_with_moved_branches(tmp_path, branches):
+    """Clone `work` đứng ở feature; một người khác đã push commit mới lên từng branch trong `branches`."""
+    work = _make_clone_with_remote(tmp_path, "work")
+    (work / "file.txt").write_text("v1", encoding="utf-8")
+    _git(work, "add", "file.txt")
+    _git(work, "commit", "-m", "init")
+    for branch in branches:
+        _git(work, "push", "-u", "origin", f"HEAD:refs/heads/{branch}")
+        _git(work, "branch", "--track", branch, f"origin/{branch}")
+    _git(work, "checkout", "-b", "feature")
+    other = _make_clone_with_remote(tmp_path, "other")
+    for branch in branches:
+        _git(other, "checkout", branch)
+        (other / f"{branch}.txt").write_text(branch, encoding="utf-8")
+        _git(other, "add", ".")
+        _git(other, "commit", "-m", f"update {branch}")
+        _git(other, "push", "origin", branch)
+    return work, other
+
+
+@pytest.mark.skipif(subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0, reason="git is required for integration tests")
+def test_integration_update_after_refetches_when_the_prefetch_failed(tmp_path, monkeypatch):
+    import core.main_flow as main_flow
+    from core.plan import Plan, execute_plan
+    from core.upstream import UpstreamPrefetch, read_upstreams
+
+    work, other = _work_with_moved_branches(tmp_path, ["develop"])
+    monkeypatch.chdir(work)
+    # Lần fetch nền thất bại (remote tạm thời không truy cập được)
+    remote_url = _git(work, "remote", "get-url", "origin")
+    _git(work, "remote", "set-url", "origin", str(tmp_path / "missing.git"))
+    prefetch = UpstreamPrefetch("feature", ["develop"])
+    prefetch.run_in_background()
+    prefetch.wait()
+    assert prefetch.fetched == {}
+    _git(work, "remote", "set-url", "origin", remote_url)
+    checkouts = []
+    monkeypatch.setattr(main_flow, "_update_target_branch_with_checkout", lambda *a: checkouts.append(a))
+
+    plan = Plan()
+    main_flow._plan_update_after(plan, ["develop"], "feature", read_upstreams(["develop"]), prefetch=prefetch)
+    execute_plan(plan)
+
+    assert checkouts == []
+    assert _git(work, "rev-parse", "develop") == _git(other, "rev-parse", "develop")
+
+
+@pytest.mark.skipif(subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0, reason="git is required for integration tests")
+def test_integration_update_after_never_checks_out_while_the_prefetch_runs(tmp_path, monkeypatch, capsys):
+    import threading
+
+    import core.main_flow as main_flow
+    from core.plan import Plan, execute_plan
+    from core.upstream import UpstreamPrefetch, read_upstreams
+
+    work, other = _work_with_moved_branches(tmp_path, ["develop", "release"])
+    # release có commit local riêng: không fast-forward được, chỉ còn cách checkout + pull
+    _git(work, "checkout", "-q", "release")
+    (work / "local.txt").write_text("local", encoding="utf-8")
+    _git(work, "add", ".")
+    _git(work, "commit", "-m", "local release fix")
+    _git(work, "checkout", "-q", "feature")
+    monkeypatch.chdir(work)
+
+    # Lần fetch nền bị treo quá thời gian chờ
+    release_prefetch = threading.Event()
+    prefetch = UpstreamPrefetch("feature", ["develop", "release"])
+    prefetch._thread = threading.Thread(target=release_prefetch.wait, daemon=True)
+    prefetch.run_in_background()
+    monkeypatch.setattr(prefetch, "wait", lambda timeout=None: None)
+    checkouts = []
+    monkeypatch.setattr(main_flow, "_update_target_branch_with_checkout", lambda *a: checkouts.append(a))
+
+    try:
+        plan = Plan()
+        main_flow._plan_update_after(plan, ["develop", "release"], "feature", read_upstreams(["develop", "release"]),
+                                     prefetch=prefetch)
+        execute_plan(plan)
+    finally:
+        release_prefetch.set()
+
+    # develop được fetch lại ở foreground và fast-forward; release không bị checkout
+    assert _git(work, "rev-parse", "develop") == _git(other, "rev-parse", "develop")
+    assert checkouts == []
+    assert "release" in capsys.readouterr().err
+    assert _git(work, "branch", "--show-current") == "feature"
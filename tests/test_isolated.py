@@ -0,0 +1,111 @@
+import os
+import subprocess
+from argparse import Namespace
+
+import pytest
+
+import core.git_utils as git_utils
+import core.main_flow as main_flow
+from core.isolated import IsolatedCommit
+from core.plan import execute_plan
+from core.repo_state import RepoState, read_repo_state
+
+pytestmark = pytest.mark.skipif(
+    subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0,
+    reason="git is required",
+)
+
+
+def _git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def _args(**overrides):
+    values = dict(yes=True, tag=None, update_after=None, isolated=True)
+    values.update(overrides)
+    return Namespace(**values)
+
+
+@pytest.fixture
+def dirty_clone(tmp_path, monkeypatch):
+    _git(tmp_path, "init", "-q", "--bare", "-b", "main", "remote.git")
+    work = tmp_path / "work"
+    _git(tmp_path, "clone", "-q", str(tmp_path / "remote.git"), str(work))
+    _git(work, "config", "user.name", "Test User")
+    _git(work, "config", "user.email", "test@example.com")
+    for name in ("app.py", "lib.py"):
+        (work / name).write_text("v1\n", encoding="utf-8")
+    _git(work, "add", ".")
+    _git(work, "commit", "-q", "-m", "init")
+    _git(work, "push", "-q", "-u", "origin", "main")
+
+    (work / "app.py").write_text("v2\n", encoding="utf-8")
+    (work / "new.py").write_text("new\n", encoding="utf-8")
+    (work / "lib.py").write_text("staged\n", encoding="utf-8")
+    _git(work, "add", "lib.py")
+    monkeypatch.chdir(work)
+    return tmp_path, work
+
+
+def _mtimes(folder):
+    return {name: os.stat(folder / name).st_mtime_ns for name in ("app.py", "lib.py", "new.py")}
+
+
+def test_isolated_sync_pushes_without_rewriting_the_working_tree(dirty_clone):
+    tmp_path, work = dirty_clone
+    before = _mtimes(work)
+
+    main_flow.execute_sync("feat: isolated", _args(tag="v1"), read_repo_state())
+
+    remote = tmp_path / "remote.git"
+    assert _git(remote, "rev-parse", "main") == _git(work, "rev-parse", "HEAD")
+    assert _git(remote, "rev-parse", "v1^{commit}") == _git(work, "rev-parse", "HEAD")
+    assert _git(work, "log", "-1", "--format=%s") == "feat: isolated"
+    assert _git(remote, "show", "main:app.py") == "v2"
+    assert _git(remote, "show", "main:lib.py") == "staged"
+    # Index thật được thay bằng index riêng: không còn gì khác HEAD, file không bị chạm vào
+    assert _git(work, "status", "--porcelain") == ""
+    assert _mtimes(work) == before
+    assert not (work / ".git" / "index.git-sync").exists()
+
+
+def test_isolated_sync_changes_nothing_when_the_remote_is_ahead(dirty_clone):
+    tmp_path, work = dirty_clone
+    other = tmp_path / "other"
+    _git(tmp_path, "clone", "-q", str(tmp_path / "remote.git"), str(other))
+    (other / "other.txt").write_text("x", encoding="utf-8")
+    _git(other, "add", ".")
+    _git(other, "-c", "user.name=o", "-c", "user.email=o@example.com", "commit", "-q", "-m", "other")
+    _git(other, "push", "-q")
+    _git(work, "fetch", "-q")
+    head, status, before = _git(work, "rev-parse", "HEAD"), _git(work, "status", "--porcelain"), _mtimes(work)
+
+    with pytest.raises(SystemExit) as exc:
+        main_flow.execute_sync("feat: isolated", _args(), read_repo_state())
+
+    assert exc.value.code == 1
+    assert _git(work, "rev-parse", "HEAD") == head
+    assert _git(work, "status", "--porcelain") == status
+    assert _mtimes(work) == before
+    assert not (work / ".git" / "index.git-sync").exists()
+
+
+def test_isolated_plan_never_runs_a_checkout_command(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(git_utils, "DRY_RUN", True)
+    upstreams = {"main": ("origin", "refs/heads/main", "refs/remotes/origin/main")}
+    state = RepoState()
+    state.branch, state.upstream, state.unstaged = "main", "origin/main", ["a.txt"]
+
+    plan = main_flow.plan_isolated_sync(
+        "feat: x", _args(), state, (["a.txt"], "."), upstreams, IsolatedCommit(str(tmp_path / "index")),
+        original_branch="main",
+    )
+    execute_plan(plan)
+
+    out = capsys.readouterr().out
+    assert [line.split()[1] for line in out.splitlines()[1:]] == [
+        "confirm", "commit", "fetch-upstream", "push", "publish",
+    ]
+    for forbidden in ("git add", "git commit", "git pull", "git stash", "git checkout"):
+        assert forbidden not in out
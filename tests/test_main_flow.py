@@ -57,23 +57,48 @@ def test_get_commit_message_with_ticket_and_template(monkeypatch):
 def test_handle_force_reset_confirmed_runs_git_commands(monkeypatch):
     commands = []
 
-    def fake_run_command(cmd):
+    def fake_run_command(cmd, echo=True, input_data=None):
         commands.append(cmd)
-        return 0, ""
+        return 0, "origin\nupstream" if cmd == ["git", "remote"] else ""
+
+    async def fake_run_command_async(cmd, echo=True, input_data=None, phase=None):
+        return fake_run_command(cmd, echo, input_data)
 
     monkeypatch.setattr(main_flow, "run_command", fake_run_command)
+    monkeypatch.setattr("core.plan.run_command_async", fake_run_command_async)
     monkeypatch.setattr(main_flow, "t", lambda key, **kw: key)
     monkeypatch.setattr("builtins.input", lambda prompt="": "origin/main")
 
     main_flow.handle_force_reset("origin/main")
 
+    # Chỉ fetch đúng ref sẽ reset tới, không phải `fetch --all`
     assert commands == [
-        ["git", "fetch", "--all"],
+        ["git", "remote"],
+        ["git", "fetch", "origin", "+refs/heads/main:refs/remotes/origin/main"],
         ["git", "reset", "--hard", "origin/main"],
         ["git", "clean", "-df"],
     ]
 
 
+def test_force_reset_plan_fetches_every_remote_in_parallel_when_target_is_not_remote_branch():
+    plan = main_flow.plan_force_reset("v1.2.0", ["origin", "mirror"], depth=1, filter_spec="blob:none")
+
+    assert [step.argv for step in plan.steps[:2]] == [
+        ("git", "fetch", "--depth=1", "--filter=blob:none", "origin"),
+        ("git", "fetch", "--depth=1", "--filter=blob:none", "mirror"),
+    ]
+    assert all(not step.deps for step in plan.steps[:2])
+    assert plan.steps[2].deps == ("fetch-origin", "fetch-mirror")
+
+
+def test_force_reset_plan_prefers_the_longest_matching_remote_name():
+    plan = main_flow.plan_force_reset("team/a/feature/x", ["team", "team/a"])
+
+    assert plan.steps[0].argv == (
+        "git", "fetch", "team/a", "+refs/heads/feature/x:refs/remotes/team/a/feature/x",
+    )
+
+
 def test_handle_force_reset_cancelled_exits(monkeypatch):
     monkeypatch.setattr(main_flow, "run_command", lambda cmd: (0, ""))
     monkeypatch.setattr(main_flow, "t", lambda key, **kw: key)
@@ -102,3 +127,34 @@ def test_maybe_stash_changes_sets_flag_correctly(monkeypatch):
 
     assert was_stashed_first is False
     assert was_stashed_second is True
+
+
+def test_start_sync_flow_clean_repo_exits_before_hooks_and_prompts(monkeypatch):
+    from core.repo_state import RepoState
+
+    clean = RepoState()
+    clean.branch = "main"
+    clean.oid = "abc"
+
+    def fail(*a, **kw):  # pragma: no cover - must not be called
+        raise AssertionError("should not run for a clean repository")
+
+    monkeypatch.setattr(main_flow, "t", lambda key, **kw: key)
+    monkeypatch.setattr(main_flow, "read_repo_state", lambda: clean)
+    monkeypatch.setattr(main_flow, "handle_branch_protection", fail)
+    monkeypatch.setattr(main_flow, "_run_pre_sync_hook_if_needed", fail)
+    monkeypatch.setattr(main_flow, "run_command", fail)
+
+    main_flow.start_sync_flow(Namespace(stash=True, update_after=None, yes=False))
+
+
+def test_start_sync_flow_not_a_repo_exits(monkeypatch):
+    monkeypatch.setattr(main_flow, "t", lambda key, **kw: key)
+    monkeypatch.setattr(main_flow, "read_repo_state", lambda: None)
+
+    try:
+        main_flow.start_sync_flow(Namespace(stash=False, update_after=None, yes=True))
+    except SystemExit as exc:
+        assert exc.code == 1
+    else:  # pragma: no cover
+        assert False, "SystemExit was not raised"
@@ -0,0 +1,167 @@
+import os
+import subprocess
+import time
+import urllib.request
+from argparse import Namespace
+
+import pytest
+
+import core.main_flow as main_flow
+import core.metrics as metrics
+from core.config import Settings
+from core.metrics import METRICS, MetricsRegistry, Snapshot
+
+# Thời gian tối đa (đo trên lần nhanh nhất) cho một lần chạy ghi metrics; nới ra trên máy CI chậm bằng biến môi trường
+EXPORT_BUDGET_MS = float(os.environ.get("GIT_SYNC_METRICS_BUDGET_MS", "1"))
+
+
+def _git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    # Các decorator đã giữ sẵn METRICS: dùng lại đối tượng đó nhưng với số liệu trống
+    monkeypatch.setattr(METRICS, "buckets", (0.1, 1.0))
+    monkeypatch.setattr(METRICS, "values", Snapshot())
+    monkeypatch.setattr(METRICS, "_exported", Snapshot())
+    return METRICS
+
+
+def _textfile(monkeypatch, path):
+    monkeypatch.setattr(metrics, "get_settings", lambda: Settings(metrics_textfile=str(path)))
+
+
+def test_render_prometheus_text_and_openmetrics(registry):
+    registry.inc("git_sync_runs_total", operation="sync", outcome="synced")
+    registry.observe("git_sync_push_duration_seconds", 0.05)
+    registry.observe("git_sync_push_duration_seconds", 5.0)
+
+    text = registry.render()
+    assert "# TYPE git_sync_runs_total counter" in text
+    assert 'git_sync_runs_total{operation="sync",outcome="synced"} 1' in text
+    assert 'git_sync_push_duration_seconds_bucket{le="0.1"} 1' in text
+    assert 'git_sync_push_duration_seconds_bucket{le="1.0"} 1' in text
+    assert 'git_sync_push_duration_seconds_bucket{le="+Inf"} 2' in text
+    assert "git_sync_push_duration_seconds_sum 5.05" in text
+    assert "git_sync_push_duration_seconds_count 2" in text
+    assert "# EOF" not in text
+
+    openmetrics = registry.render(openmetrics=True)
+    assert "# TYPE git_sync_runs counter" in openmetrics
+    assert openmetrics.endswith("# EOF\n")
+
+
+def test_textfile_accumulates_across_runs_and_only_adds_new_increments(tmp_path, monkeypatch, registry):
+    path = tmp_path / "git-sync.prom"
+    _textfile(monkeypatch, path)
+
+    registry.inc("git_sync_push_attempts_total", 2)
+    registry.export()
+    registry.export()  # Không có gì mới: không cộng lại lần nữa
+    registry.inc("git_sync_push_attempts_total")
+    registry.export()
+
+    next_run = MetricsRegistry(buckets=(0.1, 1.0))
+    next_run.inc("git_sync_push_attempts_total")
+    next_run.observe("git_sync_hook_duration_seconds", 0.5, hook="pre_sync")
+    next_run.export()
+
+    text = path.read_text(encoding="utf-8")
+    assert "git_sync_push_attempts_total 4" in text
+    assert 'git_sync_hook_duration_seconds_count{hook="pre_sync"} 1' in text
+    assert [p.name for p in tmp_path.iterdir() if p.name != "git-sync-cache"] == ["git-sync.prom"]
+
+    # Mỗi lần chạy chỉ thêm bớt vài trăm micro giây, kể cả lúc ghi file. Đo thời gian CPU của
+    # tiến trình: các tiến trình git chạy nền do test khác để lại không được tính vào
+    def one_run():
+        run = MetricsRegistry(buckets=(0.1, 1.0))
+        start = time.process_time()
+        run.inc("git_sync_runs_total", operation="sync", outcome="synced")
+        run.observe("git_sync_run_duration_seconds", 0.3, operation="sync")
+        run.export()
+        return time.process_time() - start
+
+    assert min(one_run() for _ in range(5)) * 1000 < EXPORT_BUDGET_MS
+
+
+def test_dry_run_does_not_touch_the_textfile(tmp_path, monkeypatch, registry):
+    path = tmp_path / "git-sync.prom"
+    _textfile(monkeypatch, path)
+    monkeypatch.setattr(metrics.git_utils, "DRY_RUN", True)
+
+    registry.inc("git_sync_push_attempts_total")
+    registry.export()
+
+    assert not path.exists()
+
+
+@pytest.mark.skipif(
+    subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0,
+    reason="git is required",
+)
+def test_sync_records_runs_pushes_rejections_and_hooks(tmp_path, monkeypatch, registry):
+    _git(tmp_path, "init", "-q", "--bare", "-b", "main", "remote.git")
+    clones = []
+    for name in ("work", "other"):
+        clone = tmp_path / name
+        _git(tmp_path, "clone", "-q", str(tmp_path / "remote.git"), str(clone))
+        _git(clone, "config", "user.name", name)
+        _git(clone, "config", "user.email", f"{name}@example.com")
+        _git(clone, "config", "pull.rebase", "true")
+        clones.append(clone)
+    work, other = clones
+    (work / "app.txt").write_text("v1", encoding="utf-8")
+    _git(work, "add", ".")
+    _git(work, "commit", "-q", "-m", "init")
+    _git(work, "push", "-q", "-u", "origin", "main")
+    _git(other, "pull", "-q", "origin", "main")
+    (other / "other.txt").write_text("x", encoding="utf-8")
+    _git(other, "add", ".")
+    _git(other, "commit", "-q", "-m", "other")
+
+    (work / "app.txt").write_text("v2", encoding="utf-8")
+    monkeypatch.chdir(work)
+    original_push = main_flow._push
+
+    def lose_first_race(command):
+        if not registry.values.counters.get(("git_sync_push_rejections_total", ())):
+            _git(other, "push", "-q", "origin", "main")  # Người khác push ngay trước lần push đầu của chúng ta
+        return original_push(command)
+
+    monkeypatch.setattr(main_flow, "_push", lose_first_race)
+    monkeypatch.setattr(main_flow, "get_pre_sync_hook", lambda: "git --version")
+    # Lần chạy chỉ được đếm khi metrics được bật
+    monkeypatch.setattr(main_flow, "get_settings",
+                        lambda: Settings(push_backoff=0, metrics_textfile=str(tmp_path / "git-sync.prom")))
+
+    main_flow.start_sync_flow(Namespace(yes=True, tag=None, update_after=None, stash=False, scope=None, chore="bump"))
+
+    counters = {(name, labels): value for (name, labels), value in registry.values.counters.items()}
+    assert counters[("git_sync_runs_total", (("operation", "sync"), ("outcome", "synced")))] == 1
+    assert counters[("git_sync_pushes_total", (("result", "ok"),))] == 1
+    assert counters[("git_sync_push_attempts_total", ())] == 2
+    assert counters[("git_sync_push_rejections_total", ())] == 1
+    assert counters[("git_sync_hook_runs_total", (("hook", "pre_sync"), ("result", "ok")))] == 1
+    histograms = registry.values.histograms
+    assert histograms[("git_sync_push_duration_seconds", ())][:-1] != [0, 0, 0]
+    assert sum(histograms[("git_sync_run_duration_seconds", (("operation", "sync"),))][:-1]) == 1
+
+
+def test_http_endpoint_negotiates_openmetrics(registry):
+    registry.inc("git_sync_pushes_total", result="failed")
+    server = registry.serve_http("127.0.0.1:0")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        request = urllib.request.Request(url, headers={"Accept": "application/openmetrics-text; version=1.0.0"})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            body = response.read().decode("utf-8")
+            assert response.headers["Content-Type"].startswith("application/openmetrics-text")
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert 'git_sync_pushes_total{result="failed"} 1' in body
+    assert body.endswith("# EOF\n")
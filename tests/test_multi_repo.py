@@ -0,0 +1,89 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import core.multi_repo as multi_repo
+
+
+def test_strip_multi_repo_args_forwards_sync_flags_only():
+    argv = ["--repos", "a", "b", "--feat", "Msg", "-j", "4", "--workspace=ws", "--stash"]
+    assert multi_repo.strip_multi_repo_args(argv) == ["--feat", "Msg", "--stash", "--yes"]
+    assert multi_repo.strip_multi_repo_args(["-y", "--jobs=2"]) == ["-y"]
+
+
+@pytest.mark.parametrize("argv, expected", [
+    (["--repos=a", "--jobs=4", "--feat", "x"], ["--feat", "x", "--yes"]),
+    (["--workspace=ws", "-j4", "-y"], ["-y"]),
+    (["-yj4", "--chore", "bump"], ["-y", "--chore", "bump"]),
+    (["-yj", "4", "--chore", "bump"], ["-y", "--chore", "bump"]),
+    (["-sjobs", "--repos", "a", "b", "--fix", "bug"], ["-sjobs", "--fix", "bug", "--yes"]),
+])
+def test_strip_multi_repo_args_handles_attached_and_clustered_forms(argv, expected):
+    assert multi_repo.strip_multi_repo_args(argv) == expected
+
+
+def test_abbreviated_multi_repo_options_are_not_accepted(monkeypatch):
+    from core import cli
+
+    monkeypatch.setattr("core.config.get_commit_aliases", lambda: {})
+    for argv in (["--work", "ws"], ["--repo", "a"], ["--job", "4"]):
+        with pytest.raises(SystemExit):
+            cli.parse_args(argv)
+
+
+def test_discover_repositories_finds_direct_children(tmp_path):
+    (tmp_path / "one" / ".git").mkdir(parents=True)
+    (tmp_path / "two" / ".git").mkdir(parents=True)
+    (tmp_path / "plain").mkdir()
+    assert multi_repo.discover_repositories(tmp_path) == [tmp_path / "one", tmp_path / "two"]
+
+
+def test_run_multi_repo_sync_bounds_concurrency_and_aggregates(monkeypatch, capsys):
+    monkeypatch.setattr(multi_repo, "t", lambda key, **kw: key)
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def fake_sync(repo, forwarded_args):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.05)
+        with lock:
+            state["running"] -= 1
+        code = 1 if repo.name == "bad" else 0
+        return multi_repo.RepoResult(repo, code, 0.05, f"output of {repo.name}\n")
+
+    monkeypatch.setattr(multi_repo, "_sync_one_repo", fake_sync)
+
+    repos = [Path(name) for name in ["r1", "r2", "bad", "r4", "r5"]]
+    code = multi_repo.run_multi_repo_sync(repos, ["--feat", "x"], jobs=2)
+
+    out = capsys.readouterr().out
+    assert code == 1
+    assert state["peak"] == 2
+    assert "output of r4" in out
+    assert "multi_repo_result_failed" in out
+
+
+def test_child_progress_redraws_collapse_to_their_final_state(tmp_path, monkeypatch):
+    script = tmp_path / "fake_sync.py"
+    script.write_text(
+        "import sys\n"
+        "sys.stdout.write('start\\n')\n"
+        "for n in (10, 50, 100):\n"
+        "    sys.stdout.write(f'\\rWriting objects: {n:>3}% ({n}/100)')\n"
+        "sys.stdout.write(', done.\\n')\n"
+        "sys.stdout.write('\\r\\x1b[K\\n')\n"
+        "sys.stdout.write('\\n')\n"
+        "sys.stdout.write('pushed\\r\\n')\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(multi_repo, "_GIT_SYNC_SCRIPT", script)
+
+    result = multi_repo._sync_one_repo(tmp_path, [])
+
+    assert result.returncode == 0
+    # Mỗi lần vẽ lại không thành một dòng riêng; dòng trống thật sự vẫn được giữ
+    assert result.output == "start\nWriting objects: 100% (100/100), done.\n\npushed\n"
@@ -0,0 +1,273 @@
+import signal
+import subprocess
+import sys
+import threading
+import time
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+
+import core.git_utils as git_utils
+import core.main_flow as main_flow
+from core.plan import Plan, describe, execute_plan, optimize
+from core.repo_state import RepoState
+
+
+def _state(branch="feature", upstream="origin/feature"):
+    state = RepoState()
+    state.branch = branch
+    state.oid = "0" * 40
+    state.upstream = upstream
+    state.unstaged = ["a.txt"]
+    return state
+
+
+def _args(**overrides):
+    values = dict(yes=True, tag=None, update_after=None)
+    values.update(overrides)
+    return Namespace(**values)
+
+
+def test_optimize_dedupes_identical_queries_and_remaps_dependencies():
+    plan = Plan()
+    plan.command("head-1", ["git", "rev-parse", "HEAD"])
+    plan.command("head-2", ["git", "rev-parse", "HEAD"])
+    plan.command("commit", ["git", "commit", "-m", "x"], ("head-2",))
+    # Cùng truy vấn nhưng sau commit: kết quả có thể khác nên không được gộp
+    plan.command("head-3", ["git", "rev-parse", "HEAD"], ("commit",))
+
+    optimized = optimize(plan)
+
+    assert optimized.names == ["head-1", "commit", "head-3"]
+    assert optimized.aliases == {"head-2": "head-1"}
+    assert optimized.steps[1].deps == ("head-1",)
+
+
+def test_optimize_merges_fetches_to_the_same_remote():
+    plan = Plan()
+    plan.command("confirm", ["git", "status"])
+    plan.command("fetch-a", ["git", "fetch", "--quiet", "origin", "+refs/heads/a:refs/remotes/origin/a"], ("confirm",))
+    plan.command("fetch-b", ["git", "fetch", "--quiet", "origin", "+refs/heads/b:refs/remotes/origin/b"], ("confirm",))
+    plan.command("fetch-c", ["git", "fetch", "--quiet", "mirror", "+refs/heads/c:refs/remotes/mirror/c"], ("confirm",))
+    plan.command("push", ["git", "push"], ("fetch-b",))
+    plan.command("push-2", ["git", "push"], ("fetch-b",))
+
+    optimized = optimize(plan)
+
+    assert optimized.names == ["confirm", "fetch-a", "fetch-c", "push", "push-2"]
+    assert optimized.steps[1].argv == (
+        "git", "fetch", "--quiet", "origin",
+        "+refs/heads/a:refs/remotes/origin/a", "+refs/heads/b:refs/remotes/origin/b",
+    )
+    # `git push` không có remote/refspec tường minh thì không bao giờ bị gộp
+    assert optimized.steps[3].deps == ("fetch-a",)
+    assert "fetch-a+fetch-b" in describe(optimized)[1]
+
+
+def test_plan_rejects_unknown_dependencies_and_duplicate_names():
+    plan = Plan()
+    plan.command("a", ["git", "status"])
+    with pytest.raises(ValueError):
+        plan.command("a", ["git", "status"])
+    with pytest.raises(ValueError):
+        plan.command("b", ["git", "status"], ("missing",))
+
+
+def test_execute_plan_passes_results_to_tasks_including_merged_names(monkeypatch):
+    calls = []
+
+    async def fake_run_command_async(command, echo=True, input_data=None, phase=None):
+        calls.append(command)
+        return 0, "ok"
+
+    monkeypatch.setattr("core.plan.run_command_async", fake_run_command_async)
+    plan = Plan()
+    plan.command("fetch-a", ["git", "fetch", "origin", "a"])
+    plan.command("fetch-b", ["git", "fetch", "origin", "b"])
+    plan.task("use", lambda results: (results["fetch-a"], results["fetch-b"]), ("fetch-a", "fetch-b"))
+
+    results = execute_plan(plan)
+
+    assert calls == [["git", "fetch", "origin", "a", "b"]]
+    assert results["use"] == ((0, "ok"), (0, "ok"))
+
+
+def test_execute_plan_stops_on_failed_checked_step(monkeypatch):
+    async def failing(command, echo=True, input_data=None, phase=None):
+        return 1, ""
+
+    monkeypatch.setattr("core.plan.run_command_async", failing)
+    ran = []
+    plan = Plan()
+    plan.command("commit", ["git", "commit", "-m", "x"], check=True)
+    plan.task("push", lambda results: ran.append("push"), ("commit",))
+
+    with pytest.raises(SystemExit):
+        execute_plan(plan)
+    assert ran == []
+
+
+def test_independent_command_steps_overlap_as_subprocesses():
+    threads = []
+    plan = Plan()
+    sleep = [sys.executable, "-c", "import time; time.sleep(0.3); print('done')"]
+    plan.command("a", sleep, echo=False)
+    plan.command("b", sleep, echo=False)
+    plan.task("after", lambda results: threads.append(threading.get_ident()), ("a", "b"))
+
+    start = time.perf_counter()
+    results = execute_plan(plan)
+
+    assert results["a"] == results["b"] == (0, "done")
+    assert time.perf_counter() - start < 0.55
+    # Tác vụ Python vẫn chạy trong thread riêng, không chặn event loop
+    assert threads and threads[0] != threading.get_ident()
+
+
+def test_ctrl_c_at_an_interactive_step_exits_promptly(tmp_path):
+    # Tiến trình con: một bước chạy nền trong thread phụ, một bước chờ input() không bao giờ tới
+    script = (
+        "import time\n"
+        "from core.plan import Plan, execute_plan\n"
+        "plan = Plan()\n"
+        "plan.task('background', lambda results: time.sleep(0.2))\n"
+        "plan.task('ask', lambda results: (print('ready', flush=True), input()), interactive=True)\n"
+        "execute_plan(plan)\n"
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-c", script], cwd=Path(__file__).resolve().parent.parent,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    try:
+        assert process.stdout.readline().strip() == "ready"
+        process.send_signal(signal.SIGINT)
+        assert process.wait(timeout=5) != 0
+    finally:
+        process.kill()
+        process.stdin.close()
+        process.stdout.close()
+
+
+@pytest.mark.skipif(
+    subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0,
+    reason="git is required",
+)
+def test_failing_commit_step_exits_1_without_a_traceback(tmp_path):
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "config", "user.name", "work")
+    _git(tmp_path, "config", "user.email", "work@example.com")
+    hook = tmp_path / ".git" / "hooks" / "pre-commit"
+    hook.write_text("#!/bin/sh\nexit 1\n", encoding="utf-8")
+    hook.chmod(0o755)
+    (tmp_path / "a.txt").write_text("x", encoding="utf-8")
+    _git(tmp_path, "add", ".")
+    # Bước commit hỏng trong khi một bước độc lập vẫn chạy và một bước khác chờ nó
+    script = (
+        "import sys\n"
+        f"sys.path.insert(0, {str(Path(__file__).resolve().parent.parent)!r})\n"
+        "from core.plan import Plan, execute_plan\n"
+        "plan = Plan()\n"
+        "plan.command('status', ['git', 'status', '--short'])\n"
+        "plan.command('commit', ['git', 'commit', '-q', '-m', 'x'], check=True)\n"
+        "plan.command('push', ['git', 'log', '-1'], ('commit',))\n"
+        "execute_plan(plan)\n"
+    )
+    completed = subprocess.run([sys.executable, "-c", script], cwd=tmp_path, capture_output=True, text=True, timeout=30)
+
+    assert completed.returncode == 1
+    assert "Traceback" not in completed.stderr
+    assert "never retrieved" not in completed.stderr
+    assert "destroyed" not in completed.stderr
+
+
+def test_sync_plan_is_built_and_printed_without_a_repository(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(git_utils, "DRY_RUN", True)
+    upstreams = {
+        "feature": ("origin", "refs/heads/feature", "refs/remotes/origin/feature"),
+        "develop": ("origin", "refs/heads/develop", "refs/remotes/origin/develop"),
+    }
+
+    plan = main_flow.plan_sync(
+        "feat: x", _args(tag="v1", update_after=["develop"]), _state(), (["a.txt"], "."), upstreams,
+    )
+    assert execute_plan(plan) == {}
+
+    out = capsys.readouterr().out
+    # Fetch upstream và fetch branch cần cập nhật chung một remote: một lần kết nối
+    assert out.count("git fetch") == 1
+    assert ("git fetch --quiet origin +refs/heads/feature:refs/remotes/origin/feature "
+            "+refs/heads/develop:refs/remotes/origin/develop") in out
+    assert "git commit -m 'feat: x'" in out
+    assert "git tag v1" in out
+    assert "git push origin v1" not in out
+    lines = out.splitlines()
+    assert [line.split()[1] for line in lines[1:]] == [
+        "stage", "review", "confirm", "commit", "fetch-upstream+fetch-origin",
+        "tag-create", "push", "update-after",
+    ]
+
+
+def test_tag_is_pushed_separately_when_the_upstream_is_unknown(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(git_utils, "DRY_RUN", True)
+
+    execute_plan(main_flow.plan_sync("feat: x", _args(tag="v1"), _state(upstream=None), (["a.txt"], "."), {}))
+
+    out = capsys.readouterr().out
+    assert "git fetch" not in out
+    assert "git push origin v1" in out
+
+
+def _git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+@pytest.mark.skipif(
+    subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0,
+    reason="git is required",
+)
+def test_dry_run_prints_the_same_plan_as_the_real_run(tmp_path, monkeypatch, capsys):
+    _git(tmp_path, "init", "-q", "--bare", "-b", "main", "remote.git")
+    work = tmp_path / "work"
+    _git(tmp_path, "clone", "-q", str(tmp_path / "remote.git"), str(work))
+    _git(work, "config", "user.name", "work")
+    _git(work, "config", "user.email", "work@example.com")
+    _git(work, "checkout", "-q", "-b", "feature")
+    (work / "app.txt").write_text("v1", encoding="utf-8")
+    _git(work, "add", ".")
+    _git(work, "commit", "-q", "-m", "init")
+    _git(work, "push", "-q", "-u", "origin", "feature")
+    monkeypatch.chdir(work)
+    monkeypatch.setattr(main_flow, "get_pre_sync_hook", lambda: "git --version")
+
+    plans = []
+    original_execute_plan = execute_plan
+
+    def record(plan):
+        plans.append([step.name for step in optimize(plan).steps])
+        return original_execute_plan(plan)
+
+    monkeypatch.setattr("core.plan.execute_plan", record)
+
+    def sync():
+        # --stash cất thay đổi đã theo dõi đi, chỉ file mới được commit
+        (work / "app.txt").write_text(f"v{len(plans) + 2}", encoding="utf-8")
+        (work / f"new{len(plans)}.txt").write_text("x", encoding="utf-8")
+        main_flow.start_sync_flow(_args(stash=True, scope=None, chore="bump"))
+
+    monkeypatch.setattr(git_utils, "DRY_RUN", True)
+    sync()
+    dry_out = capsys.readouterr().out
+    monkeypatch.setattr(git_utils, "DRY_RUN", False)
+    sync()
+
+    dry, real = plans
+    assert dry == real
+    assert {"prefetch", "stash", "pre-hook", "refresh", "stash-pop"} <= set(dry)
+    # Fetch đã chạy nền từ bước prefetch: bản in chỉ chờ nó, không tự fetch lại
+    assert "git fetch" not in dry_out
+    assert _git(work, "log", "-1", "--format=%s") == "chore: bump"
+    assert _git(work, "rev-parse", "HEAD") == _git(work, "rev-parse", "origin/feature")
+    assert (work / "app.txt").read_text(encoding="utf-8") == "v3"  # Stash đã được trả lại
@@ -0,0 +1,184 @@
+import subprocess
+from argparse import Namespace
+
+import pytest
+
+import core.main_flow as main_flow
+from core.config import Settings
+from core.retry import MAX_BACKOFF_SECONDS, RetryPolicy
+from core.timings import RECORDER
+
+pytestmark = pytest.mark.skipif(
+    subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0,
+    reason="git is required",
+)
+
+
+def _git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def _clone(tmp_path, name):
+    clone = tmp_path / name
+    _git(tmp_path, "clone", "-q", str(tmp_path / "remote.git"), str(clone))
+    _git(clone, "config", "user.name", name)
+    _git(clone, "config", "user.email", f"{name}@example.com")
+    _git(clone, "config", "pull.rebase", "true")
+    return clone
+
+
+class Competitor:
+    """Một pusher khác: push một commit mới lên remote mỗi khi được gọi."""
+
+    def __init__(self, clone):
+        self.clone = clone
+        self.pushes = 0
+
+    def push(self):
+        self.pushes += 1
+        _git(self.clone, "pull", "-q")
+        (self.clone / f"bot-{self.pushes}.txt").write_text(str(self.pushes), encoding="utf-8")
+        _git(self.clone, "add", ".")
+        _git(self.clone, "commit", "-q", "-m", f"bot {self.pushes}")
+        _git(self.clone, "push", "-q", "origin", "main")
+
+
+@pytest.fixture
+def contended(tmp_path, monkeypatch):
+    _git(tmp_path, "init", "-q", "--bare", "-b", "main", "remote.git")
+    work = _clone(tmp_path, "work")
+    (work / "app.txt").write_text("v1", encoding="utf-8")
+    _git(work, "add", ".")
+    _git(work, "commit", "-q", "-m", "init")
+    _git(work, "push", "-q", "-u", "origin", "main")
+    competitor = Competitor(_clone(tmp_path, "bot"))
+
+    (work / "app.txt").write_text("v2", encoding="utf-8")
+    _git(work, "commit", "-q", "-am", "local change")
+    competitor.push()  # Lần push đầu tiên của chúng ta chắc chắn bị từ chối
+    monkeypatch.chdir(work)
+    return tmp_path, work, competitor
+
+
+def _lose_races(monkeypatch, competitor, count):
+    """Sau mỗi lần pull --rebase, pusher khác lại push trước chúng ta (tối đa `count` lần)."""
+    original = main_flow._pull_rebase
+
+    def pull_then_race():
+        result = original()
+        if competitor.pushes <= count:
+            competitor.push()
+        return result
+
+    monkeypatch.setattr(main_flow, "_pull_rebase", pull_then_race)
+
+
+def _policy(monkeypatch, **values):
+    monkeypatch.setattr(main_flow, "get_settings", lambda: Settings(**values))
+
+
+def test_backoff_is_exponential_with_full_jitter_and_capped():
+    policy = RetryPolicy(base_delay=0.5)
+    assert [policy.delay(n, rng=lambda: 1.0) for n in (0, 1, 2, 3)] == [0.0, 0.5, 1.0, 2.0]
+    assert policy.delay(20, rng=lambda: 1.0) == MAX_BACKOFF_SECONDS
+    assert policy.delay(3, rng=lambda: 0.0) == 0.0
+
+
+def test_push_keeps_retrying_until_it_wins_the_race(contended, monkeypatch):
+    tmp_path, work, competitor = contended
+    _lose_races(monkeypatch, competitor, count=2)
+    _policy(monkeypatch, push_max_attempts=5, push_backoff=0.01)
+    delays = []
+    monkeypatch.setattr(main_flow.time, "sleep", delays.append)
+    before = RECORDER.counters.get("push_attempts", 0)
+
+    attempts = main_flow._push_and_handle_remote(Namespace(yes=True), "main")
+
+    # Bị từ chối lần đầu, thua thêm hai lượt, thắng ở lần thứ tư
+    assert attempts == 4
+    assert RECORDER.counters["push_attempts"] - before == 4
+    assert len(delays) == 2 and all(0 <= d <= 0.02 for d in delays)
+    assert _git(tmp_path / "remote.git", "rev-parse", "main") == _git(work, "rev-parse", "HEAD")
+    assert _git(work, "log", "-1", "--format=%s") == "local change"
+
+
+def test_push_gives_up_after_max_attempts(contended, monkeypatch):
+    _, _, competitor = contended
+    _lose_races(monkeypatch, competitor, count=100)
+    _policy(monkeypatch, push_max_attempts=3, push_backoff=0.0)
+    before = RECORDER.counters.get("push_attempts", 0)
+
+    with pytest.raises(SystemExit) as exc:
+        main_flow._push_and_handle_remote(Namespace(yes=True), "main")
+
+    assert exc.value.code == 1
+    assert RECORDER.counters["push_attempts"] - before == 3
+
+
+def test_known_remote_ahead_counts_only_real_pushes(contended, monkeypatch, capsys):
+    _, _, competitor = contended
+    _lose_races(monkeypatch, competitor, count=1)
+    _policy(monkeypatch, push_max_attempts=3, push_backoff=0.01)
+    delays = []
+    monkeypatch.setattr(main_flow.time, "sleep", delays.append)
+    monkeypatch.setattr(main_flow, "t", lambda name, **kw: f"{name}{kw.get('attempt', '')}")
+
+    attempts = main_flow._push_and_handle_remote(Namespace(yes=True), "main", remote_ahead=True)
+
+    # Không push lần đầu (biết trước sẽ bị từ chối): lần push thật đầu tiên thua, lần thứ hai thắng
+    assert attempts == 2
+    assert len(delays) == 1
+    out = capsys.readouterr().out
+    assert "pushing_to_remote" in out
+    assert "retrying_push_attempt1" not in out and "retrying_push_attempt2" in out
+
+
+def test_push_stops_retrying_at_the_deadline(contended, monkeypatch):
+    _policy(monkeypatch, push_max_attempts=10, push_retry_deadline=0.0)
+    pulls = []
+    monkeypatch.setattr(main_flow, "_pull_rebase", lambda: pulls.append(1))
+
+    with pytest.raises(SystemExit):
+        main_flow._push_and_handle_remote(Namespace(yes=True), "main")
+
+    assert pulls == []
+
+
+def test_push_retries_when_a_concurrent_push_wins_the_ref_update(tmp_path, monkeypatch, capsys):
+    _git(tmp_path, "init", "-q", "--bare", "-b", "main", "remote.git")
+    work = _clone(tmp_path, "work")
+    (work / "app.txt").write_text("v1", encoding="utf-8")
+    _git(work, "add", ".")
+    _git(work, "commit", "-q", "-m", "init")
+    _git(work, "push", "-q", "-u", "origin", "main")
+    bot = _clone(tmp_path, "bot")
+    (bot / "bot.txt").write_text("x", encoding="utf-8")
+    _git(bot, "add", ".")
+    _git(bot, "commit", "-q", "-m", "bot")
+    (work / "app.txt").write_text("v2", encoding="utf-8")
+    _git(work, "commit", "-q", "-am", "local change")
+
+    # Push của người khác chạy trọn vẹn trong lúc push của chúng ta đang ở server (pre-receive),
+    # nên server từ chối cập nhật ref: "cannot lock ref ... [remote rejected] (failed to update ref)"
+    marker = tmp_path / "raced"
+    hook = tmp_path / "remote.git" / "hooks" / "pre-receive"
+    hook.write_text(
+        "#!/bin/sh\n"
+        f"if [ ! -e '{marker}' ]; then\n"
+        f"  touch '{marker}'\n"
+        f"  env -i PATH=\"$PATH\" HOME=\"$HOME\" git -C '{bot}' push -q origin main\n"
+        "fi\n",
+        encoding="utf-8",
+    )
+    hook.chmod(0o755)
+    monkeypatch.chdir(work)
+    _policy(monkeypatch, push_max_attempts=3, push_backoff=0.0)
+
+    attempts = main_flow._push_and_handle_remote(Namespace(yes=True), "main")
+
+    captured = capsys.readouterr()
+    assert marker.exists()
+    assert "cannot lock ref" in captured.out + captured.err
+    assert attempts == 2
+    assert _git(tmp_path / "remote.git", "rev-parse", "main") == _git(work, "rev-parse", "HEAD")
+    assert _git(work, "log", "-2", "--format=%s").splitlines() == ["local change", "bot"]
@@ -0,0 +1,62 @@
+import subprocess
+
+import pytest
+
+import core.git_utils as git_utils
+from core.repo_state import parse_porcelain_v2, read_repo_state
+
+
+def test_parse_porcelain_v2_branch_headers_and_entries():
+    output = "\0".join([
+        "# branch.oid 1234567890abcdef1234567890abcdef12345678",
+        "# branch.head feature/ABC-1",
+        "# branch.upstream origin/feature/ABC-1",
+        "# branch.ab +2 -3",
+        "1 M. N... 100644 100644 100644 aaaa bbbb staged.txt",
+        "1 .M N... 100644 100644 100644 aaaa aaaa with space.txt",
+        "2 R. N... 100644 100644 100644 aaaa aaaa R100 new name.txt",
+        "old name.txt",
+        "u UU N... 100644 100644 100644 100644 aaaa bbbb cccc conflict.txt",
+        "? untracked.txt",
+        "",
+    ])
+
+    state = parse_porcelain_v2(output)
+
+    assert state.branch == "feature/ABC-1"
+    assert state.upstream == "origin/feature/ABC-1"
+    assert (state.ahead, state.behind) == (2, 3)
+    assert state.staged == ["staged.txt", "new name.txt"]
+    assert state.unstaged == ["with space.txt"]
+    assert state.untracked == ["untracked.txt"]
+    assert state.conflicts == ["conflict.txt"]
+    assert state.has_conflicts and not state.is_clean
+
+
+def test_parse_porcelain_v2_initial_and_detached():
+    initial = parse_porcelain_v2("# branch.oid (initial)\0# branch.head main\0")
+    assert initial.is_initial and initial.branch == "main" and initial.is_clean
+
+    detached = parse_porcelain_v2("# branch.oid abc\0# branch.head (detached)\0")
+    assert detached.is_detached and detached.branch is None
+
+
+@pytest.mark.skipif(subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0, reason="git is required")
+def test_read_repo_state_uses_single_process(tmp_path, monkeypatch):
+    subprocess.run(["git", "init", "-b", "main"], cwd=tmp_path, check=True, capture_output=True)
+    (tmp_path / "new.txt").write_text("x", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    git_utils.reset_spawn_count()
+
+    state = read_repo_state()
+
+    assert state is not None
+    assert state.branch == "main" and state.is_initial
+    assert state.untracked == ["new.txt"]
+    assert git_utils.get_spawn_count() == 1
+
+
+def test_read_repo_state_outside_repository_returns_none(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GIT_CEILING_DIRECTORIES", str(tmp_path.parent))
+    assert read_repo_state() is None
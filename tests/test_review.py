@@ -0,0 +1,72 @@
+import subprocess
+import threading
+from argparse import Namespace
+
+import pytest
+
+import core.main_flow as main_flow
+from core.review import ChangeReview, parse_numstat, top_by_churn
+
+pytestmark = pytest.mark.skipif(
+    subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0,
+    reason="git is required",
+)
+
+
+def _git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+@pytest.fixture
+def staged_repo(tmp_path, monkeypatch):
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "config", "user.name", "Test User")
+    _git(tmp_path, "config", "user.email", "test@example.com")
+    (tmp_path / "base.txt").write_text("base\n", encoding="utf-8")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "init")
+    for index in range(5):
+        (tmp_path / f"f{index}.txt").write_text("x\n" * (index + 1), encoding="utf-8")
+    (tmp_path / "image.bin").write_bytes(b"\0\1\2")
+    _git(tmp_path, "add", ".")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("core.review.t", lambda key, **kw: f"{key} {sorted(kw.items())}")
+    return tmp_path
+
+
+def test_parse_numstat_handles_binary_files_and_tabs_in_names():
+    output = "3\t1\tsrc/a.py\0-\t-\timg.png\x002\t0\tname\twith tab\0"
+    assert parse_numstat(output) == [("src/a.py", 3, 1), ("img.png", -1, -1), ("name\twith tab", 2, 0)]
+    assert top_by_churn(parse_numstat(output), 2) == [("src/a.py", 3, 1), ("name\twith tab", 2, 0)]
+
+
+def test_summary_lists_only_the_top_files_by_churn(staged_repo, capsys):
+    ChangeReview.start(2).print_summary(timeout=None)
+
+    out = capsys.readouterr().out
+    assert "review_summary [('added', 15), ('deleted', 0), ('files', 6)]" in out
+    assert "f4.txt" in out and "f3.txt" in out
+    assert "f0.txt" not in out
+    assert "review_more_files [('count', 4)]" in out
+
+
+def test_summary_does_not_wait_for_slow_line_counts(staged_repo, capsys, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(ChangeReview, "_run", lambda self: release.wait(5))
+
+    ChangeReview.start(10).print_summary(timeout=0.01)
+    release.set()
+
+    assert "review_pending [('files', 6)]" in capsys.readouterr().out
+
+
+def test_full_stat_is_shown_only_on_request(staged_repo, capsys, monkeypatch):
+    answers = iter(["d", "y"])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+    review = ChangeReview.start(1)
+    review.print_summary(timeout=None)
+    assert "f0.txt" not in capsys.readouterr().out
+
+    main_flow._confirm_commit(Namespace(yes=False), None, None, review)
+
+    assert "f0.txt" in capsys.readouterr().out
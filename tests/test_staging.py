@@ -0,0 +1,81 @@
+import subprocess
+
+import pytest
+
+import core.staging as staging
+from core.config import Settings
+from core.git_utils import run_command
+from core.repo_state import RepoState, read_repo_state
+
+
+def _git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    _git(tmp_path, "init", "-b", "main")
+    _git(tmp_path, "config", "user.name", "Test User")
+    _git(tmp_path, "config", "user.email", "test@example.com")
+    (tmp_path / "keep.txt").write_text("v1", encoding="utf-8")
+    (tmp_path / "gone.txt").write_text("bye", encoding="utf-8")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-m", "init")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(staging, "t", lambda key, **kw: key)
+    return tmp_path
+
+
+def test_split_large_files_keeps_deleted_paths(tmp_path):
+    (tmp_path / "small").write_bytes(b"x")
+    (tmp_path / "big").write_bytes(b"x" * 100)
+    kept, large = staging.split_large_files(["small", "big", "deleted"], 10, str(tmp_path))
+    assert kept == ["small", "deleted"]
+    assert large == [("big", 100)]
+
+
+def _run_all(commands):
+    for argv, input_data in commands:
+        assert run_command(argv, input_data=input_data)[0] == 0
+
+
+@pytest.mark.skipif(subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0, reason="git is required")
+def test_select_paths_stages_status_paths_in_batches_and_skips_large(repo, monkeypatch, capsys):
+    monkeypatch.setattr(staging, "get_settings", lambda: Settings(max_file_size=1024))
+    (repo / "keep.txt").write_text("v2", encoding="utf-8")
+    (repo / "gone.txt").unlink()
+    (repo / "new dir").mkdir()
+    (repo / "new dir" / "a*b.txt").write_text("glob-looking name", encoding="utf-8")
+    (repo / "new dir" / "huge.bin").write_bytes(b"0" * 4096)
+
+    paths, root = staging.select_paths(read_repo_state())
+    commands = staging.add_commands(paths, root, batch_size=2)
+    assert len(commands) == 2
+    _run_all(commands)
+
+    staged = _git(repo, "diff", "--cached", "--name-status").splitlines()
+    assert sorted(staged) == ["A\tnew dir/a*b.txt", "D\tgone.txt", "M\tkeep.txt"]
+    assert "large_file_skipped" in capsys.readouterr().err
+    assert "?? \"new dir/huge.bin\"" in _git(repo, "status", "--porcelain")
+
+
+@pytest.mark.skipif(subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0, reason="git is required")
+def test_add_commands_pass_each_batch_on_stdin(repo):
+    paths = [f"f{i}.txt" for i in range(5)]
+    for i, path in enumerate(paths):
+        (repo / path).write_text(str(i), encoding="utf-8")
+
+    commands = staging.add_commands(paths, batch_size=2)
+
+    assert [input_data.split("\0") for _, input_data in commands] == [paths[0:2], paths[2:4], paths[4:]]
+    assert all("--pathspec-from-file=-" in argv and "-C" not in argv for argv, _ in commands)
+    _run_all(commands)
+    assert len(_git(repo, "diff", "--cached", "--name-only").splitlines()) == 5
+
+
+def test_select_paths_reports_nothing_to_stage(monkeypatch, capsys):
+    monkeypatch.setattr(staging, "t", lambda key, **kw: key)
+    monkeypatch.setattr(staging, "repo_root", lambda: ".")
+
+    assert staging.select_paths(RepoState()) is None
+    assert "nothing_to_stage" in capsys.readouterr().err
@@ -0,0 +1,77 @@
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+GIT_SYNC = Path(__file__).resolve().parent.parent / "git_sync.py"
+
+# Tổng thời gian import (-X importtime) cho phép khi chạy trên một repo không có thay đổi.
+# Có thể nới ra trên máy CI chậm bằng biến môi trường.
+STARTUP_BUDGET_MS = float(os.environ.get("GIT_SYNC_STARTUP_BUDGET_MS", "150"))
+
+# Các module nặng mà lần chạy không có gì để làm không được phép import
+HEAVY_MODULES = {"asyncio", "concurrent.futures", "configparser", "json", "ssl", "socket", "random"}
+# Các phần của git-sync chỉ dùng khi thật sự có việc (commit, push, fetch nền, metrics, --batch...)
+SYNC_ONLY_MODULES = {
+    "core.batch", "core.events", "core.fast_status", "core.isolated", "core.metrics", "core.plan",
+    "core.retry", "core.review", "core.upstream",
+}
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def _import_profile(args, cwd, env):
+    """Chạy git-sync với -X importtime; trả về ({module: cumulative µs}, tổng µs của các import cấp cao nhất)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args], cwd=cwd, env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    modules = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if not match:
+            continue
+        modules[match.group(4)] = int(match.group(2))
+        # Không tính phần khởi động của chính trình thông dịch
+        if not match.group(3) and match.group(4) not in ("site", "encodings", "_frozen_importlib_external", "zipimport"):
+            total += int(match.group(2))
+    return modules, total
+
+
+@pytest.fixture
+def env(tmp_path):
+    env = dict(os.environ, HOME=str(tmp_path / "home"), GIT_SYNC_CACHE_DIR=str(tmp_path / "cache"))
+    env.pop("PYTHONPATH", None)
+    (tmp_path / "home").mkdir()
+    return env
+
+
+def test_importing_entry_point_loads_nothing_from_core(tmp_path, env):
+    modules, _ = _import_profile(["-c", f"import sys; sys.path.insert(0, {str(GIT_SYNC.parent)!r}); import git_sync"], tmp_path, env)
+    assert "git_sync" in modules
+    assert not {m for m in modules if m.startswith("core") or m == "argparse"}
+
+
+def test_set_lang_does_not_load_the_sync_machinery(tmp_path, env):
+    modules, _ = _import_profile([str(GIT_SYNC), "--set-lang", "en"], tmp_path, env)
+    assert not {"core.main_flow", "core.git_utils", "subprocess", "asyncio"} & set(modules)
+
+
+@pytest.mark.skipif(subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0, reason="git is required")
+def test_clean_tree_noop_stays_within_startup_budget(tmp_path, env):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    subprocess.run(["git", "init", "-q"], cwd=repo, check=True)
+    subprocess.run(["git", "-c", "user.name=T", "-c", "user.email=t@example.com", "commit", "-q", "--allow-empty", "-m", "init"], cwd=repo, check=True)
+
+    # Lần đầu dựng cache Settings; lần đo là lần thứ hai, giống như khi được gọi liên tục
+    _import_profile([str(GIT_SYNC), "-y"], repo, env)
+    modules, total = _import_profile([str(GIT_SYNC), "-y"], repo, env)
+
+    assert not HEAVY_MODULES & set(modules)
+    assert not SYNC_ONLY_MODULES & set(modules)
+    assert total / 1000 <= STARTUP_BUDGET_MS, f"startup imports took {total / 1000:.1f}ms (budget {STARTUP_BUDGET_MS}ms)"
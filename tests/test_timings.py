@@ -0,0 +1,62 @@
+import json
+import sys
+
+import core.git_utils as git_utils
+import core.timings as timings
+
+
+def test_phases_nest_and_commands_are_attributed_to_innermost_phase(monkeypatch):
+    recorder = timings.Recorder()
+    recorder.enable()
+
+    with recorder.phase("push"):
+        with recorder.phase("hooks"):
+            recorder.record_command(["pytest"], 0.0, True, 10, 0)
+        recorder.record_command(["git", "push"], 0.0, True, 5, 1)
+    recorder.record_command(["git", "status"], 0.0, False, 0, 0)
+
+    assert [c.phase for c in recorder.commands] == ["hooks", "push", timings.ROOT_PHASE]
+    assert [p.name for p in recorder.phases] == ["hooks", "push"]
+
+    rows = {r["phase"]: r for r in timings.summarize(recorder)}
+    assert rows["push"]["commands"] == 1 and rows["push"]["output_bytes"] == 5
+    assert rows["other"]["spawned"] == 0
+
+
+def test_disabled_recorder_records_nothing():
+    recorder = timings.Recorder()
+    with recorder.phase("push"):
+        pass
+    assert recorder.phases == []
+
+
+def test_run_command_records_spawn_and_output_size(monkeypatch):
+    monkeypatch.setattr(timings.RECORDER, "enabled", True)
+    monkeypatch.setattr(timings.RECORDER, "commands", [])
+    monkeypatch.setattr(timings.RECORDER, "phases", [])
+
+    with timings.phase("hooks"):
+        git_utils.run_command([sys.executable, "-c", "print('abc')"], echo=False)
+
+    (record,) = timings.RECORDER.commands
+    assert record.phase == "hooks"
+    assert record.spawned is True
+    assert record.output_bytes == 3
+    assert record.returncode == 0
+
+
+def test_chrome_trace_contains_complete_events(tmp_path):
+    recorder = timings.Recorder()
+    recorder.enable()
+    with recorder.phase("stage"):
+        recorder.record_command(["git", "add", "--all"], recorder.origin, True, 0, 0)
+
+    path = tmp_path / "trace.json"
+    timings.write_chrome_trace(str(path), recorder)
+
+    events = json.loads(path.read_text(encoding="utf-8"))["traceEvents"]
+    complete = [e for e in events if e["ph"] == "X"]
+    assert {e["cat"] for e in complete} == {"phase", "command"}
+    command = next(e for e in complete if e["cat"] == "command")
+    assert command["args"]["argv"] == ["git", "add", "--all"]
+    assert command["args"]["phase"] == "stage"
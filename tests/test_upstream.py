@@ -0,0 +1,66 @@
+import subprocess
+
+import pytest
+
+from core.repo_state import RepoState, read_repo_state
+from core.upstream import UpstreamPrefetch, parse_upstreams
+
+pytestmark = pytest.mark.skipif(
+    subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0,
+    reason="git is required",
+)
+
+
+def _git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def _clone(tmp_path, name):
+    clone = tmp_path / name
+    _git(tmp_path, "clone", str(tmp_path / "remote.git"), str(clone))
+    _git(clone, "config", "user.name", "Test User")
+    _git(clone, "config", "user.email", "test@example.com")
+    return clone
+
+
+def test_parse_upstreams_ignores_local_upstreams():
+    output = "main\0origin\0refs/heads/main\0refs/remotes/origin/main\nlocal\0.\0refs/heads/main\0refs/heads/main"
+    assert parse_upstreams(output) == {"main": ("origin", "refs/heads/main", "refs/remotes/origin/main")}
+
+
+def test_prefetch_updates_tracking_ref_in_background(tmp_path, monkeypatch):
+    _git(tmp_path, "init", "--bare", "-b", "main", "remote.git")
+    work = _clone(tmp_path, "work")
+    (work / "a.txt").write_text("a", encoding="utf-8")
+    _git(work, "add", ".")
+    _git(work, "commit", "-m", "init")
+    _git(work, "push", "-u", "origin", "main")
+
+    other = _clone(tmp_path, "other")
+    (other / "b.txt").write_text("b", encoding="utf-8")
+    _git(other, "add", ".")
+    _git(other, "commit", "-m", "other")
+    _git(other, "push", "origin", "main")
+
+    monkeypatch.chdir(work)
+    prefetch = UpstreamPrefetch.prepare(read_repo_state())
+    assert prefetch is not None
+    prefetch.run_in_background()
+    assert prefetch.wait() == "refs/remotes/origin/main"
+    assert prefetch.behind() == 1
+    assert _git(work, "rev-parse", "origin/main") == _git(other, "rev-parse", "HEAD")
+    # Branch local và working tree không bị động tới
+    assert not (work / "b.txt").exists()
+
+
+def test_prefetch_is_skipped_without_upstream_and_idle_until_run():
+    state = RepoState()
+    state.branch = "feature"
+    assert UpstreamPrefetch.prepare(state) is None
+
+    # Kế hoạch dry-run không chạy bước 'prefetch': lần fetch đã chuẩn bị không làm gì cả
+    state.upstream = "origin/feature"
+    prefetch = UpstreamPrefetch.prepare(state)
+    assert prefetch is not None and not prefetch.started
+    assert prefetch.wait() is None
+    assert prefetch.behind() == 0
@@ -0,0 +1,194 @@
+import subprocess
+from argparse import Namespace
+
+import pytest
+
+import core.main_flow as main_flow
+from core.watch import ChangeIndex, WatchLoop
+
+pytestmark = pytest.mark.skipif(
+    subprocess.call(["git", "--version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0,
+    reason="git is required",
+)
+
+
+def _git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class ScriptedIndex:
+    def __init__(self):
+        self.changes = []
+
+    def poll(self):
+        return self.changes.pop(0) if self.changes else False
+
+
+def _args(**overrides):
+    values = dict(yes=True, tag=None, update_after=None, scope=None, chore="wip auto-sync")
+    values.update(overrides)
+    return Namespace(**values)
+
+
+def test_change_index_detects_edits_new_files_and_ignores_gitignored(tmp_path, monkeypatch):
+    _git(tmp_path, "init", "-q")
+    (tmp_path / ".gitignore").write_text("*.log\n", encoding="utf-8")
+    (tmp_path / "a.txt").write_text("a", encoding="utf-8")
+    _git(tmp_path, "add", ".")
+    monkeypatch.chdir(tmp_path)
+
+    index = ChangeIndex()
+    rebuilds = index.rebuilds
+    assert index.poll() is False
+    assert index.rebuilds == rebuilds
+
+    (tmp_path / "a.txt").write_text("changed", encoding="utf-8")
+    assert index.poll() is True
+    assert index.poll() is False
+
+    (tmp_path / "debug.log").write_text("noise", encoding="utf-8")
+    assert index.poll() is False
+
+    (tmp_path / "new").mkdir()
+    index.poll()
+    (tmp_path / "new" / "b.txt").write_text("b", encoding="utf-8")
+    assert index.poll() is True
+    assert "new/b.txt" in index.files
+
+
+def test_change_index_does_not_rebuild_on_every_poll_after_a_directory_is_deleted(tmp_path, monkeypatch):
+    _git(tmp_path, "init", "-q")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "a.txt").write_text("a", encoding="utf-8")
+    _git(tmp_path, "add", ".")
+    monkeypatch.chdir(tmp_path)
+
+    index = ChangeIndex()
+    (tmp_path / "sub" / "a.txt").unlink()
+    (tmp_path / "sub").rmdir()
+    assert index.poll() is True
+    rebuilds = index.rebuilds
+    assert [index.poll() for _ in range(3)] == [False, False, False]
+    assert index.rebuilds == rebuilds
+
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "a.txt").write_text("back", encoding="utf-8")
+    assert index.poll() is True
+
+
+def test_watch_loop_debounces_bursts_and_rate_limits_pushes(monkeypatch):
+    clock = FakeClock()
+    index = ScriptedIndex()
+    events = []
+    state = type("State", (), {"is_clean": False, "has_conflicts": False, "branch": "wip"})()
+    monkeypatch.setattr("core.watch.read_repo_state", lambda *a, **k: state)
+    monkeypatch.setattr(main_flow, "_run_pre_sync_hook_if_needed", lambda: False)
+    monkeypatch.setattr(main_flow, "get_commit_message", lambda args, state=None: "chore: wip auto-sync")
+    monkeypatch.setattr(main_flow, "_stage_and_commit_changes", lambda msg, args, state=None: events.append(("commit", clock.now)) or False)
+    monkeypatch.setattr(main_flow, "_push_and_handle_remote", lambda args, branch, ahead=False: events.append(("push", clock.now)))
+    monkeypatch.setattr(main_flow, "get_current_branch", lambda: "wip")
+
+    loop = WatchLoop(_args(), index, debounce=2, push_interval=60, clock=clock)
+    loop.tick()  # Lần đầu: đồng bộ thay đổi có từ trước
+    assert events == [("commit", 100.0), ("push", 100.0)]
+
+    # Một loạt thay đổi liên tiếp chỉ tạo một commit, sau khi đứng yên đủ lâu
+    for _ in range(3):
+        clock.now += 1
+        index.changes.append(True)
+        loop.tick()
+    clock.now += 1
+    loop.tick()
+    assert [e for e, _ in events].count("commit") == 1
+    clock.now += 1
+    loop.tick()
+    assert events[-1] == ("commit", 105.0)
+
+    # Push bị giới hạn tần suất: chỉ push lại sau push_interval
+    assert [e for e, _ in events].count("push") == 1
+    clock.now = 161.0
+    loop.tick()
+    assert events[-1] == ("push", 161.0)
+
+    # Repo đứng yên: không làm gì
+    clock.now += 120
+    loop.tick()
+    assert len(events) == 4
+
+
+def test_watch_loop_commits_and_pushes_real_changes(tmp_path, monkeypatch):
+    remote = tmp_path / "remote.git"
+    _git(tmp_path, "init", "--bare", "-q", "-b", "main", str(remote))
+    work = tmp_path / "work"
+    _git(tmp_path, "clone", "-q", str(remote), str(work))
+    _git(work, "config", "user.name", "Test User")
+    _git(work, "config", "user.email", "test@example.com")
+    (work / "a.txt").write_text("a", encoding="utf-8")
+    _git(work, "add", ".")
+    _git(work, "commit", "-q", "-m", "init")
+    _git(work, "push", "-q", "-u", "origin", "HEAD:refs/heads/wip")
+    _git(work, "checkout", "-q", "-b", "wip", "--track", "origin/wip")
+    monkeypatch.chdir(work)
+
+    clock = FakeClock()
+    loop = WatchLoop(_args(), ChangeIndex(), debounce=2, push_interval=0, clock=clock)
+    loop.tick()
+    assert loop.commits == 0
+
+    (work / "a.txt").write_text("edited", encoding="utf-8")
+    loop.tick()
+    assert loop.commits == 0
+    clock.now += 3
+    loop.tick()
+
+    assert loop.commits == 1 and loop.pushes == 1
+    assert _git(work, "log", "-1", "--format=%s") == "chore: wip auto-sync"
+    assert _git(remote, "rev-parse", "wip") == _git(work, "rev-parse", "HEAD")
+
+
+def _watched_repo(tmp_path, monkeypatch):
+    _git(tmp_path, "init", "-q", "-b", "wip")
+    _git(tmp_path, "-c", "user.name=T", "-c", "user.email=t@example.com", "commit", "-q", "--allow-empty", "-m", "init")
+    monkeypatch.chdir(tmp_path)
+
+
+def test_watch_refuses_to_start_when_chore_is_not_a_configured_commit_type(tmp_path, monkeypatch, capsys):
+    import core.watch as watch
+
+    _watched_repo(tmp_path, monkeypatch)
+    monkeypatch.setattr(watch, "get_commit_types", lambda: ["feat", "fix"])
+    monkeypatch.setattr("builtins.input", lambda *a: pytest.fail("watch mode must never prompt"))
+    monkeypatch.setattr(watch, "open_index", lambda: pytest.fail("watch must not start"))
+    monkeypatch.setattr(watch, "t", lambda name, **kw: f"{name} {kw.get('example', '')}")
+
+    assert watch.run_watch(Namespace(yes=False, scope=None, feat=None, fix=None)) == 1
+    assert capsys.readouterr().err.strip() == "watch_needs_commit_type feat"
+
+
+def test_watch_exports_metrics_only_after_rounds_with_a_commit_or_push(tmp_path, monkeypatch):
+    import core.watch as watch
+
+    _watched_repo(tmp_path, monkeypatch)
+    rounds = [False, True, False, False]
+    exports = []
+
+    def tick(self):
+        if not rounds:
+            raise KeyboardInterrupt
+        return rounds.pop(0)
+
+    monkeypatch.setattr(watch, "open_index", ScriptedIndex)
+    monkeypatch.setattr(watch.WatchLoop, "tick", tick)
+    monkeypatch.setattr(watch.METRICS, "export", lambda: exports.append(1))
+    monkeypatch.setattr(watch, "start_http_server", lambda: None)
+
+    assert watch.run_watch(_args(), poll_seconds=0) == 0
+    assert exports == [1]